@@ -4,17 +4,39 @@ BarBuddy Backend API Testing Suite
 Tests the actual running backend API endpoints
 """
 
+import argparse
+import asyncio
+import random
 import requests
 import sys
 import json
+import math
+import time
 from datetime import datetime
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from latency_histogram import ALL_ENDPOINTS, LatencyHistogram, format_header, format_row, save_histograms
+
+# Methods safe to repeat for warm latency samples
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS'}
 
 class BarBuddyAPITester:
-    def __init__(self, base_url="http://localhost:8001"):
+    def __init__(self, base_url="http://localhost:8001", pool_size: int = 10, keep_alive: bool = True,
+                 warm_samples: int = 5):
         self.base_url = base_url
         self.tests_run = 0
         self.tests_passed = 0
         self.test_results = []
+        self.warm_samples = warm_samples
+        # One pooled session for every probe, so latency measures the endpoint rather than TCP setup
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if not keep_alive:
+            self.session.headers['Connection'] = 'close'
+        # "METHOD endpoint" -> {'cold_ms': first request on a fresh connection, 'warm': LatencyHistogram of later requests}
+        self.latencies = {}
 
     def log_test(self, test_name: str, success: bool, message: str, details: dict = None):
         """Log test results"""
@@ -32,19 +54,45 @@ class BarBuddyAPITester:
         if details:
             print(f"   Details: {json.dumps(details, indent=2)}")
 
+    def timed_request(self, method, endpoint, **kwargs):
+        """Send one request, recording its latency (body included) for endpoint.
+
+        An endpoint's first request goes out on a fresh session, so its cold latency
+        pays for connection setup however many endpoints ran before it; later requests
+        use the pooled session and count as warm.
+        """
+        timing = self.latencies.get(f"{method} {endpoint}")
+        if timing is None:
+            with requests.Session() as fresh:
+                fresh.headers.update(self.session.headers)
+                elapsed_ms, response = self._timed(fresh, method, endpoint, **kwargs)
+            self.latencies[f"{method} {endpoint}"] = {'cold_ms': elapsed_ms, 'warm': LatencyHistogram()}
+        else:
+            elapsed_ms, response = self._timed(self.session, method, endpoint, **kwargs)
+            timing['warm'].record(elapsed_ms)
+        return response
+
+    def _timed(self, session, method, endpoint, **kwargs):
+        """(elapsed ms, response) for one request on session"""
+        started = time.perf_counter()
+        response = session.request(method, f"{self.base_url}{endpoint}", timeout=10, **kwargs)
+        response.content  # read the body inside the timed window
+        return (time.perf_counter() - started) * 1000, response
+
     def run_test(self, name, method, endpoint, expected_status, expected_keys=None):
         """Run a single API test"""
-        url = f"{self.base_url}{endpoint}"
         headers = {'Content-Type': 'application/json'}
 
         self.tests_run += 1
         print(f"\n🔍 Testing {name}...")
         
         try:
-            if method == 'GET':
-                response = requests.get(url, headers=headers, timeout=10)
-            elif method == 'POST':
-                response = requests.post(url, headers=headers, timeout=10)
+            response = self.timed_request(method, endpoint, headers=headers)
+            if method in IDEMPOTENT_METHODS:
+                # Open a pooled connection untimed, then repeat on it for warm latency
+                self.session.request(method, f"{self.base_url}{endpoint}", timeout=10, headers=headers).content
+                for _ in range(self.warm_samples):
+                    self.timed_request(method, endpoint, headers=headers)
 
             success = response.status_code == expected_status
             
@@ -161,14 +209,14 @@ class BarBuddyAPITester:
     def test_cors_headers(self):
         """Test 6: CORS Configuration"""
         try:
-            response = requests.options(f"{self.base_url}/api", timeout=10)
+            response = self.timed_request('OPTIONS', "/api")
             
             # Check if CORS headers are present (they should be for a web app)
             cors_working = True
             cors_details = {}
             
             # Note: OPTIONS might not be implemented, so we check a GET request for CORS headers
-            get_response = requests.get(f"{self.base_url}/api", timeout=10)
+            get_response = self.timed_request('GET', "/api")
             
             if 'Access-Control-Allow-Origin' in get_response.headers:
                 cors_details['access_control_allow_origin'] = get_response.headers.get('Access-Control-Allow-Origin')
@@ -239,18 +287,322 @@ class BarBuddyAPITester:
             if result['success']:
                 print(f"  - {result['test']}")
         
+        self.print_latencies()
+        self.session.close()
+        
         return {
             'total': total_tests,
             'passed': passed_tests,
             'failed': failed_tests,
             'success_rate': (passed_tests/total_tests)*100,
-            'results': self.test_results
+            'results': self.test_results,
+            'latencies': {endpoint: {'cold_ms': timing['cold_ms'], **timing['warm'].summary()}
+                          for endpoint, timing in self.latencies.items()}
         }
 
+    def histograms(self):
+        """Warm latency histogram per endpoint, for save_histograms()"""
+        return {endpoint: timing['warm'] for endpoint, timing in self.latencies.items()}
+
+    def print_latencies(self):
+        """Cold (fresh connection) latency and warm (pooled keep-alive) percentiles per endpoint"""
+        print("\n⏱️  LATENCY (cold = first request on a fresh connection, warm = later requests on the pool)")
+        print(f"{format_header()} {'cold':>9}")
+        for endpoint, timing in self.latencies.items():
+            print(f"{format_row(endpoint, timing['warm'])} {timing['cold_ms']:>7.1f}ms")
+
+# Friday-night request mix for --load: (method, endpoint, expected status, relative weight)
+LOAD_MIX = [
+    ('GET', '/api/venues/likes/global', 200, 6),
+    ('GET', '/api/user/demo123/profile', 200, 3),
+    ('GET', '/api', 200, 1),
+    ('GET', '/', 200, 1),
+    ('GET', '/api/admin', 200, 0.5),
+    ('GET', '/api/nonexistent', 404, 0.5)
+]
+
+class AsyncHTTPConnection:
+    """Minimal keep-alive HTTP/1.1 client connection on asyncio streams (no third-party client needed)"""
+    def __init__(self, base_url: str):
+        url = urlsplit(base_url)
+        self.host = url.hostname
+        self.port = url.port or (443 if url.scheme == 'https' else 80)
+        self.ssl = url.scheme == 'https'
+        self.reader = self.writer = None
+
+    async def request(self, method: str, path: str, timeout: float = None):
+        """Send one request, reconnecting if needed; returns (status, body).
+        
+        Raises asyncio.TimeoutError, with the connection closed so the next
+        request reconnects, if no full answer arrives within timeout seconds.
+        """
+        try:
+            return await asyncio.wait_for(self._exchange(method, path), timeout)
+        except asyncio.TimeoutError:
+            self.close()
+            raise
+
+    async def _exchange(self, method: str, path: str):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+        try:
+            self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+                              f"Accept: application/json\r\nConnection: keep-alive\r\n\r\n".encode())
+            await self.writer.drain()
+            status_line = await self.reader.readline()
+            if not status_line:
+                raise ConnectionError("server closed the connection")
+            status = int(status_line.split()[1])
+            headers = {}
+            while True:
+                line = await self.reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            if headers.get('transfer-encoding', '').lower() == 'chunked':
+                body = b''
+                while True:
+                    size = int((await self.reader.readline()).split(b';')[0], 16)
+                    chunk = await self.reader.readexactly(size + 2)
+                    if not size:
+                        break
+                    body += chunk[:-2]
+            else:
+                body = await self.reader.readexactly(int(headers.get('content-length', 0)))
+            if headers.get('connection', '').lower() == 'close':
+                self.close()
+            return status, body
+        except (OSError, ValueError, IndexError, asyncio.IncompleteReadError):
+            self.close()
+            raise
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+class LoadTester:
+    """Drive LOAD_MIX against the API from one asyncio loop.
+    
+    Closed loop by default: `concurrency` keep-alive connections each send
+    their next request as soon as the last one answers, so a stalled server
+    also stalls the load and its stall barely shows in the latencies.
+    
+    With rps the test runs open loop: requests fall due on a fixed arrival
+    schedule (evenly spaced, or Poisson) however slowly earlier ones are
+    answered, and latency is measured from when each was due. A request that
+    finds all `concurrency` connections busy waits for one, and that wait
+    counts toward its latency, as users queued behind a stall would feel it.
+    
+    Either ramps up linearly over ramp_up seconds (workers joining, or the
+    rate rising); only requests due after the ramp count toward the report.
+    Requests still unanswered `drain` seconds after the end are abandoned
+    and counted as errors.
+    """
+    def __init__(self, base_url: str, concurrency: int = 50, rps: float = None, duration: float = 30,
+                 ramp_up: float = 5, seed: int = 42, arrival: str = 'constant', drain: float = 10):
+        if arrival not in ('constant', 'poisson'):
+            raise ValueError(f"unknown arrival schedule: {arrival}")
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.rps = rps
+        self.duration = duration
+        self.ramp_up = ramp_up
+        self.arrival = arrival
+        self.drain = drain
+        self.rng = random.Random(seed)
+        self.endpoints = [f"{method} {endpoint}" for method, endpoint, _, _ in LOAD_MIX]
+        # "METHOD endpoint" -> requests, errors and a histogram of successful latencies, steady state only
+        self.requests = {name: 0 for name in self.endpoints}
+        self.errors = {name: 0 for name in self.endpoints}
+        self.latencies = {name: LatencyHistogram() for name in self.endpoints}
+        # Open loop only: latency from the actual send, as a closed-loop tester would have measured it
+        self.service = {name: LatencyHistogram() for name in self.endpoints}
+        self.ramp_requests = 0
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self.started = loop.time()
+        self.deadline = self.started + self.ramp_up + self.duration
+        if self.rps:
+            await self._open_loop(loop)
+        else:
+            await asyncio.gather(*(self._worker(i) for i in range(self.concurrency)))
+        return self.report()
+
+    def _send_offset(self, n: float) -> float:
+        """Seconds after the start that the n-th request is due, for a rate ramping linearly to rps.
+        
+        Fed the running sum of unit exponential draws instead of n, this maps
+        a unit-rate Poisson process onto the ramped rate.
+        """
+        ramp_requests = self.rps * self.ramp_up / 2
+        if n < ramp_requests:
+            return math.sqrt(2 * n * self.ramp_up / self.rps)
+        return self.ramp_up + (n - ramp_requests) / self.rps
+
+    def _record(self, name: str, started: float, finished: float, failed: bool) -> bool:
+        """Count one request timed from started (sent, or due when open loop); False during ramp-up"""
+        if started - self.started < self.ramp_up:
+            self.ramp_requests += 1
+            return False
+        self.requests[name] += 1
+        if failed:
+            self.errors[name] += 1
+        else:
+            self.latencies[name].record((finished - started) * 1000)
+        return True
+
+    async def _open_loop(self, loop):
+        """Start each request when it falls due, without waiting on earlier ones; then drain stragglers"""
+        connections = asyncio.Queue()
+        for _ in range(self.concurrency):
+            connections.put_nowait(AsyncHTTPConnection(self.base_url))
+        weights = [weight for _, _, _, weight in LOAD_MIX]
+        in_flight = set()
+        arrivals = 0.0
+        try:
+            while True:
+                due = self.started + self._send_offset(arrivals)
+                if due >= self.deadline:
+                    break
+                if due > loop.time():
+                    await asyncio.sleep(due - loop.time())
+                task = loop.create_task(self._issue(self.rng.choices(LOAD_MIX, weights=weights)[0], due, connections))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+                arrivals += self.rng.expovariate(1) if self.arrival == 'poisson' else 1
+            if in_flight:
+                # Requests still unanswered after the drain period count as errors
+                _, stalled = await asyncio.wait(set(in_flight), timeout=self.drain)
+                for task in stalled:
+                    task.cancel()
+                await asyncio.gather(*stalled, return_exceptions=True)
+        finally:
+            while not connections.empty():
+                connections.get_nowait().close()
+
+    async def _issue(self, request, due: float, connections: asyncio.Queue):
+        """Send one open-loop request on the next free connection, timing it from when it was due"""
+        loop = asyncio.get_running_loop()
+        method, endpoint, expected_status, _ = request
+        name = f"{method} {endpoint}"
+        connection, sent = None, due
+        try:
+            connection = await connections.get()
+            sent = loop.time()
+            status, _ = await connection.request(method, endpoint)
+            failed = status != expected_status
+        except (OSError, ValueError, IndexError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            failed = True
+        except asyncio.CancelledError:
+            if connection is not None:
+                connection.close()
+            self._record(name, due, loop.time(), True)
+            raise
+        finally:
+            if connection is not None:
+                connections.put_nowait(connection)
+        finished = loop.time()
+        if self._record(name, due, finished, failed) and not failed:
+            self.service[name].record((finished - sent) * 1000)
+
+    async def _worker(self, number: int):
+        loop = asyncio.get_running_loop()
+        if not self.rps and self.ramp_up:
+            await asyncio.sleep(self.ramp_up * number / self.concurrency)
+        connection = AsyncHTTPConnection(self.base_url)
+        weights = [weight for _, _, _, weight in LOAD_MIX]
+        try:
+            while True:
+                sent = loop.time()
+                if sent >= self.deadline:
+                    return
+                method, endpoint, expected_status, _ = self.rng.choices(LOAD_MIX, weights=weights)[0]
+                try:
+                    # A request still unanswered `drain` seconds after the deadline counts as an error
+                    status, _ = await connection.request(method, endpoint, self.deadline + self.drain - sent)
+                    failed = status != expected_status
+                except (OSError, ValueError, IndexError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    failed = True
+                self._record(f"{method} {endpoint}", sent, loop.time(), failed)
+        finally:
+            connection.close()
+
+    def report(self):
+        """Print and return throughput, error rate and latency percentiles per endpoint"""
+        schedule = f', open loop at {self.rps:g} req/s ({self.arrival} arrivals)' if self.rps else ', closed loop'
+        print(f"\n📈 LOAD RESULTS ({self.duration:g}s steady state after {self.ramp_up:g}s ramp-up, "
+              f"{self.concurrency} connections{schedule})")
+        print(f"{'reqs':>7} {'req/s':>8} {'errors':>7}  {format_header(32)}")
+        summary = {}
+        for name in self.endpoints:
+            requests_sent = self.requests[name]
+            if not requests_sent:
+                continue
+            summary[name] = {
+                'requests': requests_sent, 'rps': requests_sent / self.duration,
+                'error_rate': self.errors[name] / requests_sent, **self.latencies[name].summary()
+            }
+            print(f"{requests_sent:>7,} {summary[name]['rps']:>8.1f} {summary[name]['error_rate']:>6.1%}  "
+                  f"{format_row(name, self.latencies[name], 32)}")
+        total = sum(self.requests.values())
+        errors = sum(self.errors.values())
+        overall = self.histograms()[ALL_ENDPOINTS]
+        print(f"{total:>7,} {total / self.duration:>8.1f} {errors / max(1, total):>6.1%}  "
+              f"{format_row(ALL_ENDPOINTS, overall, 32)}")
+        results = {'endpoints': summary, 'requests': total, 'rps': total / self.duration,
+                   'error_rate': errors / max(1, total), **overall.summary()}
+        if self.rps:
+            service = LatencyHistogram()
+            for histogram in self.service.values():
+                service.merge(histogram)
+            print(f"{'':>25}{format_row('service time (uncorrected)', service, 32)}")
+            results['service'] = service.summary()
+        note = '; latency runs from when each request was due' if self.rps else ''
+        print(f"({self.ramp_requests:,} ramp-up requests not counted{note})")
+        return results
+
+    def histograms(self):
+        """Latency histogram per endpoint plus their merge under ALL_ENDPOINTS"""
+        overall = LatencyHistogram()
+        for histogram in self.latencies.values():
+            overall.merge(histogram)
+        return {**self.latencies, ALL_ENDPOINTS: overall}
+
 def main():
     """Main test runner"""
-    tester = BarBuddyAPITester()
+    parser = argparse.ArgumentParser(description="BarBuddy Backend API Testing Suite")
+    parser.add_argument('--base-url', default="http://localhost:8001")
+    parser.add_argument('--pool-size', type=int, default=10, help="connections kept per host")
+    parser.add_argument('--no-keep-alive', action='store_true', help="close the connection after every request")
+    parser.add_argument('--warm-samples', type=int, default=5, help="repeats of each GET for warm latency")
+    parser.add_argument('--load', action='store_true', help="drive the endpoint set concurrently instead of testing it")
+    parser.add_argument('--concurrency', type=int, default=50, help="--load: keep-alive connections")
+    parser.add_argument('--rps', type=float,
+                        help="--load: open loop at this total request rate (default: closed loop, as fast as answered)")
+    parser.add_argument('--arrival', choices=['constant', 'poisson'], default='constant',
+                        help="--load --rps: evenly spaced or Poisson arrivals")
+    parser.add_argument('--duration', type=float, default=30, help="--load: steady-state seconds measured")
+    parser.add_argument('--ramp-up', type=float, default=5, help="--load: seconds to reach full load (not measured)")
+    parser.add_argument('--drain', type=float, default=10,
+                        help="--load: seconds past the end before unanswered requests count as errors")
+    parser.add_argument('--max-error-rate', type=float, default=0.01, help="--load: fail above this error rate")
+    parser.add_argument('--histograms', metavar='DIR',
+                        help="write per-endpoint latency histograms here (latency.json and .hgrm files)")
+    args = parser.parse_args()
+    if args.load:
+        load = LoadTester(args.base_url, args.concurrency, args.rps, args.duration, args.ramp_up,
+                          arrival=args.arrival, drain=args.drain)
+        results = asyncio.run(load.run())
+        if args.histograms:
+            save_histograms(load.histograms(), args.histograms)
+        sys.exit(0 if results['requests'] and results['error_rate'] <= args.max_error_rate else 1)
+    tester = BarBuddyAPITester(args.base_url, args.pool_size, not args.no_keep_alive, args.warm_samples)
     results = tester.run_all_tests()
+    if args.histograms:
+        save_histograms(tester.histograms(), args.histograms)
     
     # Exit with appropriate code
     exit_code = 0 if results['failed'] == 0 else 1
@@ -4,26 +4,1820 @@ BarBuddy Backend Testing Suite
 Tests Supabase integration, global like system, achievement tracking, and user profile management.
 """
 
+import abc
+import argparse
 import asyncio
+import bisect
+import contextlib
+import contextvars
+import copy
+import functools
+import heapq
+import itertools
 import json
+import mmap
+import operator
+import re
+import struct
 import sys
+import threading
 import os
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import uuid
-from datetime import datetime, timedelta
+from array import array
+from collections import Counter, deque
+from datetime import date, datetime, time, timedelta, timezone
+from time import perf_counter
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; columnar scans fall back to pure Python
+    np = None
+
+# Sentinel for a column a row never set (distinct from an explicit None)
+MISSING = object()
+
+# Per-row state codes kept by typed columns next to their value array
+_VALUE, _NULL, _ABSENT = 0, 1, 2
+# bytes.translate() table turning state codes into 1 for _VALUE rows and 0 otherwise
+_VALUE_MASK = bytes(code == _VALUE for code in range(256))
+
+_NAIVE_EPOCH = datetime(1970, 1, 1)
+_UTC_EPOCH = _NAIVE_EPOCH.replace(tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+def _encode_timestamp(value: Any) -> int:
+    """Microseconds since the epoch for an ISO-8601 string, datetime or date.
+    
+    Columns are timestamptz read in Supabase's session TimeZone, UTC: offset-
+    aware values are converted to UTC and naive ones are taken to be UTC
+    already, whatever the host's zone; ints are taken to be encoded already.
+    """
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        return _encode_timestamp_string(value)
+    if isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime.combine(value, time())
+    if not isinstance(value, datetime):
+        raise TypeError(f"not a timestamp: {value!r}")
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - _NAIVE_EPOCH) // _MICROSECOND
+
+def _utc_now() -> int:
+    """The mock's clock: now, encoded (NOW() in the UTC session zone)"""
+    return _encode_timestamp(datetime.now(timezone.utc))
+
+@functools.lru_cache(maxsize=4096)
+def _encode_timestamp_string(value: str) -> int:
+    return _encode_timestamp(datetime.fromisoformat(value))
+
+@functools.lru_cache(maxsize=4096)
+def _format_timestamp(raw: int) -> str:
+    """ISO-8601 string, with its +00:00 offset, for an encoded timestamp (rows often share one, hence the cache)"""
+    return (_UTC_EPOCH + timedelta(microseconds=raw)).isoformat()
+
+def _as_datetime(value: Any) -> Optional[datetime]:
+    """datetime for a stored or presented timestamp value, or None if it is not one"""
+    try:
+        return _NAIVE_EPOCH + timedelta(microseconds=_encode_timestamp(value))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+class RowStore:
+    """Default table storage: one Python dict per row, handed out as-is"""
+    def __init__(self):
+        self.records = []
+        # Deleted rows leave a None tombstone so positions (and indexes) stay valid
+        self.deleted = 0
+        # Rows below this position may be shared with a copy() and are replaced, not mutated
+        self.shared_rows = 0
+    
+    def __len__(self):
+        return len(self.records)
+    
+    def count(self) -> int:
+        return len(self.records) - self.deleted
+    
+    def positions(self):
+        """Positions of live (not deleted) rows, in insertion order"""
+        if not self.deleted:
+            return range(len(self.records))
+        return (p for p, record in enumerate(self.records) if record is not None)
+    
+    def append(self, record: Dict) -> int:
+        self.records.append(record)
+        return len(self.records) - 1
+    
+    def extend(self, records: List[Dict]) -> int:
+        """Append a batch of rows, returning the position of the first"""
+        first = len(self.records)
+        self.records.extend(records)
+        return first
+    
+    def live(self, position: int) -> bool:
+        return self.records[position] is not None
+    
+    def row(self, position: int) -> Dict:
+        return self.records[position]
+    
+    def rows(self) -> List[Dict]:
+        if not self.deleted:
+            return self.records
+        return [record for record in self.records if record is not None]
+    
+    def value(self, position: int, column: str):
+        return self.records[position].get(column)
+    
+    def values(self, column: str) -> List[Any]:
+        """column's value at every position (None for deleted rows)"""
+        return [record.get(column) if record is not None else None for record in self.records]
+    
+    def copy(self) -> 'RowStore':
+        """Copy of the row list; the row dicts themselves are shared until updated"""
+        clone = copy.copy(self)
+        clone.records = list(self.records)
+        clone.shared_rows = len(self.records)
+        return clone
+    
+    def update(self, position: int, updates: Dict) -> Dict:
+        record = self.records[position]
+        if position < self.shared_rows:
+            record = self.records[position] = dict(record)
+        record.update(updates)
+        return record
+    
+    def delete(self, position: int) -> Dict:
+        record = self.records[position]
+        self.records[position] = None
+        self.deleted += 1
+        return record
+    
+    def scan_eq(self, column: str, value: Any) -> List[int]:
+        return [p for p, record in enumerate(self.records)
+                if record is not None and record.get(column) == value]
+    
+    def value_counts(self, column: str, positions=None) -> Dict[Any, int]:
+        records = self.rows() if positions is None else (self.records[p] for p in positions)
+        counts = {}
+        for record in records:
+            key = record.get(column)
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+class _TypedColumn(abc.ABC):
+    """Column backed by an array of fixed-width values plus a lazy null/absent state array"""
+    typecode = 'q'
+    
+    def __init__(self, length: int = 0):
+        self.values = array(self.typecode, bytes(array(self.typecode).itemsize * length))
+        self.state = array('b', [_ABSENT]) * length if length else None
+    
+    def __len__(self):
+        return len(self.values)
+    
+    @classmethod
+    def from_buffers(cls, values: memoryview, state: Optional[memoryview]) -> '_TypedColumn':
+        """Column over existing (e.g. memory-mapped) buffers, copied only on first write"""
+        column = cls.__new__(cls)
+        column.values = values
+        column.state = state
+        return column
+    
+    def copy(self) -> '_TypedColumn':
+        # Read-only snapshot buffers can stay shared; they are copied on first write anyway
+        clone = copy.copy(self)
+        if isinstance(self.values, array):
+            clone.values = self.values[:]
+        if isinstance(self.state, array):
+            clone.state = self.state[:]
+        return clone
+    
+    def _writable(self):
+        """Swap read-only snapshot buffers for owned arrays before mutating"""
+        if isinstance(self.values, memoryview):
+            self.values = array(self.typecode, self.values.tobytes())
+        if isinstance(self.state, memoryview):
+            self.state = array('b', self.state.tobytes())
+    
+    @abc.abstractmethod
+    def accepts(self, value: Any) -> bool:
+        """Whether value can be stored in this column's array"""
+    
+    def encode(self, value: Any):
+        return value
+    
+    def decode(self, raw):
+        return raw
+    
+    def _mark(self, position: Optional[int], code: int):
+        if self.state is None:
+            if code == _VALUE:
+                return
+            self.state = array('b', bytes(len(self.values) - (position is None)))
+        if position is None:
+            self.state.append(code)
+        else:
+            self.state[position] = code
+    
+    def append(self, value: Any):
+        self._writable()
+        if value is MISSING or value is None:
+            self.values.append(0)
+            self._mark(None, _ABSENT if value is MISSING else _NULL)
+        else:
+            self.values.append(self.encode(value))
+            self._mark(None, _VALUE)
+    
+    def extend(self, values: List[Any]):
+        """Append a batch of values with one array extend instead of one append each"""
+        self._writable()
+        encode = self.encode
+        self.values.extend([0 if v is None or v is MISSING else encode(v) for v in values])
+        codes = [_ABSENT if v is MISSING else _NULL if v is None else _VALUE for v in values]
+        if self.state is not None:
+            self.state.extend(codes)
+        elif any(codes):
+            self.state = array('b', bytes(len(self.values) - len(codes)))
+            self.state.extend(codes)
+    
+    def get(self, position: int):
+        if self.state is not None and self.state[position]:
+            return None if self.state[position] == _NULL else MISSING
+        return self.decode(self.values[position])
+    
+    def to_list(self) -> List[Any]:
+        """Every row's value decoded in one pass, None for null and absent rows"""
+        values = self.values.tolist()
+        if type(self).decode is not _TypedColumn.decode:
+            values = list(map(self.decode, values))
+        if self.state is not None:
+            for position in itertools.compress(range(len(values)), self.state):
+                values[position] = None
+        return values
+    
+    def set(self, position: int, value: Any):
+        self._writable()
+        if value is None:
+            self._mark(position, _NULL)
+        else:
+            self.values[position] = self.encode(value)
+            self._mark(position, _VALUE)
+    
+    def scan_eq(self, value: Any) -> List[int]:
+        if value is None:
+            if self.state is None:
+                return []
+            return [p for p, code in enumerate(self.state) if code]
+        if not self.accepts(value):
+            return []
+        raw = self.encode(value)
+        if np is not None:
+            hits = np.frombuffer(self.values, dtype=self.typecode) == raw
+            if self.state is not None:
+                hits &= np.frombuffer(self.state, dtype=np.int8) == _VALUE
+            return np.flatnonzero(hits).tolist()
+        state = self.state
+        return [p for p, v in enumerate(self.values) if v == raw and (state is None or not state[p])]
+    
+    def value_counts(self, positions=None) -> Dict[Any, int]:
+        if positions is None:
+            raw_counts = self._raw_counts()
+            return {self.decode(raw) if raw is not None else None: n for raw, n in raw_counts.items()}
+        positions = list(positions)
+        nulls = 0
+        if self.state is not None:
+            state = self.state
+            valued = [p for p in positions if not state[p]]
+            nulls = len(positions) - len(valued)
+            positions = valued
+        # Tally raw values in C, then decode each distinct one once
+        counts = {self.decode(raw): n for raw, n in Counter(map(self.values.__getitem__, positions)).items()}
+        if nulls:
+            counts[None] = counts.get(None, 0) + nulls
+        return counts
+    
+    def _raw_counts(self) -> Dict[Any, int]:
+        """Whole-column tally of raw stored values (None for null/absent rows)"""
+        counts, nulls = self._tally_numpy() if np is not None else self._tally()
+        if nulls:
+            counts[None] = nulls
+        return counts
+    
+    def _tally_numpy(self) -> Tuple[Dict[Any, int], int]:
+        """(raw value -> rows, null/absent rows), counted with NumPy"""
+        values = np.frombuffer(self.values, dtype=self.typecode)
+        nulls = 0
+        if self.state is not None:
+            valid = np.frombuffer(self.state, dtype=np.int8) == _VALUE
+            nulls = int(len(values) - valid.sum())
+            values = values[valid]
+        raws, tally = np.unique(values, return_counts=True)
+        return dict(zip(raws.tolist(), tally.tolist())), nulls
+    
+    def _tally(self) -> Tuple[Dict[Any, int], int]:
+        """(raw value -> rows, null/absent rows), counted without NumPy"""
+        if self.state is None:
+            # Counter tallies an array in C
+            return dict(Counter(self.values)), 0
+        # A nulled row keeps its old raw value, so tally only the _VALUE rows (still in C)
+        valued = self.state.tobytes().translate(_VALUE_MASK)
+        counts = dict(Counter(itertools.compress(self.values, valued)))
+        return counts, len(valued) - sum(counts.values())
+    
+    def nbytes(self) -> int:
+        size = self.values.itemsize * len(self.values)
+        return size + (len(self.state) if self.state is not None else 0)
+
+class IntColumn(_TypedColumn):
+    typecode = 'q'
+    
+    def accepts(self, value):
+        return type(value) is int and -2 ** 63 <= value < 2 ** 63
+
+class FloatColumn(_TypedColumn):
+    typecode = 'd'
+    
+    def accepts(self, value):
+        return type(value) is float
+
+class BoolColumn(_TypedColumn):
+    typecode = 'b'
+    
+    def accepts(self, value):
+        return type(value) is bool
+    
+    def encode(self, value):
+        return int(value)
+    
+    def decode(self, raw):
+        return bool(raw)
+
+class TimestampColumn(_TypedColumn):
+    """Timestamps as int64 microseconds since the (naive) epoch, as MockTable stores them"""
+    typecode = 'q'
+    
+    def accepts(self, value):
+        return isinstance(value, int) and not isinstance(value, bool)
+
+class DictColumn(_TypedColumn):
+    """Dictionary-encoded strings: an int32 code per row into a shared value list"""
+    typecode = 'i'
+    
+    def __init__(self, length: int = 0):
+        super().__init__(length)
+        self.dictionary = []
+        self.codes = {}
+    
+    def __getattr__(self, name):
+        # Snapshot-loaded columns rebuild the value -> code map on first use
+        if name == 'codes':
+            self.codes = {value: code for code, value in enumerate(self.dictionary)}
+            return self.codes
+        raise AttributeError(name)
+    
+    def accepts(self, value):
+        return isinstance(value, str)
+    
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.dictionary)
+            self.dictionary.append(value)
+        return code
+    
+    def decode(self, raw):
+        return self.dictionary[raw]
+    
+    def copy(self):
+        clone = super().copy()
+        clone.dictionary = list(self.dictionary)
+        if 'codes' in self.__dict__:
+            clone.codes = dict(self.codes)
+        return clone
+    
+    def scan_eq(self, value):
+        # Unknown strings cannot match, and probing must not grow the dictionary
+        if isinstance(value, str) and value not in self.codes:
+            return []
+        return super().scan_eq(value)
+    
+    def _raw_counts(self):
+        if np is None:
+            return super()._raw_counts()
+        codes = np.frombuffer(self.values, dtype=np.int32)
+        nulls = 0
+        if self.state is not None:
+            valid = np.frombuffer(self.state, dtype=np.int8) == _VALUE
+            nulls = int(len(codes) - valid.sum())
+            codes = codes[valid]
+        tally = np.bincount(codes, minlength=len(self.dictionary)).tolist()
+        counts = {code: n for code, n in enumerate(tally) if n}
+        if nulls:
+            counts[None] = nulls
+        return counts
+    
+    def nbytes(self):
+        return super().nbytes() + sum(sys.getsizeof(v) for v in self.dictionary)
+
+_CANONICAL_UUID = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}')
+
+class UUIDColumn(_TypedColumn):
+    """Canonical UUID strings packed into two uint64 words per row"""
+    typecode = 'Q'
+    
+    def __init__(self, length: int = 0):
+        self.values = array('Q', bytes(16 * length))
+        self.state = array('b', [_ABSENT]) * length if length else None
+    
+    def __len__(self):
+        return len(self.values) // 2
+    
+    def accepts(self, value):
+        return isinstance(value, str) and _CANONICAL_UUID.fullmatch(value) is not None
+    
+    def _mark(self, position, code):
+        if self.state is None and code != _VALUE:
+            self.state = array('b', bytes(len(self) - (position is None)))
+        super()._mark(position, code)
+    
+    def append(self, value):
+        self._writable()
+        if value is MISSING or value is None:
+            self.values.extend((0, 0))
+            self._mark(None, _ABSENT if value is MISSING else _NULL)
+        else:
+            n = int(value.replace('-', ''), 16)
+            self.values.extend((n >> 64, n & 0xFFFFFFFFFFFFFFFF))
+            self._mark(None, _VALUE)
+    
+    def extend(self, values):
+        self._writable()
+        words = []
+        codes = []
+        for value in values:
+            if value is None or value is MISSING:
+                words += (0, 0)
+                codes.append(_NULL if value is None else _ABSENT)
+            else:
+                n = int(value.replace('-', ''), 16)
+                words += (n >> 64, n & 0xFFFFFFFFFFFFFFFF)
+                codes.append(_VALUE)
+        self.values.extend(words)
+        if self.state is not None:
+            self.state.extend(codes)
+        elif any(codes):
+            self.state = array('b', bytes(len(self) - len(codes)))
+            self.state.extend(codes)
+    
+    def get(self, position):
+        if self.state is not None and self.state[position]:
+            return None if self.state[position] == _NULL else MISSING
+        return str(uuid.UUID(int=(self.values[2 * position] << 64) | self.values[2 * position + 1]))
+    
+    def set(self, position, value):
+        self._writable()
+        if value is None:
+            self._mark(position, _NULL)
+        else:
+            n = int(value.replace('-', ''), 16)
+            self.values[2 * position] = n >> 64
+            self.values[2 * position + 1] = n & 0xFFFFFFFFFFFFFFFF
+            self._mark(position, _VALUE)
+    
+    def scan_eq(self, value):
+        if value is None or not self.accepts(value):
+            return _TypedColumn.scan_eq(self, None) if value is None else []
+        n = int(value.replace('-', ''), 16)
+        hi, lo = n >> 64, n & 0xFFFFFFFFFFFFFFFF
+        return [p for p in range(len(self)) if self.values[2 * p] == hi
+                and self.values[2 * p + 1] == lo and self.get(p) is not MISSING]
+    
+    def to_list(self):
+        return [None if value is MISSING else value for value in map(self.get, range(len(self)))]
+    
+    def value_counts(self, positions=None):
+        return _TypedColumn.value_counts(self, range(len(self)) if positions is None else positions)
+
+class ObjectColumn:
+    """Fallback column holding arbitrary Python values (lists, dicts, mixed types)"""
+    def __init__(self, length: int = 0, untyped: bool = False):
+        self.values = [MISSING] * length
+        # Columns only ever seen as None are re-typed by the first real value
+        self.untyped = untyped
+    
+    def __len__(self):
+        return len(self.values)
+    
+    @classmethod
+    def from_column(cls, column) -> 'ObjectColumn':
+        promoted = cls()
+        promoted.values = [column.get(p) for p in range(len(column))]
+        return promoted
+    
+    def accepts(self, value):
+        return not self.untyped or value is None
+    
+    def append(self, value):
+        self.values.append(value)
+        if value is not None and value is not MISSING:
+            self.untyped = False
+    
+    def extend(self, values):
+        self.values.extend(values)
+        if self.untyped and any(v is not None and v is not MISSING for v in values):
+            self.untyped = False
+    
+    def get(self, position):
+        return self.values[position]
+    
+    def copy(self):
+        clone = copy.copy(self)
+        clone.values = list(self.values)
+        return clone
+    
+    def to_list(self):
+        return [None if value is MISSING else value for value in self.values]
+    
+    def set(self, position, value):
+        self.values[position] = value
+        if value is not None:
+            self.untyped = False
+    
+    def scan_eq(self, value):
+        return [p for p, v in enumerate(self.values)
+                if (None if v is MISSING else v) == value]
+    
+    def value_counts(self, positions=None):
+        counts = {}
+        for p in (range(len(self.values)) if positions is None else positions):
+            key = self.values[p]
+            key = None if key is MISSING else key
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+    
+    def nbytes(self):
+        return sys.getsizeof(self.values)
+
+# Column names stored as timestamps / packed UUIDs by the columnar backend
+TIMESTAMP_COLUMNS = {'created_at', 'updated_at', 'liked_at', 'completed_at', 'sent_at',
+                     'responded_at', 'start_time', 'end_time', 'timestamp', 'last_updated'}
+UUID_COLUMNS = {'id'}
+
+def _encode_records(records: List[Dict]) -> List[Dict]:
+    """Storage copies of records with their timestamp columns encoded as epoch microseconds.
+    
+    Values that do not parse as timestamps are stored as given.
+    """
+    encoded = []
+    for record in records:
+        row = dict(record)
+        for column in TIMESTAMP_COLUMNS.intersection(record):
+            value = record[column]
+            if value is None:
+                continue
+            try:
+                row[column] = _encode_timestamp(value)
+            except (TypeError, ValueError, OverflowError):
+                pass
+        encoded.append(row)
+    return encoded
+
+def _present(row: Dict) -> Dict:
+    """Response form of a stored row: encoded timestamps become ISO-8601 strings again"""
+    presented = None
+    for column in TIMESTAMP_COLUMNS.intersection(row):
+        value = row[column]
+        if type(value) is int:
+            if presented is None:
+                presented = dict(row)
+            presented[column] = _format_timestamp(value)
+    return row if presented is None else presented
+
+def _new_column(name: str, value: Any, length: int):
+    """Pick the narrowest column type able to hold value"""
+    candidates = [ObjectColumn]
+    if isinstance(value, bool):
+        candidates = [BoolColumn]
+    elif isinstance(value, int):
+        candidates = [TimestampColumn] if name in TIMESTAMP_COLUMNS else [IntColumn]
+    elif isinstance(value, float):
+        candidates = [FloatColumn]
+    elif isinstance(value, str):
+        if name in UUID_COLUMNS:
+            candidates = [UUIDColumn, DictColumn]
+        else:
+            candidates = [DictColumn]
+    for column_type in candidates:
+        column = column_type(length)
+        if column.accepts(value):
+            return column
+    return ObjectColumn(length)
+
+class ColumnStore:
+    """Columnar table storage: typed arrays per column, rows materialized on read"""
+    def __init__(self):
+        self.columns = {}
+        self.length = 0
+        # Deleted positions keep their slots so indexes stay valid
+        self.deleted = set()
+    
+    def __len__(self):
+        return self.length
+    
+    def count(self) -> int:
+        return self.length - len(self.deleted)
+    
+    def positions(self):
+        """Positions of live (not deleted) rows, in insertion order"""
+        if not self.deleted:
+            return range(self.length)
+        return (p for p in range(self.length) if p not in self.deleted)
+    
+    def _column_for(self, name: str, value: Any):
+        """Column able to store value, creating or widening it as needed"""
+        column = self.columns.get(name)
+        if column is None:
+            if value is None:
+                column = ObjectColumn(self.length, untyped=True)
+            else:
+                column = _new_column(name, value, self.length)
+            self.columns[name] = column
+        elif value is not None and not column.accepts(value):
+            if isinstance(column, ObjectColumn) and column.untyped:
+                typed = _new_column(name, value, self.length)
+                for p, v in enumerate(column.values):
+                    if v is None:
+                        typed.set(p, None)
+                column = typed
+            else:
+                column = ObjectColumn.from_column(column)
+            self.columns[name] = column
+        return column
+    
+    def append(self, record: Dict) -> int:
+        for name, value in record.items():
+            self._column_for(name, value)
+        for name, column in self.columns.items():
+            column.append(record.get(name, MISSING))
+        self.length += 1
+        return self.length - 1
+    
+    def extend(self, records: List[Dict]) -> int:
+        """Append a batch of rows column by column, returning the first position"""
+        first = self.length
+        names = {}
+        for record in records:
+            names.update(dict.fromkeys(record))
+        batch = {name: [record.get(name, MISSING) for record in records] for name in names}
+        for name, values in batch.items():
+            # Widen each column once for the whole batch before encoding it
+            if name not in self.columns:
+                self._column_for(name, None)
+            try:
+                distinct = set(values)
+            except TypeError:
+                distinct = values
+            for value in distinct:
+                if value is not None and value is not MISSING and not self.columns[name].accepts(value):
+                    self._column_for(name, value)
+        missing = [MISSING] * len(records)
+        for name, column in self.columns.items():
+            column.extend(batch.get(name, missing))
+        self.length += len(records)
+        return first
+    
+    def live(self, position: int) -> bool:
+        return position not in self.deleted
+    
+    def row(self, position: int) -> Dict:
+        record = {}
+        for name, column in self.columns.items():
+            value = column.get(position)
+            if value is not MISSING:
+                record[name] = value
+        return record
+    
+    def rows(self) -> List[Dict]:
+        return [self.row(p) for p in self.positions()]
+    
+    def value(self, position: int, column: str):
+        column = self.columns.get(column)
+        if column is None:
+            return None
+        value = column.get(position)
+        return None if value is MISSING else value
+    
+    def values(self, column: str) -> List[Any]:
+        """column's value at every position (deleted slots included), decoded in bulk"""
+        column = self.columns.get(column)
+        return [None] * self.length if column is None else column.to_list()
+    
+    def copy(self) -> 'ColumnStore':
+        clone = ColumnStore()
+        clone.columns = {name: column.copy() for name, column in self.columns.items()}
+        clone.length = self.length
+        clone.deleted = set(self.deleted)
+        return clone
+    
+    def update(self, position: int, updates: Dict) -> Dict:
+        for name, value in updates.items():
+            self._column_for(name, value).set(position, value)
+        return self.row(position)
+    
+    def delete(self, position: int) -> Dict:
+        record = self.row(position)
+        self.deleted.add(position)
+        return record
+    
+    def scan_eq(self, column: str, value: Any) -> List[int]:
+        if column not in self.columns:
+            return list(self.positions()) if value is None else []
+        hits = self.columns[column].scan_eq(value)
+        if self.deleted:
+            hits = [p for p in hits if p not in self.deleted]
+        return hits
+    
+    def value_counts(self, column: str, positions=None) -> Dict[Any, int]:
+        if column not in self.columns:
+            count = self.count() if positions is None else len(positions)
+            return {None: count} if count else {}
+        counts = self.columns[column].value_counts(positions)
+        if positions is None and self.deleted:
+            # Whole-column tallies include deleted slots; take them back out
+            for p in self.deleted:
+                key = self.value(p, column)
+                counts[key] -= 1
+                if not counts[key]:
+                    del counts[key]
+        return counts
+    
+    def nbytes(self) -> int:
+        return sum(column.nbytes() for column in self.columns.values())
+
+STORAGE_BACKENDS = {'rows': RowStore, 'columnar': ColumnStore}
+
+# Hash indexes declared on the mock tables by default, mirroring the
+# idx_* indexes in lib/comprehensive-supabase-setup.sql
+DEFAULT_INDEXES = {
+    'user_profiles': ['user_id', 'username'],
+    'bar_likes': ['user_id', 'bar_id'],
+    'user_achievements': ['user_id', 'achievement_id'],
+    'global_bar_likes': ['bar_id'],
+    'bar_time_slot_likes': ['bar_id'],
+    'bar_weekday_likes': ['bar_id'],
+    'venue_interactions': ['user_id', 'venue_id', 'night_out_id'],
+    'user_interaction_aggregates': ['user_id']
+}
+
+# Ordered (btree-style) indexes, for ORDER BY ... LIMIT reads that should not sort
+DEFAULT_SORTED_INDEXES = {
+    'bar_likes': ['liked_at'],
+    'global_bar_likes': ['total_likes'],
+    'venue_interactions': ['timestamp']
+}
+
+# UNIQUE constraints from lib/comprehensive-supabase-setup.sql (the mock keys venues
+# by bar_id). They are opt-in because the tester re-inserts the same rows on purpose.
+SCHEMA_UNIQUE_CONSTRAINTS = {
+    'user_profiles': [('user_id',), ('username',), ('email',)],
+    'bar_likes': [('user_id', 'bar_id')],
+    'friends': [('user_id', 'friend_user_id')],
+    'user_achievements': [('user_id', 'achievement_id')],
+    'night_out_sessions': [('session_id',)]
+}
+
+# FOREIGN KEY (table, column) REFERENCES (table, column) pairs from
+# lib/comprehensive-supabase-setup.sql, which select() embeds follow
+DEFAULT_FOREIGN_KEYS = [
+    (table_name, column, 'user_profiles', 'user_id')
+    for table_name, column in [
+        ('bar_likes', 'user_id'), ('friends', 'user_id'), ('friends', 'friend_user_id'),
+        ('friend_requests', 'from_user_id'), ('friend_requests', 'to_user_id'),
+        ('venue_interactions', 'user_id'), ('user_achievements', 'user_id'), ('user_stats', 'user_id'),
+        ('night_out_sessions', 'user_id'), ('user_interaction_aggregates', 'user_id'),
+        ('user_visited_venues', 'user_id'), ('user_night_outs', 'user_id')
+    ]
+]
+
+def _uuid4_batch(count: int):
+    """Yield count random version-4 UUID strings drawn from a single os.urandom call"""
+    digits = os.urandom(16 * count).hex()
+    for i in range(0, 32 * count, 32):
+        h = digits[i:i + 32]
+        # Stamp the version nibble and the RFC 4122 variant bits
+        yield f"{h[:8]}-{h[8:12]}-4{h[13:16]}-{'89ab'[int(h[16], 16) & 3]}{h[17:20]}-{h[20:]}"
+
+def _index_key(value: Any):
+    """Turn a column value into a hashable index key (lists/dicts are frozen)"""
+    if isinstance(value, list):
+        return tuple(_index_key(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _index_key(v)) for k, v in value.items()))
+    return value
+
+class HashIndex:
+    """Equality index mapping a column value to the sorted positions of its rows"""
+    def __init__(self, column: str):
+        self.column = column
+        self.buckets = {}
+        # Keys whose bucket lists this index owns after copy(); None means all of them
+        self.owned = None
+    
+    def copy(self) -> 'HashIndex':
+        """Copy sharing every bucket list until that bucket next changes"""
+        clone = copy.copy(self)
+        clone.buckets = dict(self.buckets)
+        clone.owned = set()
+        return clone
+    
+    def _bucket(self, key) -> List[int]:
+        """Mutable bucket for key, created if missing and unshared if copied"""
+        bucket = self.buckets.get(key)
+        if self.owned is None or key in self.owned:
+            if bucket is None:
+                bucket = self.buckets[key] = []
+            return bucket
+        self.owned.add(key)
+        bucket = self.buckets[key] = [] if bucket is None else list(bucket)
+        return bucket
+    
+    def add(self, value: Any, position: int):
+        bucket = self._bucket(_index_key(value))
+        # Inserts append in position order, so the common case stays O(1)
+        if not bucket or bucket[-1] < position:
+            bucket.append(position)
+        else:
+            bisect.insort(bucket, position)
+    
+    def remove(self, value: Any, position: int):
+        key = _index_key(value)
+        bucket = self.buckets.get(key)
+        if not bucket:
+            return
+        i = bisect.bisect_left(bucket, position)
+        if i < len(bucket) and bucket[i] == position:
+            bucket = self._bucket(key)
+            del bucket[i]
+            if not bucket:
+                del self.buckets[key]
+    
+    def extend(self, values, first_position: int):
+        """Index a batch of appended rows; their positions follow every indexed one"""
+        if self.owned is not None:
+            for position, value in enumerate(values, first_position):
+                HashIndex.add(self, value, position)
+            return
+        buckets = self.buckets
+        for position, value in enumerate(values, first_position):
+            key = _index_key(value) if isinstance(value, (list, dict)) else value
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = [position]
+            else:
+                bucket.append(position)
+    
+    def lookup(self, value: Any) -> List[int]:
+        return self.buckets.get(_index_key(value), [])
+
+class SortedIndex(HashIndex):
+    """Ordered index: hash buckets plus the distinct non-NULL keys kept sorted.
+    
+    Rows can then be walked in column order, so ORDER BY column LIMIT k costs
+    O(k) instead of a sort. Counter updates (+1/-1) only move a row between
+    neighbouring buckets.
+    """
+    def __init__(self, column: str):
+        super().__init__(column)
+        self.keys = []
+        # Cleared if the column ever mixes types that cannot be compared
+        self.sortable = True
+    
+    def copy(self) -> 'SortedIndex':
+        clone = super().copy()
+        clone.keys = list(self.keys)
+        return clone
+    
+    def _add_keys(self, keys):
+        if not self.sortable or not keys:
+            return
+        try:
+            if len(keys) > 64:
+                self.keys = sorted(itertools.chain(self.keys, keys))
+            else:
+                for key in keys:
+                    bisect.insort(self.keys, key)
+        except TypeError:
+            self.sortable = False
+    
+    def add(self, value: Any, position: int):
+        key = _index_key(value)
+        fresh = key is not None and key not in self.buckets
+        super().add(value, position)
+        if fresh:
+            self._add_keys([key])
+    
+    def remove(self, value: Any, position: int):
+        key = _index_key(value)
+        super().remove(value, position)
+        if self.sortable and key is not None and key not in self.buckets:
+            i = bisect.bisect_left(self.keys, key)
+            if i < len(self.keys) and self.keys[i] == key:
+                del self.keys[i]
+    
+    def extend(self, values, first_position: int):
+        if not self.buckets:
+            # Bulk build: every bucket key is new
+            super().extend(values, first_position)
+            self._add_keys([key for key in self.buckets if key is not None])
+            return
+        fresh = {_index_key(value) if isinstance(value, (list, dict)) else value for value in values}
+        # Probe the batch's keys; difference_update(dict) would walk every bucket
+        fresh = {key for key in fresh if key is not None and key not in self.buckets}
+        super().extend(values, first_position)
+        self._add_keys(fresh)
+    
+    def key_range(self, low: Optional[Tuple[Any, bool]] = None,
+                  high: Optional[Tuple[Any, bool]] = None) -> Tuple[int, int]:
+        """(start, stop) slice of the sorted keys within (value, inclusive) bounds, by bisection"""
+        keys = self.keys
+        start = 0
+        if low is not None:
+            start = (bisect.bisect_left if low[1] else bisect.bisect_right)(keys, low[0])
+        stop = len(keys)
+        if high is not None:
+            stop = (bisect.bisect_right if high[1] else bisect.bisect_left)(keys, high[0])
+        return start, max(start, stop)
+    
+    def ordered(self, desc: bool = False, nullsfirst: Optional[bool] = None,
+                start: int = 0, stop: Optional[int] = None, nulls: bool = True):
+        """Yield positions in ORDER BY column [DESC] order; ties stay in position order.
+        
+        start/stop restrict the walk to a key_range() slice; nulls=False skips NULL rows.
+        """
+        null_positions = self.buckets.get(None, []) if nulls else []
+        if desc if nullsfirst is None else nullsfirst:
+            yield from null_positions
+            null_positions = []
+        stop = len(self.keys) if stop is None else stop
+        for i in (range(stop - 1, start - 1, -1) if desc else range(start, stop)):
+            yield from self.buckets[self.keys[i]]
+        yield from null_positions
+
+# Index access methods accepted by MockSupabaseClient.create_index
+INDEX_METHODS = {'hash': HashIndex, 'btree': SortedIndex}
+
+class UniqueIndex:
+    """UNIQUE(columns) constraint; keys containing NULL never conflict, as in Postgres"""
+    def __init__(self, table_name: str, columns: Tuple[str, ...]):
+        self.columns = columns
+        self.name = f"{table_name}_{'_'.join(columns)}_key"
+        self.positions = {}
+    
+    def copy(self) -> 'UniqueIndex':
+        clone = copy.copy(self)
+        clone.positions = dict(self.positions)
+        return clone
+    
+    def key(self, get) -> Optional[tuple]:
+        key = tuple(_index_key(get(column)) for column in self.columns)
+        return None if any(part is None for part in key) else key
+    
+    def keys(self, records: List[Dict]) -> List[Optional[tuple]]:
+        """key() for a batch of records, with the per-record overhead hoisted out"""
+        columns = self.columns
+        keys = []
+        for record in records:
+            key = tuple([record.get(column) for column in columns])
+            if None in key:
+                key = None
+            else:
+                try:
+                    hash(key)
+                except TypeError:
+                    key = self.key(record.get)
+            keys.append(key)
+        return keys
+    
+    def violation(self, key: tuple) -> Dict[str, str]:
+        return {
+            'code': '23505',
+            'message': f'duplicate key value violates unique constraint "{self.name}"',
+            'details': f"Key ({', '.join(self.columns)})=({', '.join(map(str, key))}) already exists."
+        }
+
+class _HoldsLocks:
+    """Mixin for classes holding threading locks, which cannot be copied or pickled.
+    
+    Copies (copy.copy, copy.deepcopy, pickle) get fresh locks instead, made
+    by the factories in _LOCKS (attribute name -> factory).
+    """
+    _LOCKS: Dict[str, Any] = {}
+    
+    def __getstate__(self):
+        return {name: value for name, value in self.__dict__.items() if name not in self._LOCKS}
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        for name, factory in self._LOCKS.items():
+            setattr(self, name, factory())
+
+# Hour the app's day rolls over, as in supabase/functions/daily-chat-reset (5 AM in the UTC session zone)
+DAILY_ROLLOVER_HOUR = 5
+
+class DailyIndex(_HoldsLocks):
+    """Composite (columns..., local_day) index for once-per-day checks.
+    
+    local_day is the timestamp's UTC calendar day shifted back by rollover_hour,
+    as has_user_liked_bar_today() truncates NOW() in the session zone, so a
+    2 AM like still counts toward the previous night. Keys are bucketed per
+    day: a check is one dict lookup, and whole days expire at once when the
+    day rolls over.
+    """
+    _LOCKS = {'lock': threading.Lock}
+    
+    def __init__(self, columns: Tuple[str, ...], timestamp_column: str,
+                 rollover_hour: int = DAILY_ROLLOVER_HOUR, retain_days: int = 1):
+        self.columns = columns
+        self.timestamp_column = timestamp_column
+        self.rollover_hour = rollover_hour
+        self.retain_days = retain_days
+        self.days = {}
+        self.horizon = None
+        self._dates = {}
+        # Trigger applications and checks may come from several threads
+        self.lock = threading.Lock()
+    
+    def copy(self) -> 'DailyIndex':
+        clone = copy.copy(self)
+        clone.days = {day: dict(counts) for day, counts in self.days.items()}
+        clone._dates = dict(self._dates)
+        return clone
+    
+    def local_day(self, moment: Any = None) -> date:
+        """Local day of a timestamp (stored, ISO string or datetime); today by default"""
+        return self._day_of(_utc_now() if moment is None else _encode_timestamp(moment))
+    
+    def _day_of(self, raw: int) -> date:
+        number = (raw - self.rollover_hour * 3_600_000_000) // 86_400_000_000
+        day = self._dates.get(number)
+        if day is None:
+            day = self._dates[number] = _NAIVE_EPOCH.date() + timedelta(days=number)
+        return day
+    
+    def window(self, day: date) -> Tuple[datetime, datetime]:
+        """[start, end) of a local day, for the equivalent liked_at range query"""
+        start = datetime.combine(day, time(self.rollover_hour))
+        return start, start + timedelta(days=1)
+    
+    def _row_key(self, row: Dict) -> Optional[Tuple[date, tuple]]:
+        key = tuple([_index_key(row.get(column)) for column in self.columns])
+        stamp = row.get(self.timestamp_column) or row.get('created_at')
+        if None in key or stamp is None:
+            return None
+        try:
+            return self._day_of(_encode_timestamp(stamp)), key
+        except (TypeError, ValueError, OverflowError):
+            return None
+    
+    def since(self) -> int:
+        """Earliest stored timestamp that can still fall on a retained day"""
+        with self.lock:
+            self._roll(self.local_day())
+        return _encode_timestamp(self.window(self.horizon)[0])
+    
+    def _roll(self, today: date):
+        """Drop every day that fell out of the retention window"""
+        horizon = today - timedelta(days=self.retain_days - 1)
+        if self.horizon is None or horizon > self.horizon:
+            self.horizon = horizon
+            self.expire(horizon)
+    
+    def expire(self, before: date) -> int:
+        """Remove all days earlier than before in bulk; returns how many keys went with them"""
+        expired = [day for day in self.days if day < before]
+        return sum(len(self.days.pop(day)) for day in expired)
+    
+    def apply(self, client, event: str, old_rows: List[Dict], new_rows: List[Dict]):
+        """Statement trigger keeping the index in step with the table"""
+        entries = [(self._row_key(row), step) for rows, step in ((old_rows, -1), (new_rows, 1)) for row in rows]
+        with self.lock:
+            self._roll(self.local_day())
+            for entry, step in entries:
+                if entry is None or entry[0] < self.horizon:
+                    continue
+                day, key = entry
+                counts = self.days.setdefault(day, {})
+                remaining = counts.get(key, 0) + step
+                if remaining > 0:
+                    counts[key] = remaining
+                else:
+                    counts.pop(key, None)
+    
+    def count(self, values: tuple, moment: Optional[datetime] = None) -> int:
+        """Rows for the key on moment's local day (today by default)"""
+        day = self.local_day(moment)
+        with self.lock:
+            self._roll(self.local_day())
+            return self.days.get(day, {}).get(tuple(_index_key(v) for v in values), 0)
+    
+    def contains(self, values: tuple, moment: Optional[datetime] = None) -> bool:
+        return self.count(values, moment) > 0
+
+# Daily (columns..., local_day) indexes: table -> [(columns, timestamp column)]
+DEFAULT_DAILY_INDEXES = {
+    'bar_likes': [(('user_id', 'bar_id'), 'liked_at')]
+}
+
+# Snapshot file layout: magic, u64 header length, JSON header, then the raw
+# column buffers, each 8-byte aligned so they can be cast in place from an mmap
+SNAPSHOT_MAGIC = b'BBSNAP01'
+_SNAPSHOT_COLUMNS = {cls.__name__: cls for cls in (IntColumn, FloatColumn, BoolColumn,
+                                                   TimestampColumn, DictColumn, UUIDColumn)}
+
+def _aligned(offset: int) -> int:
+    return (offset + 7) & ~7
+
+def _snapshot_table(store: ColumnStore, blobs: List) -> Dict[str, Any]:
+    """Header entry for a columnar table; its buffers are queued on blobs as (offset, buffer)"""
+    def blob(buffer) -> List[int]:
+        size = memoryview(buffer).nbytes
+        offset = _aligned(blobs[-1][0] + memoryview(blobs[-1][1]).nbytes) if blobs else 0
+        blobs.append((offset, buffer))
+        return [offset, size]
+    
+    columns = {}
+    for name, column in store.columns.items():
+        if isinstance(column, ObjectColumn):
+            columns[name] = {
+                'type': 'ObjectColumn',
+                'untyped': column.untyped,
+                'values': [None if v is MISSING else v for v in column.values],
+                'absent': [p for p, v in enumerate(column.values) if v is MISSING]
+            }
+            continue
+        meta = {'type': type(column).__name__, 'values': blob(column.values),
+                'state': blob(column.state) if column.state is not None else None}
+        if isinstance(column, DictColumn):
+            meta['dictionary'] = column.dictionary
+        columns[name] = meta
+    return {'length': store.length, 'deleted': blob(array('q', sorted(store.deleted))), 'columns': columns}
+
+def _table_from_snapshot(meta: Dict[str, Any], buffer: memoryview) -> ColumnStore:
+    """ColumnStore whose typed columns are views straight into the snapshot buffer"""
+    store = ColumnStore()
+    store.length = meta['length']
+    offset, size = meta['deleted']
+    store.deleted = set(buffer[offset:offset + size].cast('q'))
+    for name, column_meta in meta['columns'].items():
+        if column_meta['type'] == 'ObjectColumn':
+            column = ObjectColumn(untyped=column_meta['untyped'])
+            column.values = column_meta['values']
+            for position in column_meta['absent']:
+                column.values[position] = MISSING
+        else:
+            column_type = _SNAPSHOT_COLUMNS[column_meta['type']]
+            offset, size = column_meta['values']
+            values = buffer[offset:offset + size].cast(column_type.typecode)
+            state = None
+            if column_meta['state'] is not None:
+                offset, size = column_meta['state']
+                state = buffer[offset:offset + size].cast('b')
+            column = column_type.from_buffers(values, state)
+            if isinstance(column, DictColumn):
+                column.dictionary = column_meta['dictionary']
+        store.columns[name] = column
+    return store
+
+class _CountedLock:
+    """Re-entrant lock that tallies its acquisitions and how many had to wait"""
+    __slots__ = ('lock', 'acquired', 'contended')
+    
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.acquired = 0
+        self.contended = 0
+    
+    def __enter__(self):
+        if not self.lock.acquire(blocking=False):
+            self.lock.acquire()
+            self.contended += 1
+        # Counted while holding the lock, so the tallies need no lock of their own
+        self.acquired += 1
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.lock.release()
+    
+    def __getstate__(self):
+        return self.acquired, self.contended
+    
+    def __setstate__(self, state):
+        self.lock = threading.RLock()
+        self.acquired, self.contended = state
+
+class LockManager(_HoldsLocks):
+    """Locks for a MockSupabaseClient shared by concurrent threads.
+    
+    Two levels, as in Postgres: a per-table latch held over every physical
+    read or write of a table's store and indexes, and row locks that trigger
+    functions hold across their read-modify-write of counter rows. A write
+    statement keeps its table's latch while its triggers run, so statements
+    on one table, trigger effects included, apply atomically and in order.
+    locking='sharded' stripes each table's row locks over `shards` locks by
+    key hash, so writers touching different keys proceed independently;
+    locking='table' maps every key to one lock. Locks are re-entrant and
+    always taken in shard order, and triggers only lock tables downstream of
+    the one that fired them, so the latches they add never form a cycle.
+    """
+    _LOCKS = {'_guard': threading.Lock}
+    
+    def __init__(self, mode: str = 'sharded', shards: int = 64):
+        if mode not in ('table', 'sharded'):
+            raise ValueError(f"Unknown locking mode: {mode}")
+        self.mode = mode
+        self.shards = shards if mode == 'sharded' else 1
+        self._guard = threading.Lock()
+        self._tables = {}
+    
+    def _locks(self, table_name: str) -> List[_CountedLock]:
+        """A table's row lock stripes, followed by its latch"""
+        locks = self._tables.get(table_name)
+        if locks is None:
+            with self._guard:
+                locks = self._tables.get(table_name)
+                if locks is None:
+                    locks = self._tables[table_name] = [_CountedLock() for _ in range(self.shards + 1)]
+        return locks
+    
+    def latch(self, table_name: str) -> _CountedLock:
+        return self._locks(table_name)[-1]
+    
+    @contextlib.contextmanager
+    def rows(self, table_name: str, keys):
+        """Hold the row locks covering keys (hashable row identifiers) of a table"""
+        stripes = self._locks(table_name)
+        held = [stripes[shard] for shard in sorted({hash(key) % self.shards for key in keys})]
+        for lock in held:
+            lock.__enter__()
+        try:
+            yield
+        finally:
+            for lock in reversed(held):
+                lock.__exit__()
+    
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Per-table lock acquisitions and how many of them had to wait"""
+        stats = {}
+        for table_name, locks in list(self._tables.items()):
+            stats[table_name] = {
+                'latch_acquired': locks[-1].acquired, 'latch_contended': locks[-1].contended,
+                'row_acquired': sum(lock.acquired for lock in locks[:-1]),
+                'row_contended': sum(lock.contended for lock in locks[:-1])
+            }
+        return stats
+
+class _WriteGate:
+    """Lets write statements run concurrently but holds new ones back while a
+    snapshot opens, so each statement (with the triggers it fires) lands wholly
+    before or wholly after every snapshot.
+    """
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.writers = 0
+        self.closing = False
+        self.local = threading.local()
+    
+    def __reduce__(self):
+        # A copy starts with no statements in flight
+        return _WriteGate, ()
+    
+    def __enter__(self):
+        depth = getattr(self.local, 'depth', 0)
+        if not depth:
+            with self.condition:
+                while self.closing:
+                    self.condition.wait()
+                self.writers += 1
+        self.local.depth = depth + 1
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.local.depth -= 1
+        if not self.local.depth:
+            with self.condition:
+                self.writers -= 1
+                if not self.writers:
+                    self.condition.notify_all()
+    
+    @contextlib.contextmanager
+    def closed(self):
+        """Wait out the statements in flight (other than this thread's) and admit no new ones"""
+        own = 1 if getattr(self.local, 'depth', 0) else 0
+        with self.condition:
+            while self.closing:
+                self.condition.wait()
+            self.closing = True
+            while self.writers > own:
+                self.condition.wait()
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.closing = False
+                self.condition.notify_all()
+
+class VersionLog(_HoldsLocks):
+    """Old row versions kept for open snapshots (MVCC).
+    
+    Writers change rows in place; while any snapshot is open they first log
+    the row's before-image, stamped with the current epoch. A snapshot opened
+    at epoch E sees, at each position below the table length it recorded,
+    the before-image of the first change stamped E or later, or else the live
+    row. Inserts need no log entry, as positions are never reused. Versions
+    older than every open snapshot are dropped as snapshots close.
+    """
+    _LOCKS = {'_guard': threading.Lock}
+    
+    def __init__(self):
+        self.epoch = 0
+        # epoch -> number of snapshots open at it
+        self.open = {}
+        # table -> {position: [(epoch, row before the change)]}, oldest first
+        self.changes = {}
+        self.gate = _WriteGate()
+        self._guard = threading.Lock()
+    
+    def register(self) -> int:
+        with self._guard:
+            self.epoch += 1
+            self.open[self.epoch] = self.open.get(self.epoch, 0) + 1
+            return self.epoch
+    
+    def release(self, epoch: int) -> Optional[int]:
+        """Close a snapshot, returning the oldest epoch still open (None when none are)"""
+        with self._guard:
+            self.open[epoch] -= 1
+            if not self.open[epoch]:
+                del self.open[epoch]
+            return min(self.open) if self.open else None
+    
+    def record(self, table_name: str, position: int, before: Dict):
+        self.changes.setdefault(table_name, {}).setdefault(position, []).append((self.epoch, before))
+    
+    def changed(self, table_name: str, epoch: int) -> List[int]:
+        """Positions changed since a snapshot opened at epoch"""
+        return [position for position, entries in self.changes.get(table_name, {}).items()
+                if entries[-1][0] >= epoch]
+    
+    def collect(self, table_name: str, horizon: Optional[int]) -> int:
+        """Drop a table's versions older than horizon (all of them for None); returns how many"""
+        if horizon is None:
+            return sum(len(entries) for entries in self.changes.pop(table_name, {}).values())
+        table_changes = self.changes.get(table_name, {})
+        dropped = 0
+        for position, entries in list(table_changes.items()):
+            keep = next((i for i, (stamp, _) in enumerate(entries) if stamp >= horizon), len(entries))
+            if keep == len(entries):
+                del table_changes[position]
+            elif keep:
+                table_changes[position] = entries[keep:]
+            dropped += keep
+        return dropped
+    
+    def retained(self) -> int:
+        """Old row versions currently kept"""
+        return sum(len(entries) for table_changes in list(self.changes.values())
+                   for entries in list(table_changes.values()))
+
+# Test a query runs for, when set by QueryLog.labelled() (async tasks inherit it)
+_QUERY_TEST = contextvars.ContextVar('query_test', default=None)
+
+class QueryLog(_HoldsLocks):
+    """Opt-in per-query instrumentation for a MockSupabaseClient and its forks.
+    
+    Every query's access path, rows scanned vs. returned, wall time and
+    calling test are folded into totals per query shape (statement, table
+    and filter columns); queries slower than slow_ms are also kept whole.
+    A write's time includes the trigger queries it fires, which are logged
+    as queries of their own. Async reads count their cooperative yields;
+    a cursor() or keyset() read is one query, timed over producing its rows.
+    """
+    _LOCKS = {'_guard': threading.Lock}
+    
+    def __init__(self, slow_ms: float = 10.0, keep: int = 1000):
+        self.slow_ms = slow_ms
+        # shape -> running totals, in first-seen order
+        self.shapes = {}
+        # The latest `keep` slow queries
+        self.slow = deque(maxlen=keep)
+        self._guard = threading.Lock()
+    
+    @contextlib.contextmanager
+    def labelled(self, test: str):
+        """Attribute the queries run inside the block to test"""
+        token = _QUERY_TEST.set(test)
+        try:
+            yield self
+        finally:
+            _QUERY_TEST.reset(token)
+    
+    @staticmethod
+    def _caller() -> str:
+        """The labelled test, else the nearest test_* function on the stack"""
+        test = _QUERY_TEST.get()
+        if test is not None:
+            return test
+        frame = sys._getframe(3)
+        while frame is not None:
+            if frame.f_code.co_name.startswith('test_'):
+                return frame.f_code.co_name
+            frame = frame.f_back
+        return '-'
+    
+    def record(self, table: 'MockTable', statement: str, seconds: float, result: Any):
+        if isinstance(result, MockResponse):
+            data = result.data
+            returned = len(data) if isinstance(data, list) else int(data is not None)
+        elif isinstance(result, int):
+            returned = result
+        else:
+            returned = len(result)
+        plan = table.plan or {}
+        access = plan.get('access', statement if statement in ('insert', 'upsert') else '-')
+        if 'column' in plan:
+            access = f"{access}({plan['column']})"
+        filters = ', '.join(f'{field} {op}' for op, field, _ in table.filters)
+        shape = f"{statement} {table.table_name}" + (f" where {filters}" if filters else '')
+        ms = seconds * 1000
+        with self._guard:
+            totals = self.shapes.get(shape)
+            if totals is None:
+                totals = self.shapes[shape] = {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'scanned': 0,
+                                               'returned': 0, 'access': Counter(), 'tests': Counter()}
+            test = self._caller()
+            totals['calls'] += 1
+            totals['total_ms'] += ms
+            totals['max_ms'] = max(totals['max_ms'], ms)
+            totals['scanned'] += table.scanned
+            totals['returned'] += returned
+            totals['access'][access] += 1
+            totals['tests'][test] += 1
+            if ms >= self.slow_ms:
+                self.slow.append({'shape': shape, 'access': access, 'scanned': table.scanned,
+                                  'returned': returned, 'ms': ms, 'test': test})
+    
+    def summary(self) -> List[Dict[str, Any]]:
+        """Per-shape totals, most total time first"""
+        with self._guard:
+            shapes = [dict(totals, shape=shape, access=dict(totals['access']), tests=dict(totals['tests']))
+                      for shape, totals in self.shapes.items()]
+        return sorted(shapes, key=lambda totals: -totals['total_ms'])
+    
+    def report(self, limit: int = 20) -> str:
+        """End-of-run table of the costliest query shapes, then the slowest queries"""
+        lines = [f"{'calls':>7} {'total ms':>10} {'max ms':>8} {'scanned':>10} {'returned':>10}  {'access':<28} shape"]
+        for totals in self.summary()[:limit]:
+            access = ', '.join(totals['access'])
+            # Reading far more rows than it returns is what a missing index looks like
+            flag = '⚠️ ' if totals['scanned'] > 10 * max(1, totals['returned']) and 'scan' in access else ''
+            lines.append(f"{totals['calls']:>7} {totals['total_ms']:>10.1f} {totals['max_ms']:>8.2f} "
+                         f"{totals['scanned']:>10,} {totals['returned']:>10,}  {access[:28]:<28} {flag}{totals['shape']}")
+        slowest = sorted(self.slow, key=lambda query: -query['ms'])[:limit]
+        if slowest:
+            lines.append(f"\n🐢 slowest queries (>= {self.slow_ms:g} ms):")
+            lines.extend(f"{query['ms']:>9.2f} ms  {query['scanned']:>8,} scanned {query['returned']:>8,} returned  "
+                         f"{query['access']:<24} {query['shape']}  [{query['test']}]" for query in slowest)
+        return '\n'.join(lines)
 
 # Mock Supabase client for testing
 class MockSupabaseClient:
-    def __init__(self):
+    def __init__(self, indexes: Optional[Dict[str, List[str]]] = None, storage: str = 'rows',
+                 unique_constraints: Optional[Dict[str, List[Tuple[str, ...]]]] = None,
+                 triggers: bool = True, sorted_indexes: Optional[Dict[str, List[str]]] = None,
+                 rollover_hour: int = DAILY_ROLLOVER_HOUR, locking: Optional[str] = None,
+                 lock_shards: int = 64, query_log: Optional[QueryLog] = None):
+        if storage not in STORAGE_BACKENDS:
+            raise ValueError(f"Unknown storage backend: {storage}")
+        self.storage = storage
+        # None: single-threaded use; 'table' or 'sharded' for concurrent writers
+        self.locks = LockManager(locking, lock_shards) if locking else None
+        # Shared with forks, so one log covers a whole test run
+        self.query_log = query_log
+        self.versions = VersionLog()
+        # Index declarations of snapshot-loaded tables, built on first access
+        self._pending_indexes = {}
+        # Tables (with their indexes) shared with a fork(), copied before the first write
+        self._shared = set()
         self.data = {
-            'user_profiles': [],
-            'bar_likes': [],
-            'user_achievements': []
+            'user_profiles': STORAGE_BACKENDS[storage](),
+            'bar_likes': STORAGE_BACKENDS[storage](),
+            'user_achievements': STORAGE_BACKENDS[storage]()
         }
+        self.indexes = {}
+        for table_name, columns in (DEFAULT_INDEXES if indexes is None else indexes).items():
+            for column in columns:
+                self.create_index(table_name, column)
+        for table_name, columns in (DEFAULT_SORTED_INDEXES if sorted_indexes is None else sorted_indexes).items():
+            for column in columns:
+                self.create_index(table_name, column, using='btree')
+        self.unique_indexes = {}
+        for table_name, constraints in (unique_constraints or {}).items():
+            for columns in constraints:
+                self.add_unique_constraint(table_name, columns)
+        self.triggers = {}
+        self.daily_indexes = {}
+        for table_name, definitions in DEFAULT_DAILY_INDEXES.items():
+            for columns, timestamp_column in definitions:
+                self.create_daily_index(table_name, columns, timestamp_column, rollover_hour)
+        if triggers:
+            for table_name, events, function in DEFAULT_TRIGGERS:
+                self.create_trigger(table_name, events, function)
+            # Tables the triggers maintain are keyed like their PRIMARY KEYs in SQL
+            self.add_unique_constraint('global_bar_likes', ('bar_id',))
+            self.add_unique_constraint('bar_time_slot_likes', ('bar_id', 'like_time_slot'))
+            self.add_unique_constraint('bar_weekday_likes', ('bar_id', 'weekday'))
+            self.add_unique_constraint('user_interaction_aggregates', ('user_id',))
+            self.add_unique_constraint('user_visited_venues', ('user_id', 'venue_id'))
+            self.add_unique_constraint('user_night_outs', ('user_id', 'night_out_id'))
+        self.functions = dict(DEFAULT_FUNCTIONS)
+        self.foreign_keys = list(DEFAULT_FOREIGN_KEYS)
         self.auth_user = None
     
+    def _store(self, table_name: str):
+        store = self.data.get(table_name)
+        if store is None:
+            # setdefault, so racing threads still end up with a single store
+            store = self.data.setdefault(table_name, STORAGE_BACKENDS[self.storage]())
+        return store
+    
     def from_table(self, table_name: str):
-        return MockTable(self.data.get(table_name, []), table_name, self)
+        if table_name in self._pending_indexes:
+            with self.locks.latch(table_name) if self.locks else contextlib.nullcontext():
+                self._ensure_indexed(table_name)
+        return MockTable(self._store(table_name), table_name, self)
+    
+    def row_locks(self, table_name: str, keys):
+        """Context holding the row locks for keys of a table (a no-op without locking).
+        
+        Wrap a read-modify-write of those rows in it to make the whole cycle atomic.
+        """
+        if self.locks is None:
+            return contextlib.nullcontext()
+        return self.locks.rows(table_name, keys)
+    
+    def snapshot(self) -> 'Snapshot':
+        """Open a snapshot-isolated, read-only transaction on the current state.
+        
+        Reads through it see every table as of this moment, whatever is written
+        meanwhile, and never hold a table's latch for longer than one batch of
+        rows. Use it as a context manager, or close() it, so the row versions
+        it pins can be garbage-collected.
+        """
+        with self.versions.gate.closed() if self.locks is not None else contextlib.nullcontext():
+            epoch = self.versions.register()
+            lengths = {table_name: len(store) for table_name, store in list(self.data.items())}
+        return Snapshot(self, epoch, lengths)
+    
+    def _release_snapshot(self, epoch: int) -> int:
+        """Close a snapshot and drop the versions no open snapshot can see; returns how many"""
+        horizon = self.versions.release(epoch)
+        dropped = 0
+        for table_name in list(self.versions.changes):
+            with self.locks.latch(table_name) if self.locks else contextlib.nullcontext():
+                dropped += self.versions.collect(table_name, horizon)
+        return dropped
+    
+    def fork(self) -> 'MockSupabaseClient':
+        """Copy-on-write child client.
+        
+        Parent and child share every table, index and unique constraint until
+        one of them writes to a table; that side then takes its own copy of the
+        table. Triggers, functions and daily indexes (one day of keys) are
+        copied up front.
+        """
+        child = copy.copy(self)
+        child.data = dict(self.data)
+        child.indexes = {table_name: dict(indexes) for table_name, indexes in self.indexes.items()}
+        child.unique_indexes = {table_name: dict(constraints)
+                                for table_name, constraints in self.unique_indexes.items()}
+        child._pending_indexes = {table_name: tuple(list(declarations) for declarations in pending)
+                                  for table_name, pending in self._pending_indexes.items()}
+        triggers = {}
+        child.daily_indexes = {}
+        for table_name, table_daily in self.daily_indexes.items():
+            child.daily_indexes[table_name] = {}
+            for columns, index in table_daily.items():
+                clone = child.daily_indexes[table_name][columns] = index.copy()
+                triggers[index.apply] = clone.apply
+        child.triggers = {key: [triggers.get(function, function) for function in functions]
+                          for key, functions in self.triggers.items()}
+        child.functions = dict(self.functions)
+        if self.locks is not None:
+            child.locks = LockManager(self.locks.mode, self.locks.shards)
+        # The parent's open snapshots do not extend to the child
+        child.versions = VersionLog()
+        self._shared.update(self.data)
+        child._shared = set(self._shared)
+        return child
+    
+    def _own(self, table_name: str):
+        """Take private copies of a table shared with a fork before changing it"""
+        if table_name not in self._shared:
+            return
+        self._ensure_indexed(table_name)
+        self._shared.discard(table_name)
+        self.data[table_name] = self.data[table_name].copy()
+        # Swap the copies into the existing per-table dicts, which open MockTables hold
+        for registry in (self.indexes, self.unique_indexes):
+            table_indexes = registry.get(table_name, {})
+            for key, index in table_indexes.items():
+                table_indexes[key] = index.copy()
+    
+    def daily_index(self, table_name: str, columns: Tuple[str, ...]) -> DailyIndex:
+        self.from_table(table_name)
+        return self.daily_indexes[table_name][tuple(columns)]
+    
+    def save_snapshot(self, path: str) -> int:
+        """Write every table, plus its index declarations, to a binary snapshot; returns its size.
+        
+        Indexes are rebuilt when the snapshot is loaded rather than stored.
+        """
+        blobs = []
+        header = {'tables': {}, 'indexes': {}, 'unique_constraints': {}, 'daily_indexes': {}}
+        for table_name in self.data:
+            self._ensure_indexed(table_name)
+            store = self.data[table_name]
+            if not isinstance(store, ColumnStore):
+                columnar = ColumnStore()
+                columnar.extend(store.rows())
+                store = columnar
+            header['tables'][table_name] = _snapshot_table(store, blobs)
+        for table_name, table_indexes in self.indexes.items():
+            header['indexes'][table_name] = [
+                [column, 'btree' if isinstance(index, SortedIndex) else 'hash']
+                for column, index in table_indexes.items()
+            ]
+        for table_name, constraints in self.unique_indexes.items():
+            header['unique_constraints'][table_name] = [list(columns) for columns in constraints]
+        for table_name, table_daily in self.daily_indexes.items():
+            header['daily_indexes'][table_name] = [
+                [list(columns), index.timestamp_column, index.rollover_hour]
+                for columns, index in table_daily.items()
+            ]
+        encoded = json.dumps(header, separators=(',', ':')).encode()
+        base = _aligned(len(SNAPSHOT_MAGIC) + 8 + len(encoded))
+        with open(path, 'wb') as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(struct.pack('<Q', len(encoded)))
+            f.write(encoded)
+            for offset, buffer in blobs:
+                f.write(bytes(base + offset - f.tell()))
+                f.write(buffer)
+            return f.tell()
+    
+    @classmethod
+    def load_snapshot(cls, path: str, storage: str = 'columnar', **options) -> 'MockSupabaseClient':
+        """Client warm-started from save_snapshot() output.
+        
+        Columnar tables memory-map the file and read column buffers in place
+        (copying a column only when it is first written); storage='rows'
+        materializes the rows instead. Indexes are rebuilt per table on first use.
+        """
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mapped[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a MockSupabaseClient snapshot")
+        (header_size,) = struct.unpack_from('<Q', mapped, len(SNAPSHOT_MAGIC))
+        start = len(SNAPSHOT_MAGIC) + 8
+        header = json.loads(mapped[start:start + header_size])
+        buffer = memoryview(mapped)[_aligned(start + header_size):]
+        
+        client = cls(storage=storage, **options)
+        for table_name, meta in header['tables'].items():
+            store = _table_from_snapshot(meta, buffer)
+            if storage != 'columnar':
+                rows = STORAGE_BACKENDS[storage]()
+                rows.extend(store.rows())
+                store = rows
+            client._attach_store(table_name, store, (
+                [tuple(declaration) for declaration in header['indexes'].get(table_name, [])],
+                [tuple(columns) for columns in header['unique_constraints'].get(table_name, [])],
+                [(tuple(columns), timestamp_column, rollover_hour)
+                 for columns, timestamp_column, rollover_hour in header['daily_indexes'].get(table_name, [])]
+            ))
+        return client
+    
+    def _attach_store(self, table_name: str, store, declarations: Tuple[List, List, List]):
+        """Swap in a loaded table, deferring its indexes (the client's and the snapshot's)"""
+        self.data[table_name] = store
+        indexes, constraints, daily = self._pending_indexes.setdefault(table_name, ([], [], []))
+        for column, index in self.indexes.pop(table_name, {}).items():
+            indexes.append((column, 'btree' if isinstance(index, SortedIndex) else 'hash'))
+        constraints.extend(self.unique_indexes.pop(table_name, {}))
+        for columns, index in self.daily_indexes.pop(table_name, {}).items():
+            for functions in self.triggers.values():
+                if index.apply in functions:
+                    functions.remove(index.apply)
+            daily.append((columns, index.timestamp_column, index.rollover_hour))
+        indexes.extend(declarations[0])
+        constraints.extend(declarations[1])
+        daily.extend(declarations[2])
+    
+    def _ensure_indexed(self, table_name: str):
+        pending = self._pending_indexes.pop(table_name, None)
+        if pending is None:
+            return
+        indexes, constraints, daily = (dict.fromkeys(declarations) for declarations in pending)
+        for column, using in indexes:
+            self.create_index(table_name, column, using)
+        for columns in constraints:
+            self.add_unique_constraint(table_name, columns)
+        for columns, timestamp_column, rollover_hour in daily:
+            self.create_daily_index(table_name, columns, timestamp_column, rollover_hour)
+    
+    def create_index(self, table_name: str, column: str, using: str = 'hash'):
+        """Declare a hash (or ordered 'btree') index on a table column, indexing any existing rows"""
+        if using not in INDEX_METHODS:
+            raise ValueError(f"Unknown index method: {using}")
+        table_indexes = self.indexes.setdefault(table_name, {})
+        existing = table_indexes.get(column)
+        # A btree serves equality lookups too, so it may replace a hash index
+        if existing is None or (using == 'btree' and not isinstance(existing, SortedIndex)):
+            index = INDEX_METHODS[using](column)
+            store = self._store(table_name)
+            values = store.values(column)
+            if store.count() == len(store):
+                index.extend(values, 0)
+            else:
+                for position in store.positions():
+                    index.add(values[position], position)
+            table_indexes[column] = index
+        return table_indexes[column]
+    
+    def create_daily_index(self, table_name: str, columns: Tuple[str, ...], timestamp_column: str,
+                           rollover_hour: int = DAILY_ROLLOVER_HOUR) -> DailyIndex:
+        """Declare a (columns..., local_day) index, kept current by a table trigger"""
+        columns = tuple(columns)
+        table_daily = self.daily_indexes.setdefault(table_name, {})
+        if columns not in table_daily:
+            index = DailyIndex(columns, timestamp_column, rollover_hour)
+            store = self._store(table_name)
+            # Only rows on a retained day matter; anything else would be expired at once
+            since = index.since()
+            stamps = store.values(timestamp_column)
+            recent = [position for position in store.positions()
+                      if not isinstance(stamps[position], int) or stamps[position] >= since]
+            read = columns + (timestamp_column, 'created_at')
+            index.apply(self, 'INSERT', [], [{column: store.value(position, column) for column in read}
+                                             for position in recent])
+            self.create_trigger(table_name, ('INSERT', 'UPDATE', 'DELETE'), index.apply)
+            table_daily[columns] = index
+        return table_daily[columns]
+    
+    def add_unique_constraint(self, table_name: str, columns: Tuple[str, ...]):
+        """Declare UNIQUE(columns) on a table; fails if existing rows already collide"""
+        columns = tuple(columns)
+        table_constraints = self.unique_indexes.setdefault(table_name, {})
+        if columns not in table_constraints:
+            store = self._store(table_name)
+            index = UniqueIndex(table_name, columns)
+            values = {column: store.values(column) for column in columns}
+            for position in store.positions():
+                key = index.key(lambda column: values[column][position])
+                if key is None:
+                    continue
+                if key in index.positions:
+                    raise ValueError(index.violation(key)['message'])
+                index.positions[key] = position
+            table_constraints[columns] = index
+        return table_constraints[columns]
+    
+    def create_trigger(self, table_name: str, events, function):
+        """Register an AFTER ... FOR EACH STATEMENT trigger.
+        
+        function(client, event, old_rows, new_rows) runs after every INSERT,
+        UPDATE or DELETE in events, with the affected rows as transition tables.
+        """
+        for event in ([events] if isinstance(events, str) else events):
+            self.triggers.setdefault((table_name, event), []).append(function)
+    
+    def _fire_triggers(self, table_name: str, event: str, old_rows: List[Dict], new_rows: List[Dict]):
+        if not (old_rows or new_rows):
+            return
+        for function in self.triggers.get((table_name, event), []):
+            function(self, event, old_rows, new_rows)
+    
+    def rpc(self, function_name: str, params: Optional[Dict[str, Any]] = None):
+        """Call one of the mock's Python mirrors of the SQL functions"""
+        function = self.functions.get(function_name)
+        if function is None:
+            return MockResponse({'data': None, 'error': {
+                'code': 'PGRST202',
+                'message': f'Could not find the function public.{function_name} in the schema cache'
+            }})
+        return MockResponse({'data': function(self, **(params or {})), 'error': None})
     
     def set_auth_user(self, user_id: str, email: str = "test@example.com"):
         self.auth_user = {
@@ -35,55 +1829,910 @@ class MockSupabaseClient:
     def get_auth_user(self):
         return {'data': {'user': self.auth_user}, 'error': None}
 
+def _null_safe(compare):
+    """Wrap a comparison so NULLs and incomparable values never match, as in SQL"""
+    def check(value, operand):
+        if value is None:
+            return False
+        try:
+            return compare(value, operand)
+        except TypeError:
+            return False
+    return check
+
+# Filter operators understood by MockTable, keyed by their PostgREST names
+FILTER_OPERATORS = {
+    'eq': lambda value, operand: value == operand,
+    'neq': _null_safe(operator.ne),
+    'gt': _null_safe(operator.gt),
+    'gte': _null_safe(operator.ge),
+    'lt': _null_safe(operator.lt),
+    'lte': _null_safe(operator.le),
+    'in': lambda value, operand: value is not None and _index_key(value) in operand,
+    'is': lambda value, operand: value is operand
+}
+
+# One select-list item: [alias:]name[!hint][->key|->>key ...][::cast], before any (embedded select)
+_SELECT_ITEM = re.compile(r'(?:(?P<alias>\w+):)?(?P<name>\w+)(?:!(?P<hint>\w+))?'
+                          r'(?P<path>(?:->>?\w+)*)(?:::(?P<cast>\w+))?')
+
+def _as_text(value: Any) -> str:
+    """value as Postgres renders it as text: JSON for objects and arrays, lowercase booleans"""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value).lower() if isinstance(value, bool) else str(value)
+
+SELECT_CASTS = {'text': _as_text, 'int': int, 'integer': int, 'bigint': int, 'float': float, 'numeric': float}
+
+def _select_error(fields: str, detail: str) -> Dict[str, str]:
+    return {'code': 'PGRST100', 'message': f'"failed to parse select parameter ({fields})" ({detail})'}
+
+@functools.lru_cache(maxsize=1024)
+def _parse_select(fields: str) -> Tuple:
+    """Split a PostgREST select list into (alias, name, hint, path, cast, inner) items.
+    
+    Raises ValueError with a PostgREST error dict for malformed input.
+    """
+    items, depth, start = [], 0, 0
+    for i, char in enumerate(fields + ','):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+            if depth < 0:
+                raise ValueError(_select_error(fields, "unexpected ')'"))
+        elif char == ',' and not depth:
+            items.append(fields[start:i].strip())
+            start = i + 1
+    if depth:
+        raise ValueError(_select_error(fields, "unclosed '('"))
+    parsed = []
+    for item in items:
+        if item == '*':
+            parsed.append(('*', '*', None, (), None, None))
+            continue
+        head, embedded, inner = item.partition('(')
+        match = _SELECT_ITEM.fullmatch(re.sub(r'\s+', '', head))
+        if match is None or embedded and not inner.endswith(')'):
+            raise ValueError(_select_error(fields, f"unexpected {item!r}"))
+        cast = match['cast']
+        if cast is not None and cast not in SELECT_CASTS:
+            raise ValueError({'code': '42704', 'message': f'type "{cast}" does not exist'})
+        path = tuple((step.lstrip('>'), step.startswith('>>')) for step in match['path'].split('-')[1:])
+        parsed.append((match['alias'], match['name'], match['hint'], path, cast, inner[:-1] if embedded else None))
+    return tuple(parsed)
+
+def _json_step(value: Any, key: str, as_text: bool) -> Any:
+    """value->key (or value->>key, as text) on a JSON object or array value"""
+    if isinstance(value, dict):
+        value = value.get(key)
+    elif isinstance(value, list) and key.lstrip('-').isdigit() and -len(value) <= int(key) < len(value):
+        value = value[int(key)]
+    else:
+        value = None
+    if as_text and value is not None and not isinstance(value, str):
+        value = _as_text(value)
+    return value
+
+class Projection:
+    """A parsed select list, read straight from a table's store.
+    
+    Supports PostgREST's `*`, `alias:column`, `column->key->>key` JSON paths,
+    `column::type` casts and embedded related tables (`alias:table!fk(...)`,
+    following foreign_keys in either direction). Only selected columns are
+    read, so wide rows are never copied whole.
+    """
+    def __init__(self, foreign_keys: List[Tuple[str, str, str, str]], table_name: str, fields: str):
+        self.star = False
+        self.columns = []
+        self.embeds = []
+        for alias, name, hint, path, cast, inner in _parse_select(fields):
+            if name == '*':
+                self.star = True
+            elif inner is None:
+                key = alias or (path[-1][0] if path else name)
+                self.columns.append((key, name, path, cast))
+            else:
+                local, remote, many = self._relationship(foreign_keys, table_name, name, hint)
+                self.embeds.append((alias or name, name, local, remote, many,
+                                    Projection(foreign_keys, name, inner or '*')))
+    
+    @staticmethod
+    def _relationship(foreign_keys, table_name: str, other: str, hint: Optional[str]) -> Tuple[str, str, bool]:
+        """(column here, column there, to-many?) of the one foreign key linking the two tables"""
+        found = []
+        for from_table, from_column, to_table, to_column in foreign_keys:
+            if hint not in (None, from_column):
+                continue
+            if from_table == table_name and to_table == other:
+                found.append((from_column, to_column, False))
+            elif from_table == other and to_table == table_name:
+                found.append((to_column, from_column, True))
+        if len(found) != 1:
+            code, reason = ('PGRST200', 'Could not find a relationship') if not found else \
+                ('PGRST201', 'Could not embed because more than one relationship was found')
+            raise ValueError({'code': code, 'message': f"{reason} between '{table_name}' and '{other}' in the schema cache"})
+        return found[0]
+    
+    def read(self, store, positions) -> Tuple[List[Dict], List[List[Any]]]:
+        """Projected rows at positions, plus each embed's join-column values for embed().
+        
+        A value its ::cast cannot convert raises ValueError with a 22P02 error dict.
+        """
+        rows = []
+        value_of = store.value
+        for position in positions:
+            if self.star:
+                row = _present(store.row(position))
+                row = dict(row) if self.columns or self.embeds else row
+            else:
+                row = {}
+            for key, column, path, cast in self.columns:
+                value = value_of(position, column)
+                if type(value) is int and column in TIMESTAMP_COLUMNS:
+                    value = _format_timestamp(value)
+                for step, as_text in path:
+                    value = _json_step(value, step, as_text)
+                if cast is not None and value is not None:
+                    try:
+                        value = SELECT_CASTS[cast](value)
+                    except (TypeError, ValueError):
+                        raise ValueError({'code': '22P02', 'message': f'invalid input syntax for type {cast}: '
+                                                                      f'"{_as_text(value)}"'})
+                row[key] = value
+            rows.append(row)
+        joins = [[value_of(position, local) for position in positions] for _, _, local, _, _, _ in self.embeds]
+        return rows, joins
+    
+    def embed(self, related, rows: List[Dict], joins: List[List[Any]]):
+        """Fill in embedded tables, reading each with one IN query through related(table_name)"""
+        for (key, table_name, _, remote, many, inner), values in zip(self.embeds, joins):
+            wanted = list(dict.fromkeys(value for value in values if value is not None))
+            groups = {}
+            if wanted:
+                table = related(table_name).in_(remote, wanted)
+                with table._latched():
+                    positions = table._matching_positions()
+                    matches, inner_joins = inner.read(table.data, positions)
+                    keys = [table.data.value(position, remote) for position in positions]
+                inner.embed(related, matches, inner_joins)
+                for match_key, match in zip(keys, matches):
+                    groups.setdefault(match_key, []).append(match)
+            for row, value in zip(rows, values):
+                found = groups.get(value, [])
+                row[key] = found if many else (found[0] if found else None)
+
+# Rows a cursor() or keyset() read materializes at a time
+CURSOR_BATCH = 1000
+
+class _TableLatch:
+    """Holds a table's latch (when the client locks) over one physical read or write.
+    
+    On entry the MockTable re-reads its store, which a fork's copy-on-write may
+    have replaced; writes first take a private copy of a table still shared.
+    """
+    __slots__ = ('table', 'write', 'lock')
+    
+    def __init__(self, table: 'MockTable', write: bool):
+        self.table = table
+        self.write = write
+        locks = table.client.locks
+        self.lock = locks.latch(table.table_name) if locks is not None else None
+    
+    def __enter__(self):
+        if self.lock is not None:
+            self.lock.__enter__()
+        table = self.table
+        try:
+            if self.write:
+                table.client._own(table.table_name)
+            table.data = table.client.data[table.table_name]
+        except BaseException:
+            self.__exit__()
+            raise
+    
+    def __exit__(self, *exc_info):
+        if self.lock is not None:
+            self.lock.__exit__()
+
+def _statement(method):
+    """Run a write method, with the triggers it fires, as one statement to snapshots"""
+    @functools.wraps(method)
+    def run(self, *args, **kwargs):
+        if self.client.locks is None:
+            return method(self, *args, **kwargs)
+        with self.client.versions.gate:
+            return method(self, *args, **kwargs)
+    return run
+
+def _profiled(statement: str):
+    """Record each call of a query method in the client's QueryLog, when it has one"""
+    def decorate(method):
+        @functools.wraps(method)
+        def run(self, *args, **kwargs):
+            log = self.client.query_log
+            if log is None:
+                return method(self, *args, **kwargs)
+            self.plan, self.scanned = None, 0
+            started = perf_counter()
+            result = method(self, *args, **kwargs)
+            log.record(self, statement, perf_counter() - started, result)
+            return result
+        return run
+    return decorate
+
 class MockTable:
-    def __init__(self, data: List[Dict], table_name: str, client):
+    def __init__(self, data, table_name: str, client):
         self.data = data
         self.table_name = table_name
         self.client = client
-        self.filters = {}
+        self.indexes = client.indexes.setdefault(table_name, {})
+        self.unique_indexes = client.unique_indexes.setdefault(table_name, {})
+        self.filters = []
+        self.ordering = []
+        self.offset = 0
+        self.row_limit = None
         self.select_fields = '*'
+        # Parsed select list (None for '*'), or the error that parsing it raised
+        self.projection = None
+        self.select_error = None
+        # First filter operand that failed to parse, reported when the query runs
+        self.filter_error = None
+        # Access path and rows read by the current query, kept while a QueryLog is on
+        self.plan = None
+        self.scanned = 0
     
     def select(self, fields: str = '*'):
+        """Choose the columns to return, in PostgREST's select syntax (see Projection)"""
         self.select_fields = fields
+        self.projection = self.select_error = None
+        if fields.strip() != '*':
+            try:
+                self.projection = Projection(self.client.foreign_keys, self.table_name, fields)
+            except ValueError as error:
+                self.select_error = error.args[0]
         return self
     
-    def insert(self, record: Dict):
-        # Add ID if not present
-        if 'id' not in record:
-            record['id'] = str(uuid.uuid4())
-        
-        # Add timestamps
-        now = datetime.now().isoformat()
-        if 'created_at' not in record:
-            record['created_at'] = now
-        if 'updated_at' not in record:
-            record['updated_at'] = now
+    def _related(self, table_name: str) -> 'MockTable':
+        """Table an embedded select reads from"""
+        return self.client.from_table(table_name)
+    
+    def _rows(self, positions) -> Tuple[List[Dict], List[List[Any]]]:
+        """Response rows at positions, shaped by the select list (embeds are filled in by _embed)"""
+        if self.projection is None:
+            return [_present(self.data.row(p)) for p in positions], []
+        return self.projection.read(self.data, positions)
+    
+    def _embed(self, rows: List[Dict], joins: List[List[Any]]) -> List[Dict]:
+        # Runs after the table's latch is released, so latches are never nested
+        if self.projection is not None and self.projection.embeds:
+            self.projection.embed(self._related, rows, joins)
+        return rows
+    
+    def _latched(self, write: bool = False) -> '_TableLatch':
+        """Context for one physical read or write of the table (see _TableLatch)"""
+        return _TableLatch(self, write)
+    
+    @_profiled('insert')
+    @_statement
+    def insert(self, records):
+        """Insert one record, or a list of records as a single all-or-nothing batch"""
+        with self._latched(write=True):
+            batch = _encode_records(records if isinstance(records, list) else [records])
+            self._fill_defaults(batch)
+            keys = self._unique_keys(batch)
+            error = self._check_unique(keys)
+            if error:
+                return MockResponse({'data': None, 'error': error})
+            self._append_rows(batch, keys)
+            inserted = [_present(row) for row in batch]
+            self.client._fire_triggers(self.table_name, 'INSERT', [], inserted)
+        return MockResponse({'data': inserted if isinstance(records, list) else inserted[0], 'error': None})
+    
+    @_profiled('upsert')
+    @_statement
+    def upsert(self, records, on_conflict: str = 'id', ignore_duplicates: bool = False):
+        """INSERT ... ON CONFLICT (on_conflict) DO UPDATE, or DO NOTHING when ignoring duplicates"""
+        with self._latched(write=True):
+            batch = _encode_records(records if isinstance(records, list) else [records])
+            columns = tuple(column.strip() for column in on_conflict.split(','))
+            conflict_index = self.unique_indexes.get(columns)
+            if conflict_index is None:
+                if columns != ('id',):
+                    return MockResponse({'data': None, 'error': {
+                        'code': '42P10',
+                        'message': 'there is no unique or exclusion constraint matching the ON CONFLICT specification'
+                    }})
+                # The primary key is only indexed once something upserts on it
+                conflict_index = self.client.add_unique_constraint(self.table_name, columns)
             
-        self.data.append(record)
-        return MockResponse({'data': record, 'error': None})
+            inserts, changes, seen, returned = [], [], set(), []
+            now = _utc_now()
+            for record in batch:
+                key = conflict_index.key(record.get)
+                if key is not None:
+                    if key in seen:
+                        if ignore_duplicates:
+                            continue
+                        return MockResponse({'data': None, 'error': {
+                            'code': '21000',
+                            'message': 'ON CONFLICT DO UPDATE command cannot affect row a second time'
+                        }})
+                    seen.add(key)
+                    position = conflict_index.positions.get(key)
+                    if position is not None:
+                        if not ignore_duplicates:
+                            update = dict(record)
+                            update.setdefault('updated_at', now)
+                            returned.append(len(changes))
+                            changes.append((position, update))
+                        continue
+                returned.append(record)
+                inserts.append(record)
+            
+            self._fill_defaults(inserts, now)
+            keys = self._unique_keys(inserts)
+            error = self._check_unique(keys) or self._check_unique_changes(changes)
+            if error:
+                return MockResponse({'data': None, 'error': error})
+            old_rows = self._rows_before_update(changes)
+            updated = [_present(row) for row in self._write_changes(changes)]
+            self._append_rows(inserts, keys)
+            inserted = [_present(row) for row in inserts]
+            self.client._fire_triggers(self.table_name, 'UPDATE', old_rows, updated)
+            self.client._fire_triggers(self.table_name, 'INSERT', [], inserted)
+        # Rows come back in request order; ints stand in for rows that were updated
+        inserted = iter(inserted)
+        data = [updated[entry] if isinstance(entry, int) else next(inserted) for entry in returned]
+        return MockResponse({'data': data if isinstance(records, list) else (data[0] if data else None), 'error': None})
+    
+    def _fill_defaults(self, batch: List[Dict], now: Optional[int] = None):
+        """Add missing ids and timestamps, generated once per batch"""
+        ids = _uuid4_batch(sum(1 for record in batch if 'id' not in record))
+        now = now or _utc_now()
+        for record in batch:
+            if 'id' not in record:
+                record['id'] = next(ids)
+            if 'created_at' not in record:
+                record['created_at'] = now
+            if 'updated_at' not in record:
+                record['updated_at'] = now
+    
+    def _unique_keys(self, batch: List[Dict]) -> Dict[UniqueIndex, List[Optional[tuple]]]:
+        return {index: index.keys(batch) for index in self.unique_indexes.values()}
+    
+    def _check_unique(self, keys: Dict[UniqueIndex, List[Optional[tuple]]]) -> Optional[Dict[str, str]]:
+        """First UNIQUE violation a batch would cause, against the table or itself"""
+        for index, batch_keys in keys.items():
+            seen = set()
+            for key in batch_keys:
+                if key is None:
+                    continue
+                if key in seen or key in index.positions:
+                    return index.violation(key)
+                seen.add(key)
+        return None
+    
+    def _check_unique_changes(self, changes: List[Tuple[int, Dict]]) -> Optional[Dict[str, str]]:
+        """First UNIQUE violation that updating rows in place would cause"""
+        for index in self.unique_indexes.values():
+            claimed = {}
+            for position, update in changes:
+                if not any(column in update for column in index.columns):
+                    continue
+                key = index.key(lambda column: update[column] if column in update
+                                else self.data.value(position, column))
+                if key is None:
+                    continue
+                holder = claimed.get(key, index.positions.get(key))
+                if holder is not None and holder != position:
+                    return index.violation(key)
+                claimed[key] = position
+        return None
+    
+    def _append_rows(self, batch: List[Dict], keys: Dict[UniqueIndex, List[Optional[tuple]]]):
+        """Store a validated batch and index it in bulk"""
+        if not batch:
+            return
+        first = self.data.extend(batch)
+        for column, index in self.indexes.items():
+            index.extend([record.get(column) for record in batch], first)
+        for index, batch_keys in keys.items():
+            index.positions.update((key, position) for position, key in enumerate(batch_keys, first)
+                                   if key is not None)
+    
+    def _write_changes(self, changes: List[Tuple[int, Dict]]) -> List[Dict]:
+        """Apply validated per-row updates, keeping every index current"""
+        updated = []
+        versions = self.client.versions
+        for position, update in changes:
+            if versions.open:
+                versions.record(self.table_name, position, dict(self.data.row(position)))
+            for column, index in self.indexes.items():
+                if column in update:
+                    index.remove(self.data.value(position, column), position)
+                    index.add(update[column], position)
+            for index in self.unique_indexes.values():
+                if any(column in update for column in index.columns):
+                    old_key = index.key(lambda column: self.data.value(position, column))
+                    if old_key is not None and index.positions.get(old_key) == position:
+                        del index.positions[old_key]
+                    new_key = index.key(lambda column: update[column] if column in update
+                                        else self.data.value(position, column))
+                    if new_key is not None:
+                        index.positions[new_key] = position
+            updated.append(self.data.update(position, update))
+        return updated
+    
+    def _filter(self, op: str, field: str, value: Any):
+        try:
+            if field in TIMESTAMP_COLUMNS and op not in ('is', 'in'):
+                value = self._timestamp_operand(value)
+            elif field in TIMESTAMP_COLUMNS and op == 'in':
+                value = [self._timestamp_operand(v) for v in value]
+        except ValueError as error:
+            self.filter_error = self.filter_error or error.args[0]
+            return self
+        self.filters.append((op, field, value))
+        return self
+    
+    @staticmethod
+    def _timestamp_operand(value: Any) -> Any:
+        """Encode a filter operand like the stored timestamps, so comparisons are int to int.
+        
+        Raises ValueError with Postgres's 22007 error dict for a value that is not a timestamp.
+        """
+        if value is None:
+            return None
+        try:
+            return _encode_timestamp(value)
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError({'code': '22007',
+                              'message': f'invalid input syntax for type timestamp with time zone: "{value}"'})
+    
+    @property
+    def query_error(self) -> Optional[Dict]:
+        """Error a malformed select list or filter left for the query to report"""
+        return self.select_error or self.filter_error
     
     def eq(self, field: str, value: Any):
-        self.filters[field] = value
+        return self._filter('eq', field, value)
+    
+    def neq(self, field: str, value: Any):
+        return self._filter('neq', field, value)
+    
+    def gt(self, field: str, value: Any):
+        return self._filter('gt', field, value)
+    
+    def gte(self, field: str, value: Any):
+        return self._filter('gte', field, value)
+    
+    def lt(self, field: str, value: Any):
+        return self._filter('lt', field, value)
+    
+    def lte(self, field: str, value: Any):
+        return self._filter('lte', field, value)
+    
+    def in_(self, field: str, values: List[Any]):
+        return self._filter('in', field, list(values))
+    
+    def is_(self, field: str, value: Optional[bool]):
+        return self._filter('is', field, value)
+    
+    def order(self, field: str, desc: bool = False, nullsfirst: Optional[bool] = None):
+        # Postgres puts NULLs last for ASC and first for DESC unless told otherwise
+        self.ordering.append((field, desc, desc if nullsfirst is None else nullsfirst))
+        return self
+    
+    def limit(self, count: int):
+        self.row_limit = count
         return self
     
+    def range(self, start: int, end: int):
+        """Inclusive row window, like PostgREST's Range header"""
+        self.offset = start
+        self.row_limit = end - start + 1
+        return self
+    
+    @_profiled('select')
     def single(self):
-        filtered_data = self._apply_filters()
+        if self.query_error:
+            return MockResponse({'data': None, 'error': self.query_error})
+        try:
+            with self._latched():
+                filtered_data, joins = self._rows(self._select_positions(max_rows=1))
+            filtered_data = self._embed(filtered_data, joins)
+        except ValueError as error:
+            if not isinstance(error.args[0], dict):
+                raise
+            return MockResponse({'data': None, 'error': error.args[0]})
         if not filtered_data:
             return MockResponse({'data': None, 'error': {'code': 'PGRST116', 'message': 'No rows found'}})
         return MockResponse({'data': filtered_data[0], 'error': None})
     
+    @_profiled('select')
+    def execute(self):
+        if self.query_error:
+            return MockResponse({'data': None, 'error': self.query_error})
+        try:
+            return MockResponse({'data': self._apply_filters(), 'error': None})
+        except ValueError as error:
+            # A select-list cast that failed on a row's value
+            if not isinstance(error.args[0], dict):
+                raise
+            return MockResponse({'data': None, 'error': error.args[0]})
+    
+    @_profiled('update')
+    @_statement
     def update(self, updates: Dict):
-        filtered_data = self._apply_filters()
-        for record in filtered_data:
-            record.update(updates)
-            record['updated_at'] = datetime.now().isoformat()
-        return MockResponse({'data': filtered_data, 'error': None})
+        if self.filter_error:
+            return MockResponse({'data': None, 'error': self.filter_error})
+        with self._latched(write=True):
+            updates = _encode_records([dict(updates, updated_at=_utc_now())])[0]
+            changes = [(position, updates) for position in self._matching_positions()]
+            error = self._check_unique_changes(changes)
+            if error:
+                return MockResponse({'data': None, 'error': error})
+            old_rows = self._rows_before_update(changes)
+            updated = [_present(row) for row in self._write_changes(changes)]
+            self.client._fire_triggers(self.table_name, 'UPDATE', old_rows, updated)
+        return MockResponse({'data': updated, 'error': None})
+    
+    @_profiled('delete')
+    @_statement
+    def delete(self):
+        """Delete every row matching the filters, returning the deleted rows"""
+        if self.filter_error:
+            return MockResponse({'data': None, 'error': self.filter_error})
+        with self._latched(write=True):
+            deleted = []
+            versions = self.client.versions
+            for position in self._matching_positions():
+                if versions.open:
+                    versions.record(self.table_name, position, dict(self.data.row(position)))
+                for column, index in self.indexes.items():
+                    index.remove(self.data.value(position, column), position)
+                for index in self.unique_indexes.values():
+                    key = index.key(lambda column: self.data.value(position, column))
+                    if key is not None and index.positions.get(key) == position:
+                        del index.positions[key]
+                deleted.append(_present(self.data.delete(position)))
+            self.client._fire_triggers(self.table_name, 'DELETE', deleted, [])
+        return MockResponse({'data': deleted, 'error': None})
+    
+    def _rows_before_update(self, changes: List[Tuple[int, Dict]]) -> List[Dict]:
+        """Copies of the rows about to change, for UPDATE triggers' OLD table"""
+        if not self.client.triggers.get((self.table_name, 'UPDATE')):
+            return []
+        return [dict(_present(self.data.row(position))) for position, _ in changes]
+    
+    def explain(self) -> Dict[str, Any]:
+        """Describe the access path the planner picks for the current filters"""
+        with self._latched():
+            return self._plan(limited=self.row_limit is not None)[0]
+    
+    def _plan(self, limited: bool = False):
+        """Choose an access path: the most selective indexed eq/in filter or range, else a scan.
+        
+        Returns (plan, candidate positions, residual filters); candidates are in
+        position order so results match a plain table scan, except for an
+        'index_ordered' walk, which already yields rows in the requested order.
+        """
+        best = None
+        for i, (op, field, value) in enumerate(self.filters):
+            index = self.indexes.get(field)
+            if index is None or op not in ('eq', 'in'):
+                continue
+            if op == 'eq':
+                buckets = [index.lookup(value)]
+            else:
+                keys = {_index_key(v) for v in value if v is not None}
+                buckets = [index.buckets[k] for k in keys if k in index.buckets]
+            cost = sum(len(bucket) for bucket in buckets)
+            if best is None or cost < best[0]:
+                best = (cost, {i}, buckets, {'access': 'index', 'column': field, 'op': op})
+        ranges = self._range_bounds()
+        for field, (consumed, (start, stop)) in ranges.items():
+            index = self.indexes[field]
+            # Estimate from the average bucket size; buckets are only gathered if chosen
+            cost = (stop - start) * len(self.data) // max(1, len(index.keys))
+            if best is None or cost < best[0]:
+                best = (cost, consumed, None, {'access': 'index_range', 'column': field})
+        
+        ordered = self._ordered_index() if limited else None
+        if ordered is not None and (best is None or best[3]['access'] == 'index_range'
+                                    and best[3]['column'] == self.ordering[0][0]):
+            # ORDER BY an indexed column with a LIMIT: walk the index (within any
+            # range on that column) and stop early
+            field, desc, nullsfirst = self.ordering[0]
+            consumed, key_range = ranges.get(field, (set(), None))
+            if key_range is None:
+                candidates = ordered.ordered(desc, nullsfirst)
+            else:
+                candidates = ordered.ordered(desc, nullsfirst, *key_range, nulls=False)
+            plan = {'access': 'index_ordered', 'column': field, 'desc': desc,
+                    'estimated_rows': best[0] if best else self.data.count()}
+        elif best is not None:
+            cost, consumed, buckets, plan = best
+            if buckets is None:
+                index = self.indexes[plan['column']]
+                buckets = [index.buckets[key] for key in itertools.islice(index.keys, *ranges[plan['column']][1])]
+                cost = sum(len(bucket) for bucket in buckets)
+            if len(buckets) == 1:
+                candidates = buckets[0]
+            elif plan['access'] == 'index_range':
+                # Each bucket is sorted; timsort merges the runs
+                candidates = sorted(itertools.chain.from_iterable(buckets))
+            else:
+                candidates = heapq.merge(*buckets)
+            plan['estimated_rows'] = cost
+        else:
+            i = next((i for i, f in enumerate(self.filters) if f[0] == 'eq'), None)
+            consumed = set() if i is None else {i}
+            if i is not None:
+                # No index applies, so scan the column directly (vectorized when columnar)
+                _, field, value = self.filters[i]
+                candidates = self.data.scan_eq(field, value)
+                plan = {'access': 'column_scan', 'column': field, 'op': 'eq', 'estimated_rows': len(candidates)}
+            else:
+                candidates = self.data.positions()
+                plan = {'access': 'full_scan', 'estimated_rows': self.data.count()}
+        residual = [f for j, f in enumerate(self.filters) if j not in consumed]
+        plan['residual_filters'] = [(op, field) for op, field, _ in residual]
+        if self.client.query_log is not None:
+            candidates = self._counted(plan, candidates)
+        return plan, candidates, residual
+    
+    def _counted(self, plan: Dict[str, Any], candidates):
+        """Note plan for the query log and count the rows its access path reads"""
+        self.plan = plan
+        if plan['access'] == 'column_scan':
+            # The vectorized scan already read every value of the column
+            self.scanned += self.data.count()
+            return candidates
+        return self._counting(candidates)
+    
+    def _counting(self, candidates):
+        for position in candidates:
+            self.scanned += 1
+            yield position
+    
+    def _range_bounds(self) -> Dict[str, Tuple[set, Tuple[int, int]]]:
+        """gt/gte/lt/lte filters on ordered-index columns, as slices of each index's sorted keys.
+        
+        Maps column -> (positions of the filters consumed, (start, stop) into index.keys).
+        """
+        bounds = {}
+        for i, (op, field, value) in enumerate(self.filters):
+            index = self.indexes.get(field)
+            if op not in ('gt', 'gte', 'lt', 'lte') or value is None:
+                continue
+            if not isinstance(index, SortedIndex) or not index.sortable:
+                continue
+            consumed, low, high = bounds.get(field, (set(), None, None))
+            try:
+                if op in ('gt', 'gte'):
+                    if low is None or value > low[0] or (value == low[0] and op == 'gt'):
+                        low = (value, op == 'gte')
+                elif high is None or value < high[0] or (value == high[0] and op == 'lt'):
+                    high = (value, op == 'lte')
+            except TypeError:
+                continue
+            bounds[field] = (consumed | {i}, low, high)
+        ranges = {}
+        for field, (consumed, low, high) in bounds.items():
+            try:
+                ranges[field] = (consumed, self.indexes[field].key_range(low, high))
+            except TypeError:
+                continue
+        return ranges
+    
+    def _ordered_index(self) -> Optional[SortedIndex]:
+        """The ordered index that can produce this query's ORDER BY directly, if any"""
+        if len(self.ordering) != 1:
+            return None
+        index = self.indexes.get(self.ordering[0][0])
+        return index if isinstance(index, SortedIndex) and index.sortable else None
+    
+    def _scan(self, limited: bool = False):
+        """Positions matching every filter, read through the planner's access path"""
+        _, candidates, residual = self._plan(limited)
+        return self._filter_positions(candidates, residual)
+    
+    def _filter_positions(self, candidates, residual):
+        """Lazily yield the candidates that pass every residual filter in a single fused pass"""
+        if not residual:
+            yield from candidates
+            return
+        checks = [(field, FILTER_OPERATORS[op],
+                   frozenset(_index_key(v) for v in value) if op == 'in' else value)
+                  for op, field, value in residual]
+        value_of = self.data.value
+        for position in candidates:
+            for field, check, operand in checks:
+                if not check(value_of(position, field), operand):
+                    break
+            else:
+                yield position
+    
+    def _matching_positions(self) -> List[int]:
+        """Positions of rows matching the filters, ignoring order/limit"""
+        return list(self._scan())
+    
+    def _order_key(self, field: str, desc: bool, nullsfirst: bool):
+        null_rank = int(nullsfirst == desc)
+        value_of = self.data.value
+        def key(position):
+            value = value_of(position, field)
+            return (null_rank, 0) if value is None else (1 - null_rank, value)
+        return key
+    
+    def _stop(self, max_rows: Optional[int] = None) -> Optional[int]:
+        """Position in the ordered matches to stop at, or None to take them all"""
+        limit = self.row_limit
+        if max_rows is not None:
+            limit = max_rows if limit is None else min(limit, max_rows)
+        return None if limit is None else self.offset + limit
+    
+    def _select_positions(self, max_rows: Optional[int] = None) -> List[int]:
+        """Apply filters, order, offset and limit; limit is pushed into the scan"""
+        stop = self._stop(max_rows)
+        plan, candidates, residual = self._plan(limited=stop is not None)
+        return self._arrange(plan, self._filter_positions(candidates, residual), stop)
+    
+    def _arrange(self, plan: Dict[str, Any], positions, stop: Optional[int]) -> List[int]:
+        """Order, offset and cut off matching positions, consuming them lazily where the plan allows"""
+        if not self.ordering or plan['access'] == 'index_ordered':
+            return list(itertools.islice(positions, self.offset, stop))
+        if len(self.ordering) == 1 and stop is not None:
+            # Top-N: keep a bounded heap instead of sorting every match
+            key = self._order_key(*self.ordering[0])
+            select = heapq.nlargest if self.ordering[0][1] else heapq.nsmallest
+            return select(stop, positions, key=key)[self.offset:]
+        positions = list(positions)
+        for field, desc, nullsfirst in reversed(self.ordering):
+            positions.sort(key=self._order_key(field, desc, nullsfirst), reverse=desc)
+        return positions[self.offset:stop]
+    
+    def _copy_query(self, table: 'MockTable') -> 'MockTable':
+        """Give table (e.g. a snapshot's view of this one) this query's filters, order, window and select list"""
+        table.filters, table.ordering = list(self.filters), list(self.ordering)
+        table.offset, table.row_limit = self.offset, self.row_limit
+        table.select_fields, table.projection, table.select_error = self.select_fields, self.projection, self.select_error
+        table.filter_error = self.filter_error
+        return table
+    
+    def cursor(self, batch_size: int = CURSOR_BATCH):
+        """Lazily yield the query's rows, batch_size at a time, from a snapshot.
+        
+        Unlike execute(), only one batch of rows exists at a time. An ORDER BY
+        still sorts the matching positions up front; keyset() pages in index
+        order without that. The snapshot is released once the cursor is
+        exhausted or closed.
+        """
+        if self.query_error:
+            raise ValueError(self.query_error)
+        with self.client.snapshot() as snapshot:
+            view = self._copy_query(snapshot.from_table(self.table_name))
+            yield from self._logged('cursor', view, view._batches(batch_size))
+    
+    def _logged(self, statement: str, reader: 'MockTable', items):
+        """items (rows, or pages of rows, of a lazy read by reader), recorded in the QueryLog when they end"""
+        log = self.client.query_log
+        if log is None:
+            return items
+        return self._logging(log, statement, reader, items)
+    
+    def _logging(self, log: 'QueryLog', statement: str, reader: 'MockTable', items):
+        # Only time spent producing rows counts, not the caller's between them
+        reader.plan, reader.scanned = None, 0
+        returned, seconds = 0, 0.0
+        try:
+            while True:
+                started = perf_counter()
+                item = next(items, None)
+                seconds += perf_counter() - started
+                if item is None:
+                    return
+                returned += len(item) if isinstance(item, list) else 1
+                yield item
+        finally:
+            items.close()
+            log.record(reader, statement, seconds, returned)
+    
+    def _batches(self, batch_size: int):
+        """Rows of the query, materialized batch_size at a time"""
+        stop = self._stop()
+        plan, candidates, residual = self._plan(limited=stop is not None)
+        positions = self._filter_positions(candidates, residual)
+        if not self.ordering or plan['access'] == 'index_ordered':
+            positions = itertools.islice(positions, self.offset, stop)
+        else:
+            positions = iter(self._arrange(plan, positions, stop))
+        while True:
+            batch = list(itertools.islice(positions, batch_size))
+            if not batch:
+                return
+            rows, joins = self._rows(batch)
+            yield from self._embed(rows, joins)
+    
+    def keyset(self, column: str, page_size: int = CURSOR_BATCH, desc: bool = False):
+        """Yield the query's rows in pages, ordered by column (keyset pagination).
+        
+        Each page is a separate short read that seeks past the previous page's
+        last (value, position) in column's ordered index, so memory stays at
+        one page however large the table, and rows that stay put are neither
+        repeated nor skipped when others are written between pages. Ties are in
+        insertion order and NULLs come last; order(), offset and limit are
+        ignored.
+        """
+        return self._logged('keyset', self, self._keyset_pages(column, page_size, desc))
+    
+    def _keyset_pages(self, column: str, page_size: int, desc: bool):
+        if self.query_error:
+            raise ValueError(self.query_error)
+        if not isinstance(self.indexes.get(column), SortedIndex):
+            raise ValueError(f"keyset pagination needs an ordered (btree) index on {self.table_name}.{column}")
+        last = None
+        while True:
+            with self._latched():
+                index = self.indexes[column]
+                if not index.sortable:
+                    raise ValueError(f"{self.table_name}.{column} mixes values that cannot be ordered")
+                walk = self._keyset_walk(index, last, desc)
+                if self.client.query_log is not None:
+                    walk = self._counted({'access': 'index_ordered', 'column': column}, walk)
+                positions = list(itertools.islice(self._filter_positions(walk, self.filters), page_size))
+                if positions:
+                    last = (_index_key(self.data.value(positions[-1], column)), positions[-1])
+                rows, joins = self._rows(positions)
+            if rows:
+                yield self._embed(rows, joins)
+            if len(positions) < page_size:
+                return
+    
+    def _keyset_walk(self, index: SortedIndex, last: Optional[Tuple[Any, int]], desc: bool):
+        """Positions in (column [DESC], position) order after the row last = (key, position)"""
+        _, key_range = self._range_bounds().get(index.column, (None, None))
+        start, stop = key_range or (0, len(index.keys))
+        if last is not None and last[0] is not None:
+            key, position = last
+            bucket = index.buckets.get(key, [])
+            yield from bucket[bisect.bisect_right(bucket, position):]
+            # Keys strictly beyond the last one, in walk direction
+            if desc:
+                stop = min(stop, bisect.bisect_left(index.keys, key))
+            else:
+                start = max(start, bisect.bisect_right(index.keys, key))
+        if last is None or last[0] is not None:
+            yield from index.ordered(desc, False, start, max(start, stop), nulls=False)
+        if key_range is None:
+            nulls = index.buckets.get(None, [])
+            yield from nulls[bisect.bisect_right(nulls, last[1]) if last and last[0] is None else 0:]
+    
+    @_profiled('count')
+    def value_counts(self, column: str) -> Dict[Any, int]:
+        """Count matching rows per value of column (GROUP BY column, COUNT(*))"""
+        if self.filter_error:
+            raise ValueError(self.filter_error)
+        with self._latched():
+            positions = self._matching_positions() if self.filters else None
+            counts = self.data.value_counts(column, positions)
+        if column in TIMESTAMP_COLUMNS:
+            counts = {_format_timestamp(key) if type(key) is int else key: n for key, n in counts.items()}
+        return counts
     
     def _apply_filters(self):
-        filtered = self.data
-        for field, value in self.filters.items():
-            filtered = [r for r in filtered if r.get(field) == value]
-        return filtered
+        with self._latched():
+            if not self.filters and not self.ordering and self.row_limit is None and not self.offset:
+                if self.client.query_log is not None:
+                    self.plan, self.scanned = {'access': 'full_scan'}, self.data.count()
+                if self.projection is None:
+                    return [_present(row) for row in self.data.rows()]
+                rows, joins = self._rows(list(self.data.positions()))
+            else:
+                rows, joins = self._rows(self._select_positions())
+        return self._embed(rows, joins)
 
 class MockResponse:
     def __init__(self, response: Dict):
@@ -97,9 +2746,571 @@ class MockResponse:
     def error(self):
         return self.response.get('error')
 
+# Positions a snapshot read resolves per latch acquisition
+SNAPSHOT_BATCH = 1024
+
+class SnapshotStore:
+    """Read-only view of a table's store as a snapshot sees it (see VersionLog).
+    
+    Follows the store interface MockTable reads through. Each call resolves
+    positions under the table latch one batch at a time, so long scans
+    interleave with writers instead of blocking them.
+    """
+    def __init__(self, client, table_name: str, epoch: int, length: int):
+        self.client = client
+        self.table_name = table_name
+        self.epoch = epoch
+        self.length = length
+        locks = client.locks
+        self.latch = locks.latch(table_name) if locks is not None else contextlib.nullcontext()
+        if locks is None:
+            # Single-threaded: no writer can interleave with a read
+            self.value = self._value
+        self._count = None
+    
+    def __len__(self):
+        return self.length
+    
+    def _before(self, entries) -> Optional[Dict]:
+        """The version this snapshot sees among a position's logged changes, if any"""
+        for stamp, before in entries:
+            if stamp >= self.epoch:
+                return before
+        return None
+    
+    def _visible(self, positions, column: Optional[str] = None):
+        """(position, row or column value) for each position the snapshot sees"""
+        positions = iter(range(self.length) if positions is None else positions)
+        while True:
+            batch = list(itertools.islice(positions, SNAPSHOT_BATCH))
+            if not batch:
+                return
+            found = []
+            with self.latch:
+                store = self.client.data[self.table_name]
+                changes = self.client.versions.changes.get(self.table_name)
+                # Row-store rows are updated in place, so hand out copies
+                copy_rows = column is None and isinstance(store, RowStore)
+                for position in batch:
+                    entries = changes.get(position) if changes else None
+                    row = self._before(entries) if entries else None
+                    if row is not None:
+                        found.append((position, row if column is None else row.get(column)))
+                    elif store.live(position):
+                        if column is not None:
+                            found.append((position, store.value(position, column)))
+                        else:
+                            row = store.row(position)
+                            found.append((position, dict(row) if copy_rows else row))
+            yield from found
+    
+    def count(self) -> int:
+        if self._count is None:
+            self._count = sum(1 for _ in self.positions())
+        return self._count
+    
+    def positions(self):
+        # Any column will do; only the positions are kept
+        return (position for position, _ in self._visible(None, 'id'))
+    
+    def row(self, position: int) -> Dict:
+        return next(self._visible([position]))[1]
+    
+    def rows(self) -> List[Dict]:
+        return [row for _, row in self._visible(None)]
+    
+    def value(self, position: int, column: str):
+        with self.latch:
+            return self._value(position, column)
+    
+    def _value(self, position: int, column: str):
+        changes = self.client.versions.changes.get(self.table_name)
+        entries = changes.get(position) if changes else None
+        row = self._before(entries) if entries else None
+        if row is not None:
+            return row.get(column)
+        return self.client.data[self.table_name].value(position, column)
+    
+    def scan_eq(self, column: str, value: Any) -> List[int]:
+        return [position for position, v in self._visible(None, column) if v == value]
+    
+    def value_counts(self, column: str, positions=None) -> Dict[Any, int]:
+        counts = {}
+        positions = iter(range(self.length) if positions is None else positions)
+        while True:
+            batch = list(itertools.islice(positions, SNAPSHOT_BATCH))
+            if not batch:
+                return counts
+            with self.latch:
+                store = self.client.data[self.table_name]
+                changes = self.client.versions.changes.get(self.table_name)
+                unchanged = batch
+                if changes:
+                    unchanged = []
+                    for position in batch:
+                        entries = changes.get(position)
+                        row = self._before(entries) if entries else None
+                        if row is None:
+                            unchanged.append(position)
+                        else:
+                            key = row.get(column)
+                            counts[key] = counts.get(key, 0) + 1
+                # Rows untouched since the snapshot are tallied by the store in bulk
+                unchanged = [p for p in unchanged if store.live(p)]
+                tally = store.value_counts(column, unchanged)
+            for key, n in tally.items():
+                counts[key] = counts.get(key, 0) + n
+
+class SnapshotTable(MockTable):
+    """Read-only MockTable over a Snapshot's view of a table"""
+    def __init__(self, snapshot: 'Snapshot', table_name: str):
+        client = snapshot.client
+        store = SnapshotStore(client, table_name, snapshot.epoch, snapshot.lengths.get(table_name, 0))
+        super().__init__(store, table_name, client)
+        self.snapshot = snapshot
+    
+    def _related(self, table_name: str) -> 'SnapshotTable':
+        return self.snapshot.from_table(table_name)
+    
+    def _rows(self, positions) -> Tuple[List[Dict], List[List[Any]]]:
+        if self.projection is None:
+            # Resolve versions a batch at a time rather than row by row
+            return [_present(row) for _, row in self.data._visible(positions)], []
+        return super()._rows(positions)
+    
+    def cursor(self, batch_size: int = CURSOR_BATCH):
+        if self.query_error:
+            raise ValueError(self.query_error)
+        return self._logged('cursor', self, self._batches(batch_size))
+    
+    def keyset(self, column: str, page_size: int = CURSOR_BATCH, desc: bool = False):
+        raise ValueError("keyset pagination reads the live index; use cursor() within a snapshot")
+    
+    def _latched(self, write: bool = False):
+        # The view takes the latch per batch of rows itself
+        return contextlib.nullcontext()
+    
+    @staticmethod
+    def _read_only(statement: str) -> 'MockResponse':
+        return MockResponse({'data': None, 'error': {
+            'code': '25006',
+            'message': f'cannot execute {statement} in a read-only transaction'
+        }})
+    
+    def insert(self, records):
+        return self._read_only('INSERT')
+    
+    def upsert(self, records, on_conflict: str = 'id', ignore_duplicates: bool = False):
+        return self._read_only('INSERT')
+    
+    def update(self, updates: Dict):
+        return self._read_only('UPDATE')
+    
+    def delete(self):
+        return self._read_only('DELETE')
+    
+    def _ordered_index(self) -> Optional[SortedIndex]:
+        # The live index's order need not be the snapshot's; sort instead
+        return None
+    
+    def _plan(self, limited: bool = False):
+        """MockTable's plan, with index lookups widened to the rows changed since the snapshot.
+        
+        Live indexes describe the current rows, so index candidates are merged
+        with every changed position and all filters are rechecked against the
+        snapshot's versions. Scans need no latch here; the view takes it per batch.
+        """
+        indexed = any(field in self.indexes and (op in ('eq', 'in') or op in ('gt', 'gte', 'lt', 'lte')
+                                                 and isinstance(self.indexes[field], SortedIndex))
+                      for op, field, _ in self.filters)
+        if not indexed:
+            return super()._plan(limited)
+        with self.data.latch:
+            plan, candidates, residual = super()._plan(limited)
+            if plan['access'] in ('index', 'index_range'):
+                length = self.data.length
+                changed = self.client.versions.changed(self.table_name, self.data.epoch)
+                candidates = sorted({p for p in candidates if p < length}.union(p for p in changed if p < length))
+                residual = list(self.filters)
+                plan['residual_filters'] = [(op, field) for op, field, _ in residual]
+        return plan, candidates, residual
+
+class Snapshot:
+    """A snapshot-isolated read transaction on a MockSupabaseClient (see MockSupabaseClient.snapshot)"""
+    def __init__(self, client: 'MockSupabaseClient', epoch: int, lengths: Dict[str, int]):
+        self.client = client
+        self.epoch = epoch
+        # Table lengths when the snapshot opened; later positions hold later inserts
+        self.lengths = lengths
+        self.functions = client.functions
+        self.closed = False
+    
+    def from_table(self, table_name: str) -> SnapshotTable:
+        if self.closed:
+            raise RuntimeError("snapshot is closed")
+        # Builds any deferred indexes
+        self.client.from_table(table_name)
+        return SnapshotTable(self, table_name)
+    
+    def rpc(self, function_name: str, params: Optional[Dict[str, Any]] = None):
+        """Call an rpc function against the snapshot; daily indexes are still read live"""
+        return MockSupabaseClient.rpc(self, function_name, params)
+    
+    def daily_index(self, table_name: str, columns: Tuple[str, ...]) -> DailyIndex:
+        return self.client.daily_index(table_name, columns)
+    
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.client._release_snapshot(self.epoch)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+# Rows an async read handles between yields to the event loop
+ASYNC_YIELD_ROWS = 2048
+
+class AsyncMockTable:
+    """Awaitable query builder, shaped like supabase-py's async request builders.
+    
+    Filters and modifiers chain as on MockTable; insert/upsert/update/delete
+    and single() only record the request, and nothing runs until
+    `await ....execute()`. Reads planned to touch more than `yield_every` rows
+    run against a snapshot and yield to the event loop every `yield_every`
+    rows, so a large scan neither stalls other sessions nor sees their writes
+    halfway through; smaller reads finish in one step on the live table.
+    """
+    def __init__(self, client: 'MockSupabaseClient', table_name: str, yield_every: int = ASYNC_YIELD_ROWS):
+        self.client = client
+        self.table_name = table_name
+        self.yield_every = yield_every
+        self.query = client.from_table(table_name)
+        self.request = None
+        self.single_row = False
+    
+    def insert(self, records):
+        self.request = ('insert', (records,), {})
+        return self
+    
+    def upsert(self, records, on_conflict: str = 'id', ignore_duplicates: bool = False):
+        self.request = ('upsert', (records,), {'on_conflict': on_conflict, 'ignore_duplicates': ignore_duplicates})
+        return self
+    
+    def update(self, updates: Dict):
+        self.request = ('update', (updates,), {})
+        return self
+    
+    def delete(self):
+        self.request = ('delete', (), {})
+        return self
+    
+    def single(self):
+        self.single_row = True
+        return self
+    
+    async def execute(self) -> MockResponse:
+        # Stands in for the network round trip: other sessions run first
+        await asyncio.sleep(0)
+        if self.request is not None:
+            # Writes are single atomic statements and never yield part-way
+            method, args, kwargs = self.request
+            return getattr(self.query, method)(*args, **kwargs)
+        if self.query.query_error:
+            return MockResponse({'data': None, 'error': self.query.query_error})
+        # The query log sees the table that planned the read: the live one, or the snapshot's view
+        reader, started = self.query, perf_counter()
+        reader.plan, reader.scanned = None, 0
+        try:
+            rows = self._read_now()
+            if rows is None:
+                with self.client.snapshot() as snapshot:
+                    reader = snapshot.from_table(self.table_name)
+                    rows = await self._read(reader)
+        except ValueError as error:
+            if not isinstance(error.args[0], dict):
+                raise
+            return MockResponse({'data': None, 'error': error.args[0]})
+        if not self.single_row:
+            response = MockResponse({'data': rows, 'error': None})
+        elif rows:
+            response = MockResponse({'data': rows[0], 'error': None})
+        else:
+            response = MockResponse({'data': None, 'error': {'code': 'PGRST116', 'message': 'No rows found'}})
+        if self.client.query_log is not None:
+            self.client.query_log.record(reader, 'select', perf_counter() - started, response)
+        return response
+    
+    def _read_now(self) -> Optional[List[Dict]]:
+        """The query's rows straight from the live table, or None if the plan is too big to run without yielding"""
+        query = self.query
+        with query._latched():
+            stop = query._stop(1 if self.single_row else None)
+            plan, candidates, residual = query._plan(limited=stop is not None)
+            if plan['estimated_rows'] > self.yield_every:
+                return None
+            positions = query._arrange(plan, query._filter_positions(candidates, residual), stop)
+            rows, joins = query._rows(positions)
+        return query._embed(rows, joins)
+    
+    async def _read(self, table: 'SnapshotTable') -> List[Dict]:
+        """The query's rows as of the snapshot, yielding between batches"""
+        self.query._copy_query(table)
+        stop = table._stop(1 if self.single_row else None)
+        plan, candidates, residual = table._plan(limited=stop is not None)
+        matches = table._filter_positions(candidates, residual)
+        # Without an ORDER BY to sort on, only the first `stop` matches are needed
+        wanted = stop if not table.ordering or plan['access'] == 'index_ordered' else None
+        positions = []
+        while wanted is None or len(positions) < wanted:
+            batch = self.yield_every if wanted is None else min(self.yield_every, wanted - len(positions))
+            found = list(itertools.islice(matches, batch))
+            positions.extend(found)
+            if len(found) < batch:
+                break
+            await asyncio.sleep(0)
+        positions = table._arrange(plan, positions, stop)
+        rows, joins = [], [[] for _ in (table.projection.embeds if table.projection else ())]
+        for start in range(0, len(positions), self.yield_every):
+            if start:
+                await asyncio.sleep(0)
+            batch_rows, batch_joins = table._rows(positions[start:start + self.yield_every])
+            rows.extend(batch_rows)
+            for values, batch_values in zip(joins, batch_joins):
+                values.extend(batch_values)
+        return table._embed(rows, joins)
+
+def _chained(name: str):
+    """AsyncMockTable method applying MockTable's filter or modifier of the same name"""
+    def method(self, *args, **kwargs):
+        getattr(self.query, name)(*args, **kwargs)
+        return self
+    method.__name__ = name
+    method.__doc__ = getattr(MockTable, name).__doc__
+    return method
+
+for _name in ('select', 'eq', 'neq', 'gt', 'gte', 'lt', 'lte', 'in_', 'is_', 'order', 'limit', 'range'):
+    setattr(AsyncMockTable, _name, _chained(_name))
+
+class AsyncRPC:
+    """Awaitable rpc() call"""
+    def __init__(self, client: 'MockSupabaseClient', function_name: str, params: Optional[Dict[str, Any]]):
+        self.client = client
+        self.function_name = function_name
+        self.params = params
+    
+    async def execute(self) -> MockResponse:
+        await asyncio.sleep(0)
+        return self.client.rpc(self.function_name, self.params)
+
+class AsyncMockSupabaseClient:
+    """asyncio face of a MockSupabaseClient, mirroring supabase-py's AsyncClient.
+    
+        db = AsyncMockSupabaseClient(client)
+        likes = await db.table('bar_likes').select('*').eq('bar_id', venue).execute()
+    
+    Every execute() is a suspension point, like the HTTP request it stands in
+    for, so many sessions can share one event loop via asyncio.gather.
+    """
+    def __init__(self, client: Optional['MockSupabaseClient'] = None, yield_every: int = ASYNC_YIELD_ROWS):
+        self.client = client or MockSupabaseClient()
+        self.yield_every = yield_every
+    
+    def table(self, table_name: str) -> AsyncMockTable:
+        return AsyncMockTable(self.client, table_name, self.yield_every)
+    
+    from_table = table
+    
+    def rpc(self, function_name: str, params: Optional[Dict[str, Any]] = None) -> AsyncRPC:
+        return AsyncRPC(self.client, function_name, params)
+
+def update_global_bar_likes(client, event: str, old_rows: List[Dict], new_rows: List[Dict]):
+    """Mirror of the update_global_bar_likes() trigger: per-venue like counters.
+    
+    Each statement costs one counter upsert per venue it touched, so like counts
+    never need a scan of bar_likes.
+    """
+    deltas, names = {}, {}
+    for like in new_rows:
+        bar_id = like.get('bar_id')
+        deltas[bar_id] = deltas.get(bar_id, 0) + 1
+        names.setdefault(bar_id, like.get('bar_name'))
+    for like in old_rows:
+        bar_id = like.get('bar_id')
+        deltas[bar_id] = deltas.get(bar_id, 0) - 1
+    deltas.pop(None, None)
+    
+    # Row locks make the read + upsert one atomic step for concurrent likers
+    with client.row_locks('global_bar_likes', deltas):
+        counters = client.from_table('global_bar_likes').in_('bar_id', list(deltas)).execute().data
+        current = {counter['bar_id']: counter['total_likes'] for counter in counters}
+        now = _utc_now()
+        upserts = []
+        for bar_id, delta in deltas.items():
+            if bar_id in current:
+                upserts.append({'bar_id': bar_id, 'total_likes': max(0, current[bar_id] + delta), 'last_updated': now})
+            elif delta > 0:
+                upserts.append({'bar_id': bar_id, 'bar_name': names.get(bar_id), 'total_likes': delta, 'last_updated': now})
+        if upserts:
+            client.from_table('global_bar_likes').upsert(upserts, on_conflict='bar_id')
+
+def _like_weekday(like: Dict) -> Optional[int]:
+    """EXTRACT(DOW FROM liked_at): 0 = Sunday .. 6 = Saturday"""
+    moment = _as_datetime(like.get('liked_at') or like.get('created_at'))
+    return None if moment is None else (moment.weekday() + 1) % 7
+
+def update_bar_like_histograms(client, event: str, old_rows: List[Dict], new_rows: List[Dict]):
+    """Mirror of update_bar_like_histograms(): per-venue like counts by time slot and weekday.
+    
+    Popular-time and chart reads then touch one small histogram per venue
+    instead of grouping every like the venue has ever had.
+    """
+    histograms = (
+        ('bar_time_slot_likes', 'like_time_slot', lambda like: like.get('like_time_slot')),
+        ('bar_weekday_likes', 'weekday', _like_weekday)
+    )
+    for table_name, column, bucket_of in histograms:
+        deltas, bar_ids = {}, set()
+        for rows, step in ((new_rows, 1), (old_rows, -1)):
+            for like in rows:
+                key = (like.get('bar_id'), bucket_of(like))
+                if key[0] is None or key[1] is None:
+                    continue
+                deltas[key] = deltas.get(key, 0) + step
+                bar_ids.add(key[0])
+        if not deltas:
+            continue
+        
+        with client.row_locks(table_name, deltas):
+            buckets = client.from_table(table_name).in_('bar_id', list(bar_ids)).execute().data
+            current = {(bucket['bar_id'], bucket[column]): bucket['like_count'] for bucket in buckets}
+            upserts = [
+                {'bar_id': bar_id, column: value, 'like_count': max(0, current.get((bar_id, value), 0) + delta)}
+                for (bar_id, value), delta in deltas.items()
+                if delta and ((bar_id, value) in current or delta > 0)
+            ]
+            if upserts:
+                client.from_table(table_name).upsert(upserts, on_conflict=f'bar_id,{column}')
+
+# venue_interactions column -> running total kept in user_interaction_aggregates
+# (and copied onto user_profiles under the same name)
+INTERACTION_TOTALS = {
+    'beers_consumed': 'total_beers',
+    'shots_consumed': 'total_shots',
+    'pool_games_played': 'total_pool_games',
+    'dart_games_played': 'total_dart_games',
+    'photos_taken': 'photos_taken'
+}
+
+def update_user_stats_from_interaction(client, event: str, old_rows: List[Dict], new_rows: List[Dict]):
+    """Mirror of update_user_stats_from_interaction(), driven by the inserted rows' deltas.
+    
+    Instead of re-aggregating a user's whole history, running sums/counts live in
+    user_interaction_aggregates and the distinct venue/night sets in
+    user_visited_venues/user_night_outs, so each insert costs the same however
+    many interactions the user already has.
+    """
+    deltas = {}
+    for interaction in new_rows:
+        delta = deltas.setdefault(interaction['user_id'], dict.fromkeys(
+            ['bars_hit', 'nights_out', 'drunk_scale_sum', 'drunk_scale_count', *INTERACTION_TOTALS.values()], 0))
+        for column, total in INTERACTION_TOTALS.items():
+            delta[total] += interaction.get(column) or 0
+        if interaction.get('drunk_scale_rating') is not None:
+            delta['drunk_scale_sum'] += interaction['drunk_scale_rating']
+            delta['drunk_scale_count'] += 1
+    
+    # ON CONFLICT DO NOTHING only returns rows that were new to the distinct sets
+    visits = [{'user_id': i['user_id'], 'venue_id': i.get('venue_id')} for i in new_rows
+              if i.get('interaction_type', 'visit') == 'visit']
+    nights = [{'user_id': i['user_id'], 'night_out_id': i['night_out_id']} for i in new_rows
+              if i.get('night_out_id') is not None]
+    for table_name, rows, on_conflict, counter in (
+            ('user_visited_venues', visits, 'user_id,venue_id', 'bars_hit'),
+            ('user_night_outs', nights, 'user_id,night_out_id', 'nights_out')):
+        if rows:
+            added = client.from_table(table_name).upsert(rows, on_conflict=on_conflict, ignore_duplicates=True).data
+            for row in added:
+                deltas[row['user_id']][counter] += 1
+    
+    # The profile copy is written under the same row locks, so it never goes stale
+    with client.row_locks('user_interaction_aggregates', deltas):
+        aggregates = client.from_table('user_interaction_aggregates').in_('user_id', list(deltas)).execute().data
+        current = {aggregate['user_id']: aggregate for aggregate in aggregates}
+        merged = []
+        for user_id, delta in deltas.items():
+            aggregate = current.get(user_id, {})
+            merged.append(dict({column: aggregate.get(column, 0) + value for column, value in delta.items()},
+                               user_id=user_id))
+        client.from_table('user_interaction_aggregates').upsert(merged, on_conflict='user_id')
+        
+        for aggregate in merged:
+            count = aggregate['drunk_scale_count']
+            stats = {column: aggregate[column] for column in ['bars_hit', 'nights_out', *INTERACTION_TOTALS.values()]}
+            stats['avg_drunk_scale'] = round(aggregate['drunk_scale_sum'] / count, 1) if count else 0
+            client.from_table('user_profiles').eq('user_id', aggregate['user_id']).update(stats)
+
+def get_bar_like_count(client, bar_id_param: str) -> int:
+    """Mirror of get_bar_like_count(), read from the trigger-maintained counter"""
+    counter = client.from_table('global_bar_likes').eq('bar_id', bar_id_param).single().data
+    return counter['total_likes'] if counter else 0
+
+def get_bar_popular_time(client, bar_id_param: str) -> str:
+    """Mirror of get_bar_popular_time(), read from the venue's time-slot histogram"""
+    slots = client.from_table('bar_time_slot_likes').eq('bar_id', bar_id_param).gt('like_count', 0).execute().data
+    if not slots:
+        return '21:00'  # Default to 9 PM if no data
+    return min(slots, key=lambda slot: (-slot['like_count'], slot['like_time_slot']))['like_time_slot']
+
+def get_bar_like_histogram(client, bar_id_param: str) -> Dict[str, Dict]:
+    """Mirror of get_bar_like_histogram(): chart data for a venue's likes by time slot and weekday"""
+    slots = client.from_table('bar_time_slot_likes').eq('bar_id', bar_id_param).gt('like_count', 0).execute().data
+    weekdays = client.from_table('bar_weekday_likes').eq('bar_id', bar_id_param).gt('like_count', 0).execute().data
+    return {
+        'time_slots': {slot['like_time_slot']: slot['like_count'] for slot in sorted(slots, key=lambda s: s['like_time_slot'])},
+        'weekdays': {day['weekday']: day['like_count'] for day in sorted(weekdays, key=lambda d: d['weekday'])}
+    }
+
+def has_user_liked_bar_today(client, user_id_param: str, bar_id_param: str) -> bool:
+    """Mirror of has_user_liked_bar_today(), answered from the (user_id, bar_id, local_day) index"""
+    return client.daily_index('bar_likes', ('user_id', 'bar_id')).contains((user_id_param, bar_id_param))
+
+def get_top_bars_by_likes(client, limit_param: int = 10) -> List[Dict]:
+    """Mirror of get_top_bars_by_likes(), read from the trigger-maintained counters"""
+    counters = (
+        client.from_table('global_bar_likes')
+        .gt('total_likes', 0)
+        .order('total_likes', desc=True)
+        .limit(limit_param)
+        .execute()
+        .data
+    )
+    return [{'bar_id': c['bar_id'], 'bar_name': c.get('bar_name'), 'like_count': c['total_likes']}
+            for c in counters]
+
+# Triggers and functions installed on every MockSupabaseClient (see
+# lib/comprehensive-supabase-setup.sql and lib/supabase-global-likes-setup.sql)
+DEFAULT_TRIGGERS = [
+    ('bar_likes', ('INSERT', 'DELETE'), update_global_bar_likes),
+    ('bar_likes', ('INSERT', 'DELETE'), update_bar_like_histograms),
+    ('venue_interactions', 'INSERT', update_user_stats_from_interaction)
+]
+
+DEFAULT_FUNCTIONS = {
+    'get_bar_like_count': get_bar_like_count,
+    'get_bar_popular_time': get_bar_popular_time,
+    'get_bar_like_histogram': get_bar_like_histogram,
+    'has_user_liked_bar_today': has_user_liked_bar_today,
+    'get_top_bars_by_likes': get_top_bars_by_likes
+}
+
 class BarBuddyBackendTester:
-    def __init__(self):
-        self.supabase = MockSupabaseClient()
+    def __init__(self, supabase: Optional[MockSupabaseClient] = None):
+        # Base fixture; each test after schema setup runs on its own fork() of it
+        self.base = supabase or MockSupabaseClient()
+        self.supabase = self.base
         self.test_results = []
         self.test_user_id = str(uuid.uuid4())
         self.test_venue_id = "venue_123"
@@ -149,7 +3360,7 @@ class BarBuddyBackendTester:
                 'bar_id': self.test_venue_id,
                 'bar_name': self.test_venue_name,
                 'like_time_slot': '21:00',
-                'liked_at': datetime.now().isoformat()
+                'liked_at': datetime.now(timezone.utc).isoformat()
             }
             
             like_response = self.supabase.from_table('bar_likes').insert(test_like)
@@ -238,7 +3449,7 @@ class BarBuddyBackendTester:
                 'bar_id': self.test_venue_id,
                 'bar_name': self.test_venue_name,
                 'like_time_slot': '22:00',
-                'liked_at': datetime.now().isoformat(),
+                'liked_at': datetime.now(timezone.utc).isoformat(),
                 'session_id': 'test_session_123'
             }
             
@@ -248,28 +3459,39 @@ class BarBuddyBackendTester:
                 raise Exception(f"Failed to insert like: {like_response.error}")
             
             # Test like count retrieval
-            all_likes = self.supabase.from_table('bar_likes').select('*')._apply_filters()
-            venue_likes = [like for like in all_likes if like['bar_id'] == self.test_venue_id]
+            venue_likes = self.supabase.from_table('bar_likes').select('*').eq('bar_id', self.test_venue_id).execute().data
             like_count = len(venue_likes)
             
             if like_count < 1:
                 raise Exception("Like count retrieval failed")
             
-            # Test popular time calculation
-            time_slots = {}
-            for like in venue_likes:
-                slot = like['like_time_slot']
-                time_slots[slot] = time_slots.get(slot, 0) + 1
-            
-            popular_time = max(time_slots.items(), key=lambda x: x[1])[0] if time_slots else None
+            # Test popular time calculation, read from the trigger-maintained histogram
+            time_slots = self.supabase.rpc('get_bar_like_histogram', {'bar_id_param': self.test_venue_id}).data['time_slots']
+            if sum(time_slots.values()) != like_count:
+                raise Exception(f"Time slot histogram {time_slots} does not cover {like_count} likes")
+            popular_time = self.supabase.rpc('get_bar_popular_time', {'bar_id_param': self.test_venue_id}).data
             
-            # Test daily like limit logic (mock)
-            today = datetime.now().date().isoformat()
-            daily_likes = [like for like in venue_likes 
-                          if like['user_id'] == self.test_user_id and 
-                          like['liked_at'].startswith(today)]
+            # Test daily like limit logic: the (user, bar, local_day) index against a liked_at range scan
+            daily_index = self.supabase.daily_index('bar_likes', ('user_id', 'bar_id'))
+            day_start, day_end = daily_index.window(daily_index.local_day())
+            daily_likes = (
+                self.supabase.from_table('bar_likes')
+                .select('*')
+                .eq('bar_id', self.test_venue_id)
+                .eq('user_id', self.test_user_id)
+                .gte('liked_at', day_start.isoformat())
+                .lt('liked_at', day_end.isoformat())
+                .execute()
+                .data
+            )
+            liked_today = self.supabase.rpc('has_user_liked_bar_today', {
+                'user_id_param': self.test_user_id,
+                'bar_id_param': self.test_venue_id
+            }).data
+            if liked_today != (len(daily_likes) > 0):
+                raise Exception(f"Daily index says liked_today={liked_today}, range scan found {len(daily_likes)}")
             
-            can_like_today = len(daily_likes) < 1  # Daily limit of 1
+            can_like_today = not liked_today  # Daily limit of 1
             
             self.log_test(
                 "Global Like System Backend",
@@ -302,9 +3524,10 @@ class BarBuddyBackendTester:
                 {'threshold': 30, 'title': 'Bar Enthusiast', 'level': 3, 'xp_reward': 200}
             ]
             
-            # Test achievement completion
-            for i, achievement in enumerate(achievement_levels):
-                achievement_data = {
+            # Test achievement completion (one batch insert for every level)
+            completed_at = datetime.now(timezone.utc).isoformat()
+            achievement_rows = [
+                {
                     'user_id': self.test_user_id,
                     'achievement_id': f'bars-visited-level-{achievement["level"]}',
                     'achievement_base_id': 'bars-visited',
@@ -313,16 +3536,17 @@ class BarBuddyBackendTester:
                     'achievement_level': achievement['level'],
                     'xp_reward': achievement['xp_reward'],
                     'popup_shown': False,
-                    'completed_at': datetime.now().isoformat()
+                    'completed_at': completed_at
                 }
-                
-                response = self.supabase.from_table('user_achievements').insert(achievement_data)
-                if response.error:
-                    raise Exception(f"Failed to insert achievement: {response.error}")
+                for achievement in achievement_levels
+            ]
+            
+            response = self.supabase.from_table('user_achievements').insert(achievement_rows)
+            if response.error:
+                raise Exception(f"Failed to insert achievements: {response.error}")
             
             # Test achievement retrieval and popup tracking
-            user_achievements = self.supabase.from_table('user_achievements').select('*')._apply_filters()
-            user_achievements = [a for a in user_achievements if a['user_id'] == self.test_user_id]
+            user_achievements = self.supabase.from_table('user_achievements').select('*').eq('user_id', self.test_user_id).execute().data
             
             # Test popup shown tracking
             unshown_achievements = [a for a in user_achievements if not a['popup_shown']]
@@ -388,7 +3612,7 @@ class BarBuddyBackendTester:
                         'type': 'visit_new_bar',
                         'xpAwarded': 15,
                         'description': 'Visited Test Bar',
-                        'timestamp': datetime.now().isoformat()
+                        'timestamp': datetime.now(timezone.utc).isoformat()
                     }
                 ]
             }
@@ -409,6 +3633,19 @@ class BarBuddyBackendTester:
             if update_response.error:
                 raise Exception(f"Failed to update profile: {update_response.error}")
             
+            # Read back only what a profile card shows, with the user's likes embedded
+            card = self.supabase.from_table('user_profiles').select(
+                'name:username, xp, first_bar:visited_bars->>0, likes:bar_likes(bar_id)'
+            ).eq('user_id', self.test_user_id).single()
+            if card.error or set(card.data) != {'name', 'xp', 'first_bar', 'likes'} or card.data['xp'] != 200:
+                raise Exception(f"Projected profile read failed: {card.error or card.data}")
+            
+            # Casts: a value that cannot convert is a 22P02 error, and ::text renders JSON values as JSON
+            bad_cast = self.supabase.from_table('user_profiles').select('username::int').eq('user_id', self.test_user_id).execute()
+            bars = self.supabase.from_table('user_profiles').select('visited_bars, as_text:visited_bars::text').eq('user_id', self.test_user_id).single().data
+            if (bad_cast.error or {}).get('code') != '22P02' or bars['as_text'] != json.dumps(bars['visited_bars']):
+                raise Exception(f"Select casts failed: {bad_cast.error}, {bars}")
+            
             # Test XP calculation and level progression
             xp = 200
             level = 1 + (xp // 100)  # Simple level calculation: 100 XP per level
@@ -518,42 +3755,103 @@ class BarBuddyBackendTester:
     async def test_database_functions(self):
         """Test 7: Database Functions and Triggers"""
         try:
-            # Test get_bar_like_count function (mock)
-            bar_likes = self.supabase.from_table('bar_likes').select('*')._apply_filters()
-            venue_likes = [like for like in bar_likes if like['bar_id'] == self.test_venue_id]
-            like_count = len(venue_likes)
+            # Test get_bar_like_count function, served by the global_bar_likes counter
+            venue_likes = self.supabase.from_table('bar_likes').select('*').eq('bar_id', self.test_venue_id).execute().data
+            like_count = self.supabase.rpc('get_bar_like_count', {'bar_id_param': self.test_venue_id}).data
+            if like_count != len(venue_likes):
+                raise Exception(f"global_bar_likes counter {like_count} != {len(venue_likes)} likes")
             
-            # Test get_bar_popular_time function (mock)
-            time_slots = {}
+            # Test get_bar_popular_time function against a GROUP BY over the likes
+            histogram = self.supabase.rpc('get_bar_like_histogram', {'bar_id_param': self.test_venue_id}).data
+            time_slots = histogram['time_slots']
+            expected_slots = {}
             for like in venue_likes:
-                slot = like['like_time_slot']
-                time_slots[slot] = time_slots.get(slot, 0) + 1
-            
-            popular_time = max(time_slots.items(), key=lambda x: x[1])[0] if time_slots else '21:00'
-            
-            # Test get_top_bars_by_likes function (mock)
-            all_likes = self.supabase.from_table('bar_likes').select('*')._apply_filters()
-            bar_like_counts = {}
-            for like in all_likes:
-                bar_id = like['bar_id']
-                bar_like_counts[bar_id] = bar_like_counts.get(bar_id, 0) + 1
-            
-            top_bars = sorted(bar_like_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-            
-            # Test has_user_liked_bar_today function (mock)
-            today = datetime.now().date().isoformat()
-            user_likes_today = [
-                like for like in all_likes 
-                if like['user_id'] == self.test_user_id and 
-                like['bar_id'] == self.test_venue_id and
-                like['liked_at'].startswith(today)
-            ]
-            has_liked_today = len(user_likes_today) > 0
+                expected_slots[like['like_time_slot']] = expected_slots.get(like['like_time_slot'], 0) + 1
+            if time_slots != expected_slots:
+                raise Exception(f"Time slot histogram {time_slots} != {expected_slots}")
+            popular_time = self.supabase.rpc('get_bar_popular_time', {'bar_id_param': self.test_venue_id}).data
+            if time_slots and time_slots[popular_time] != max(time_slots.values()):
+                raise Exception(f"Popular time {popular_time} is not the busiest slot")
+            
+            # Test get_top_bars_by_likes function (reads the counters, not every like)
+            top_bars = self.supabase.rpc('get_top_bars_by_likes', {'limit_param': 10}).data
+            
+            # Test has_user_liked_bar_today function, including a like from before the 5 AM rollover
+            has_liked_today = self.supabase.rpc('has_user_liked_bar_today', {
+                'user_id_param': self.test_user_id,
+                'bar_id_param': self.test_venue_id
+            }).data
+            daily_index = self.supabase.daily_index('bar_likes', ('user_id', 'bar_id'))
+            day_start, _ = daily_index.window(daily_index.local_day())
+            late_venue_id = f'late_venue_{uuid.uuid4().hex[:8]}'
+            self.supabase.from_table('bar_likes').insert({
+                'user_id': self.test_user_id,
+                'bar_id': late_venue_id,
+                'bar_name': 'Last Call Bar',
+                'like_time_slot': '23:30',
+                'liked_at': (day_start - timedelta(minutes=1)).isoformat()
+            })
+            if self.supabase.rpc('has_user_liked_bar_today', {
+                    'user_id_param': self.test_user_id, 'bar_id_param': late_venue_id}).data:
+                raise Exception("A like from before the rollover counted toward today")
+            self.supabase.from_table('bar_likes').eq('bar_id', late_venue_id).delete()
+            
+            # Offset-aware timestamps are one instant however they are written, and read back in UTC
+            tokyo = timezone(timedelta(hours=9))
+            tz_venue_id = f'tz_venue_{uuid.uuid4().hex[:8]}'
+            tz_like = self.supabase.from_table('bar_likes').insert({
+                'user_id': self.test_user_id,
+                'bar_id': tz_venue_id,
+                'bar_name': 'Tokyo Time Bar',
+                'like_time_slot': '22:00',
+                'liked_at': datetime.now(tokyo).isoformat()
+            }).data
+            liked_in_zone = self.supabase.rpc('has_user_liked_bar_today', {
+                'user_id_param': self.test_user_id, 'bar_id_param': tz_venue_id}).data
+            self.supabase.from_table('bar_likes').eq('bar_id', tz_venue_id).delete()
+            if not liked_in_zone or not tz_like['liked_at'].endswith('+00:00'):
+                raise Exception(f"A like stamped at UTC+9 ({tz_like['liked_at']}) did not count toward today")
+            instant = datetime(2024, 3, 1, 23, 30, tzinfo=tokyo)
+            if not (_encode_timestamp(instant) == _encode_timestamp(instant.isoformat())
+                    == _encode_timestamp('2024-03-01T14:30:00+00:00') == _encode_timestamp('2024-03-01T14:30:00')):
+                raise Exception("The same instant encoded differently as a string, a datetime or a naive UTC value")
+            if _format_timestamp(_encode_timestamp(instant)) != '2024-03-01T14:30:00+00:00':
+                raise Exception("An encoded timestamp did not read back as its UTC instant")
+            # A timestamp operand that does not parse is an error, not a filter that matches nothing
+            likes_before = len(self.supabase.from_table('bar_likes').execute().data)
+            bad_read = self.supabase.from_table('bar_likes').gte('liked_at', 'notadate').execute()
+            bad_delete = self.supabase.from_table('bar_likes').in_('liked_at', ['notadate']).delete()
+            codes = [(response.error or {}).get('code') for response in (bad_read, bad_delete)]
+            if codes != ['22007', '22007'] or len(self.supabase.from_table('bar_likes').execute().data) != likes_before:
+                raise Exception(f"Unparsable timestamp filters gave {bad_read.error} and {bad_delete.error}")
             
             # Test trigger functionality (mock)
             profile_updates = self.supabase.from_table('user_profiles').select('*')._apply_filters()
             updated_profiles = [p for p in profile_updates if 'updated_at' in p]
-            trigger_working = len(updated_profiles) > 0
+            
+            # Like then unlike a venue; the counter trigger must follow both
+            trigger_venue_id = f'trigger_venue_{uuid.uuid4().hex[:8]}'
+            with self.supabase.snapshot() as snapshot:
+                self.supabase.from_table('bar_likes').insert({
+                    'user_id': self.test_user_id,
+                    'bar_id': trigger_venue_id,
+                    'bar_name': 'Trigger Test Bar',
+                    'like_time_slot': '23:00',
+                    'liked_at': datetime.now(timezone.utc).isoformat()
+                })
+                count_after_like = self.supabase.rpc('get_bar_like_count', {'bar_id_param': trigger_venue_id}).data
+                self.supabase.from_table('bar_likes').eq('bar_id', trigger_venue_id).delete()
+                count_after_unlike = self.supabase.rpc('get_bar_like_count', {'bar_id_param': trigger_venue_id}).data
+                # A snapshot taken before the like sees neither the like nor the unlike
+                snapshot_likes = snapshot.from_table('bar_likes').eq('bar_id', self.test_venue_id).execute().data
+                snapshot_isolated = (
+                    len(snapshot_likes) == len(venue_likes)
+                    and snapshot.rpc('get_bar_like_count', {'bar_id_param': trigger_venue_id}).data == 0
+                )
+            if not snapshot_isolated or self.supabase.versions.retained():
+                raise Exception("Snapshot read saw later writes or kept versions after closing")
+            
+            trigger_working = len(updated_profiles) > 0 and count_after_like == 1 and count_after_unlike == 0
             
             self.log_test(
                 "Database Functions and Triggers",
@@ -565,7 +3863,9 @@ class BarBuddyBackendTester:
                     'top_bars_count': len(top_bars),
                     'has_liked_today': has_liked_today,
                     'trigger_working': trigger_working,
-                    'time_slot_distribution': time_slots
+                    'snapshot_isolated': snapshot_isolated,
+                    'time_slot_distribution': time_slots,
+                    'weekday_distribution': histogram['weekdays']
                 }
             )
             
@@ -606,7 +3906,7 @@ class BarBuddyBackendTester:
                 'bar_id': 'persistence_venue',
                 'bar_name': 'Persistence Test Bar',
                 'like_time_slot': '20:30',
-                'liked_at': datetime.now().isoformat()
+                'liked_at': datetime.now(timezone.utc).isoformat()
             }
             
             like_response = self.supabase.from_table('bar_likes').insert(like_data)
@@ -642,12 +3942,27 @@ class BarBuddyBackendTester:
                 achievement_increment == 1
             )
             
+            # Lazy reads must see the same rows: a cursor and keyset pages in liked_at order
+            cursor_total = sum(1 for _ in self.supabase.from_table('bar_likes').cursor(batch_size=2))
+            keyset_total = sum(len(page) for page in self.supabase.from_table('bar_likes').keyset('liked_at', page_size=2))
+            operations.append(('lazy_reads', cursor_total == keyset_total == final_like_count))
+            
+            # Columnar tallies: a value updated to NULL must leave the value counts, with or without NumPy
+            columnar = MockSupabaseClient(storage='columnar')
+            columnar.from_table('user_profiles').insert([
+                {'user_id': f'tally_{xp}', 'username': f'tally_{xp}', 'xp': xp} for xp in (0, 1, 2)
+            ])
+            columnar.from_table('user_profiles').eq('user_id', 'tally_2').update({'xp': None})
+            xp_column = columnar.data['user_profiles'].columns['xp']
+            tallies = [xp_column._tally()] + ([xp_column._tally_numpy()] if np is not None else [])
+            operations.append(('columnar_null_counts',
+                               columnar.from_table('user_profiles').value_counts('xp') == {0: 1, 1: 1, None: 1}
+                               and all(tally == ({0: 1, 1: 1}, 1) for tally in tallies)))
+            
             # Test referential integrity (mock)
             user_profile = self.supabase.from_table('user_profiles').eq('user_id', new_user_id).single()
-            user_likes = [like for like in self.supabase.from_table('bar_likes').select('*')._apply_filters() 
-                         if like['user_id'] == new_user_id]
-            user_achievements = [ach for ach in self.supabase.from_table('user_achievements').select('*')._apply_filters() 
-                               if ach['user_id'] == new_user_id]
+            user_likes = self.supabase.from_table('bar_likes').select('*').eq('user_id', new_user_id).execute().data
+            user_achievements = self.supabase.from_table('user_achievements').select('*').eq('user_id', new_user_id).execute().data
             
             referential_integrity = (
                 user_profile.data is not None and
@@ -655,9 +3970,34 @@ class BarBuddyBackendTester:
                 len(user_achievements) > 0
             )
             
+            # Concurrent app sessions on one event loop, each liking its own venue
+            # while a yielding full-table read runs; the read sees the state it began with
+            db = AsyncMockSupabaseClient(self.supabase, yield_every=64)
+            async def session(venue_id):
+                like = await db.table('bar_likes').insert({
+                    'user_id': new_user_id,
+                    'bar_id': venue_id,
+                    'bar_name': 'Session Bar',
+                    'like_time_slot': '22:00'
+                }).execute()
+                count = await db.rpc('get_bar_like_count', {'bar_id_param': venue_id}).execute()
+                return like.error is None and count.data == 1
+            full_read, *sessions = await asyncio.gather(
+                db.table('bar_likes').select('*').execute(),
+                *(session(f'session_venue_{i}') for i in range(20))
+            )
+            concurrent_sessions = all(sessions) and len(full_read.data) == final_like_count
+            operations.append(('concurrent_sessions', concurrent_sessions))
+            
             all_operations_successful = all(success for _, success in operations)
             
-            if not (consistency_check and referential_integrity and all_operations_successful):
+            # This test writes to a fork; the base fixture must not see any of it
+            base_isolated = self.supabase is self.base or (
+                len(self.base.from_table('user_profiles').select('*')._apply_filters()) == initial_profile_count and
+                not self.base.from_table('bar_likes').eq('user_id', new_user_id).execute().data
+            )
+            
+            if not (consistency_check and referential_integrity and all_operations_successful and base_isolated):
                 raise Exception("Data persistence or consistency check failed")
             
             self.log_test(
@@ -668,6 +4008,7 @@ class BarBuddyBackendTester:
                     'operations_successful': all_operations_successful,
                     'data_consistency': consistency_check,
                     'referential_integrity': referential_integrity,
+                    'base_isolated': base_isolated,
                     'profile_increment': profile_increment,
                     'like_increment': like_increment,
                     'achievement_increment': achievement_increment,
@@ -684,6 +4025,142 @@ class BarBuddyBackendTester:
                 f"Data persistence test failed: {str(e)}"
             )
     
+    async def test_like_trigger_race(self):
+        """Test 9: An Unlike Racing a Like's Triggers"""
+        try:
+            # The like's INSERT triggers are held open until the unlike either waits on the
+            # bar_likes latch or finishes, so the two interleave the same way on every run
+            locked = MockSupabaseClient(locking='sharded')
+            trigger_started, trigger_release, unlike_settled = threading.Event(), threading.Event(), threading.Event()
+            waited = []
+            
+            def held_trigger(client, event, old_rows, new_rows):
+                trigger_started.set()
+                trigger_release.wait()
+            
+            class WatchedLock:
+                """The bar_likes latch's RLock, reporting when an acquire has to wait"""
+                def __init__(self, lock):
+                    self.lock = lock
+                
+                def acquire(self, blocking=True):
+                    if self.lock.acquire(blocking=False):
+                        return True
+                    waited.append(True)
+                    unlike_settled.set()
+                    return blocking and self.lock.acquire()
+                
+                def release(self):
+                    self.lock.release()
+            
+            locked.triggers[('bar_likes', 'INSERT')].insert(0, held_trigger)
+            latch = locked.locks.latch('bar_likes')
+            latch.lock = WatchedLock(latch.lock)
+            like_data = {
+                'user_id': self.test_user_id,
+                'bar_id': self.test_venue_id,
+                'bar_name': self.test_venue_name,
+                'like_time_slot': '22:00',
+                'liked_at': datetime.now(timezone.utc).isoformat()
+            }
+            
+            def unlike():
+                try:
+                    locked.from_table('bar_likes').eq('bar_id', self.test_venue_id).delete()
+                finally:
+                    unlike_settled.set()
+            
+            liker = threading.Thread(target=locked.from_table('bar_likes').insert, args=(like_data,))
+            unliker = threading.Thread(target=unlike)
+            try:
+                liker.start()
+                trigger_started.wait()
+                unliker.start()
+                unlike_settled.wait()
+            finally:
+                trigger_release.set()
+                liker.join()
+                unliker.join()
+            
+            rows = len(locked.from_table('bar_likes').eq('bar_id', self.test_venue_id).execute().data)
+            count = locked.rpc('get_bar_like_count', {'bar_id_param': self.test_venue_id}).data
+            liked_today = locked.rpc('has_user_liked_bar_today', {
+                'user_id_param': self.test_user_id, 'bar_id_param': self.test_venue_id}).data
+            if not waited:
+                raise Exception("The unlike ran while the like's triggers were still running")
+            if not rows == count == int(liked_today):
+                raise Exception(f"Racing unlike left {rows} likes, counter {count}, liked_today={liked_today}")
+            
+            self.log_test(
+                "Like Trigger Race",
+                True,
+                "An unlike waits for a like's triggers, and the derived tables agree with bar_likes",
+                {'likes': rows, 'total_likes': count, 'liked_today': liked_today}
+            )
+            
+        except Exception as e:
+            self.log_test(
+                "Like Trigger Race",
+                False,
+                f"Like trigger race test failed: {str(e)}"
+            )
+    
+    async def test_query_log(self):
+        """Test 10: Query Log Instrumentation"""
+        try:
+            # A client of its own, so each read below is the only query its entry can come from
+            query_log = QueryLog(slow_ms=0)
+            client = MockSupabaseClient(query_log=query_log)
+            users = [str(uuid.uuid4()) for _ in range(5)]
+            client.from_table('user_profiles').insert([
+                {'user_id': user_id, 'username': f'log_user_{i}', 'email': f'log_{i}@example.com'}
+                for i, user_id in enumerate(users)
+            ])
+            client.from_table('bar_likes').insert([
+                {'user_id': users[0], 'bar_id': f'log_bar_{i}', 'liked_at': f'2024-03-0{i + 1}T22:00:00+00:00'}
+                for i in range(3)
+            ])
+            
+            async def logged(read) -> List[Dict]:
+                query_log.slow.clear()
+                result = read()
+                if asyncio.iscoroutine(result):
+                    await result
+                return list(query_log.slow)
+            
+            reads = [
+                (lambda: client.from_table('user_profiles').eq('user_id', users[1]).single(),
+                 {'shape': 'select user_profiles where user_id eq', 'access': 'index(user_id)', 'scanned': 1, 'returned': 1}),
+                (lambda: client.from_table('user_profiles').eq('email', 'log_2@example.com').execute(),
+                 {'shape': 'select user_profiles where email eq', 'access': 'column_scan(email)', 'scanned': 5, 'returned': 1}),
+                (lambda: AsyncMockSupabaseClient(client).table('user_profiles').eq('username', 'log_user_3').execute(),
+                 {'shape': 'select user_profiles where username eq', 'access': 'index(username)', 'scanned': 1, 'returned': 1}),
+                (lambda: list(client.from_table('user_profiles').cursor(batch_size=2)),
+                 {'shape': 'cursor user_profiles', 'access': 'full_scan', 'scanned': 5, 'returned': 5}),
+                (lambda: list(client.from_table('bar_likes').keyset('liked_at', page_size=2)),
+                 {'shape': 'keyset bar_likes', 'access': 'index_ordered(liked_at)', 'scanned': 3, 'returned': 3})
+            ]
+            for read, expected in reads:
+                entries = await logged(read)
+                recorded = [{field: entry[field] for field in expected} for entry in entries]
+                if (recorded != [expected] or not entries[0]['ms'] >= 0
+                        or entries[0]['test'] != 'test_query_log'):
+                    raise Exception(f"Expected one {expected} entry, the query log recorded {entries}")
+            
+            self.log_test(
+                "Query Log Instrumentation",
+                True,
+                "Sync, async, cursor and keyset reads each record their table, filters, plan, rows and time",
+                {'shapes': [totals['shape'] for totals in query_log.summary()]}
+            )
+            
+        except Exception as e:
+            self.log_test(
+                "Query Log Instrumentation",
+                False,
+                f"Query log test failed: {str(e)}"
+            )
+    
     async def run_all_tests(self):
         """Run all backend tests"""
         print("🚀 Starting BarBuddy Backend Testing Suite")
@@ -692,15 +4169,18 @@ class BarBuddyBackendTester:
         # Initialize test user
         self.supabase.set_auth_user(self.test_user_id, "test@barbuddy.com")
         
-        # Run all tests
+        # Schema setup seeds the base fixture; every later test starts from an
+        # identical copy-on-write fork of it instead of the previous test's leftovers
+        query_log = self.base.query_log
         await self.test_supabase_schema_setup()
-        await self.test_supabase_client_configuration()
-        await self.test_global_like_system()
-        await self.test_achievement_system()
-        await self.test_user_profile_management()
-        await self.test_trpc_api_routes()
-        await self.test_database_functions()
-        await self.test_data_persistence()
+        for test in (self.test_supabase_client_configuration, self.test_global_like_system,
+                     self.test_achievement_system, self.test_user_profile_management,
+                     self.test_trpc_api_routes, self.test_database_functions, self.test_data_persistence,
+                     self.test_like_trigger_race, self.test_query_log):
+            self.supabase = self.base.fork()
+            with query_log.labelled(test.__name__) if query_log else contextlib.nullcontext():
+                await test()
+        self.supabase = self.base
         
         # Generate summary
         print("\n" + "=" * 60)
@@ -727,6 +4207,10 @@ class BarBuddyBackendTester:
             if result['success']:
                 print(f"  - {result['test']}")
         
+        if query_log:
+            print("\n🔎 QUERY PROFILE (by query shape)")
+            print(query_log.report())
+        
         return {
             'total': total_tests,
             'passed': passed_tests,
@@ -737,7 +4221,18 @@ class BarBuddyBackendTester:
 
 async def main():
     """Main test runner"""
-    tester = BarBuddyBackendTester()
+    parser = argparse.ArgumentParser(description="BarBuddy Backend Testing Suite")
+    parser.add_argument('--snapshot', help="warm-start the mock client from a save_snapshot() file")
+    parser.add_argument('--profile-queries', action='store_true',
+                        help="log every mock query and print a summary by query shape at the end")
+    parser.add_argument('--slow-ms', type=float, default=10.0, help="slow-query log threshold (with --profile-queries)")
+    args = parser.parse_args()
+    query_log = QueryLog(args.slow_ms) if args.profile_queries else None
+    if args.snapshot:
+        supabase = MockSupabaseClient.load_snapshot(args.snapshot, query_log=query_log)
+    else:
+        supabase = MockSupabaseClient(query_log=query_log) if query_log else None
+    tester = BarBuddyBackendTester(supabase)
     results = await tester.run_all_tests()
     
     # Exit with appropriate code
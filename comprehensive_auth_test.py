@@ -12,12 +12,15 @@ import requests
 import subprocess
 from datetime import datetime
 from typing import Dict, Any, Optional, List
+from latency_histogram import LatencyHistogram, format_header, format_row
 
 class ComprehensiveAuthTester:
     def __init__(self):
         self.test_results = []
         self.backend_url = "http://localhost:8001"
         self.web_server_url = "http://localhost:8080"
+        # "GET url" -> LatencyHistogram of response.elapsed
+        self.latencies = {}
         
     def log_test(self, test_name: str, success: bool, message: str, details: Optional[Dict] = None):
         """Log test results"""
@@ -35,6 +38,13 @@ class ComprehensiveAuthTester:
         if details:
             print(f"   Details: {json.dumps(details, indent=2)}")
     
+    def record_latency(self, response) -> float:
+        """Count response.elapsed toward its URL's histogram; returns it in seconds"""
+        elapsed = response.elapsed.total_seconds()
+        name = f"{response.request.method} {response.request.path_url}"
+        self.latencies.setdefault(name, LatencyHistogram()).record(elapsed * 1000)
+        return elapsed
+    
     async def test_complete_system_status(self):
         """Test 1: Complete System Status Check"""
         try:
@@ -45,7 +55,7 @@ class ComprehensiveAuthTester:
                 backend_response = requests.get(f"{self.backend_url}/api", timeout=5)
                 system_status['backend'] = {
                     'running': backend_response.status_code == 200,
-                    'response_time': backend_response.elapsed.total_seconds(),
+                    'response_time': self.record_latency(backend_response),
                     'endpoints': backend_response.json().get('endpoints', {}) if backend_response.status_code == 200 else {}
                 }
             except Exception as e:
@@ -56,7 +66,7 @@ class ComprehensiveAuthTester:
                 web_response = requests.get(f"{self.web_server_url}/login-test.html", timeout=5)
                 system_status['web_server'] = {
                     'running': web_response.status_code == 200,
-                    'response_time': web_response.elapsed.total_seconds(),
+                    'response_time': self.record_latency(web_response),
                     'page_size': len(web_response.text) if web_response.status_code == 200 else 0
                 }
             except Exception as e:
@@ -125,6 +135,7 @@ class ComprehensiveAuthTester:
         try:
             # Get login page content for analysis
             response = requests.get(f"{self.web_server_url}/login-test.html", timeout=10)
+            self.record_latency(response)
             login_html = response.text
             
             # Validate Supabase integration
@@ -229,7 +240,7 @@ class ComprehensiveAuthTester:
                         'expected_status': endpoint['expected_status'],
                         'actual_status': response.status_code,
                         'success': success,
-                        'response_time': response.elapsed.total_seconds(),
+                        'response_time': self.record_latency(response),
                         'has_json_response': False
                     }
                     
@@ -283,6 +294,7 @@ class ComprehensiveAuthTester:
         try:
             # Get login page content
             response = requests.get(f"{self.web_server_url}/login-test.html", timeout=10)
+            self.record_latency(response)
             login_html = response.text
             
             # Test complete authentication flows
@@ -572,12 +584,19 @@ class ComprehensiveAuthTester:
         print("✅ Security considerations: Tested")
         print("✅ Production readiness: Assessed")
         
+        if self.latencies:
+            print("\n⏱️  RESPONSE TIMES (response.elapsed per URL)")
+            print(format_header())
+            for name, histogram in self.latencies.items():
+                print(format_row(name, histogram))
+        
         return {
             'total': total_tests,
             'passed': passed_tests,
             'failed': failed_tests,
             'success_rate': (passed_tests/total_tests)*100,
             'results': self.test_results,
+            'latencies': {name: histogram.summary() for name, histogram in self.latencies.items()},
             'system_ready': passed_tests >= total_tests * 0.8
         }
 
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+BarBuddy Latency Histograms
+Log-linear (HdrHistogram-style) latency histograms for the API and load tests: constant relative
+precision from microseconds to minutes, O(1) recording, and exact merging across endpoints, workers
+and runs, so p99/p99.9 come from every sample rather than an average or a single response.elapsed.
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import sys
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Percentiles every latency report prints (SLOs are written against these)
+REPORT_PERCENTILES = (50, 90, 99, 99.9)
+
+# Name of the merge of every endpoint's histogram in reports and latency.json
+ALL_ENDPOINTS = 'all endpoints'
+
+class LatencyHistogram:
+    """Latency counts in log-linear microsecond buckets.
+    
+    Values below 2**sub_bits µs are counted exactly; above that, every power
+    of two is split into 2**(sub_bits - 1) equal buckets, so each recorded
+    value is known to better than 1 part in 2**(sub_bits - 1) (0.8% at the
+    default 2 significant digits). Buckets live in a sparse dict, so two
+    histograms of the same precision merge by adding counts.
+    """
+    def __init__(self, significant_digits: int = 2):
+        if not 1 <= significant_digits <= 5:
+            raise ValueError("significant_digits must be between 1 and 5")
+        self.significant_digits = significant_digits
+        self.sub_bits = math.ceil(math.log2(2 * 10 ** significant_digits))
+        self.sub_count = 1 << self.sub_bits
+        self.half_count = self.sub_count >> 1
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+        self.sum_us = 0
+        self.min_us: Optional[int] = None
+        self.max_us = 0
+    
+    def _index(self, value_us: int) -> int:
+        shift = value_us.bit_length() - self.sub_bits
+        if shift <= 0:
+            return value_us
+        return shift * self.half_count + (value_us >> shift)
+    
+    def _bounds(self, index: int) -> Tuple[int, int]:
+        """Lowest and highest microsecond value counted in a bucket"""
+        if index < self.sub_count:
+            return index, index
+        shift = index // self.half_count - 1
+        sub = index - shift * self.half_count
+        return sub << shift, ((sub + 1) << shift) - 1
+    
+    def record(self, ms: float, count: int = 1):
+        """Count one latency (in milliseconds), or `count` identical ones"""
+        value_us = int(ms * 1000 + 0.5)
+        if value_us < 0:
+            raise ValueError(f"negative latency: {ms}ms")
+        index = self._index(value_us)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.total += count
+        self.sum_us += value_us * count
+        if self.min_us is None or value_us < self.min_us:
+            self.min_us = value_us
+        if value_us > self.max_us:
+            self.max_us = value_us
+    
+    def merge(self, other: 'LatencyHistogram') -> 'LatencyHistogram':
+        """Add other's counts into this histogram (same precision only); returns self"""
+        if other.significant_digits != self.significant_digits:
+            raise ValueError(f"cannot merge a {other.significant_digits}-digit histogram "
+                             f"into a {self.significant_digits}-digit one")
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+        self.sum_us += other.sum_us
+        if other.min_us is not None and (self.min_us is None or other.min_us < self.min_us):
+            self.min_us = other.min_us
+        self.max_us = max(self.max_us, other.max_us)
+        return self
+    
+    @property
+    def max_ms(self) -> float:
+        return self.max_us / 1000
+    
+    @property
+    def min_ms(self) -> float:
+        return (self.min_us or 0) / 1000
+    
+    @property
+    def mean_ms(self) -> float:
+        return self.sum_us / self.total / 1000 if self.total else 0.0
+    
+    def _cumulative(self) -> Iterator[Tuple[int, int]]:
+        """(bucket index, count at or below it) in value order"""
+        running = 0
+        for index in sorted(self.counts):
+            running += self.counts[index]
+            yield index, running
+    
+    def _at_rank(self, rank: int, buckets: List[Tuple[int, int]]) -> Tuple[int, int]:
+        """Highest equivalent value (µs, capped at max) of the rank-th smallest sample, and the count at or below it"""
+        for index, running in buckets:
+            if running >= rank:
+                return min(self._bounds(index)[1], self.max_us), running
+        return self.max_us, self.total
+    
+    def percentile(self, pct: float) -> float:
+        """Latency (ms) that pct% of recorded samples are at or below"""
+        if not self.total:
+            return 0.0
+        rank = max(1, math.ceil(pct / 100 * self.total))
+        return self._at_rank(rank, list(self._cumulative()))[0] / 1000
+    
+    def summary(self) -> Dict[str, float]:
+        """count, mean, the REPORT_PERCENTILES and max, in ms"""
+        stats = {'count': self.total, 'mean_ms': self.mean_ms}
+        for pct in REPORT_PERCENTILES:
+            stats[f'p{pct:g}_ms'] = self.percentile(pct)
+        stats['max_ms'] = self.max_ms
+        return stats
+    
+    def to_dict(self) -> Dict:
+        """JSON-ready form; from_dict() of it merges exactly with histograms from other runs"""
+        return {
+            'significant_digits': self.significant_digits,
+            'total': self.total, 'sum_us': self.sum_us, 'min_us': self.min_us, 'max_us': self.max_us,
+            'counts': {str(index): count for index, count in sorted(self.counts.items())},
+            'summary': self.summary()
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'LatencyHistogram':
+        histogram = cls(data['significant_digits'])
+        histogram.counts = {int(index): count for index, count in data['counts'].items()}
+        histogram.total = data['total']
+        histogram.sum_us = data['sum_us']
+        histogram.min_us = data['min_us']
+        histogram.max_us = data['max_us']
+        return histogram
+    
+    def percentile_distribution(self, ticks_per_half: int = 5) -> str:
+        """HdrHistogram's percentile-distribution text (.hgrm), in ms, for its plotters and spreadsheets.
+        
+        Rows step ticks_per_half times through each halving of the remaining
+        distance to 100%, so the tail is sampled as densely as the body.
+        """
+        lines = [f"{'Value':>12} {'Percentile':>14} {'TotalCount':>10} {'1/(1-Percentile)':>14}", ""]
+        buckets = list(self._cumulative())
+        pct = 0.0
+        while self.total and pct < 100:
+            value_us, running = self._at_rank(max(1, math.ceil(pct / 100 * self.total)), buckets)
+            if running >= self.total:
+                break
+            lines.append(f"{value_us / 1000:12.3f} {pct / 100:2.12f} {running:10d} {1 / (1 - pct / 100):14.2f}")
+            pct += 100 / (ticks_per_half * 2 ** (math.floor(math.log2(100 / (100 - pct))) + 1))
+        lines.append(f"{self.max_ms:12.3f} {1:2.12f} {self.total:10d}")
+        variance = 0.0
+        if self.total:
+            mean_us = self.sum_us / self.total
+            for index, count in self.counts.items():
+                low, high = self._bounds(index)
+                variance += count * ((low + high) / 2 - mean_us) ** 2
+            variance /= self.total
+        magnitudes = max(1, self.max_us.bit_length() - self.sub_bits + 1)
+        lines += [f"#[Mean    = {self.mean_ms:12.3f}, StdDeviation   = {math.sqrt(variance) / 1000:12.3f}]",
+                  f"#[Max     = {self.max_ms:12.3f}, Total count    = {self.total:12d}]",
+                  f"#[Buckets = {magnitudes:12d}, SubBuckets     = {self.sub_count:12d}]"]
+        return '\n'.join(lines) + '\n'
+
+def _slug(name: str) -> str:
+    return re.sub(r'[^A-Za-z0-9.]+', '_', name).strip('_') or 'root'
+
+def save_histograms(histograms: Dict[str, LatencyHistogram], directory: str) -> List[str]:
+    """Write latency.json (every histogram, mergeable) and one .hgrm per name into directory"""
+    os.makedirs(directory, exist_ok=True)
+    paths = [os.path.join(directory, 'latency.json')]
+    with open(paths[0], 'w') as f:
+        json.dump({name: histogram.to_dict() for name, histogram in histograms.items()}, f, indent=2)
+    for name, histogram in histograms.items():
+        paths.append(os.path.join(directory, f"{_slug(name)}.hgrm"))
+        with open(paths[-1], 'w') as f:
+            f.write(histogram.percentile_distribution())
+    return paths
+
+def load_histograms(path: str) -> Dict[str, LatencyHistogram]:
+    with open(path) as f:
+        return {name: LatencyHistogram.from_dict(data) for name, data in json.load(f).items()}
+
+def format_row(name: str, histogram: LatencyHistogram, width: int = 36) -> str:
+    """One report line: name, sample count, REPORT_PERCENTILES and max"""
+    if not histogram.total:
+        return f"{name:<{width}} {0:>7}" + f" {'-':>9}" * (len(REPORT_PERCENTILES) + 1)
+    cells = ''.join(f" {histogram.percentile(pct):>7.1f}ms" for pct in REPORT_PERCENTILES)
+    return f"{name:<{width}} {histogram.total:>7,}{cells} {histogram.max_ms:>7.1f}ms"
+
+def format_header(width: int = 36) -> str:
+    cells = ''.join(f" {f'p{pct:g}':>9}" for pct in REPORT_PERCENTILES)
+    return f"{'endpoint':<{width}} {'n':>7}{cells} {'max':>9}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge latency.json files from several runs and report them")
+    parser.add_argument('files', nargs='+', help="latency.json files written by --histograms")
+    parser.add_argument('--out', help="also write the merged latency.json and .hgrm files here")
+    args = parser.parse_args()
+    
+    merged: Dict[str, LatencyHistogram] = {}
+    for path in args.files:
+        for name, histogram in load_histograms(path).items():
+            if name != ALL_ENDPOINTS:
+                merged[name] = merged[name].merge(histogram) if name in merged else histogram
+    if not merged:
+        print("no histograms found")
+        return 1
+    overall = LatencyHistogram(next(iter(merged.values())).significant_digits)
+    for histogram in merged.values():
+        overall.merge(histogram)
+    print(f"⏱️  {len(args.files)} run(s) merged")
+    print(format_header())
+    for name, histogram in merged.items():
+        print(format_row(name, histogram))
+    print(format_row(ALL_ENDPOINTS, overall))
+    merged[ALL_ENDPOINTS] = overall
+    if args.out:
+        for path in save_histograms(merged, args.out):
+            print(f"💾 {path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -220,6 +220,34 @@ CREATE TABLE IF NOT EXISTS night_out_sessions (
   created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Running per-user totals kept by update_user_stats_from_interaction()
+CREATE TABLE IF NOT EXISTS user_interaction_aggregates (
+  user_id TEXT PRIMARY KEY REFERENCES user_profiles(user_id) ON DELETE CASCADE,
+  bars_hit INTEGER DEFAULT 0,
+  nights_out INTEGER DEFAULT 0,
+  total_beers BIGINT DEFAULT 0,
+  total_shots BIGINT DEFAULT 0,
+  total_pool_games BIGINT DEFAULT 0,
+  total_dart_games BIGINT DEFAULT 0,
+  photos_taken BIGINT DEFAULT 0,
+  drunk_scale_sum BIGINT DEFAULT 0,
+  drunk_scale_count BIGINT DEFAULT 0,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Distinct venues visited / nights out per user, for the bars_hit and nights_out counts
+CREATE TABLE IF NOT EXISTS user_visited_venues (
+  user_id TEXT NOT NULL REFERENCES user_profiles(user_id) ON DELETE CASCADE,
+  venue_id TEXT NOT NULL,
+  PRIMARY KEY (user_id, venue_id)
+);
+
+CREATE TABLE IF NOT EXISTS user_night_outs (
+  user_id TEXT NOT NULL REFERENCES user_profiles(user_id) ON DELETE CASCADE,
+  night_out_id TEXT NOT NULL,
+  PRIMARY KEY (user_id, night_out_id)
+);
+
 -- Create comprehensive indexes for performance
 CREATE INDEX IF NOT EXISTS idx_user_profiles_user_id ON user_profiles(user_id);
 CREATE INDEX IF NOT EXISTS idx_user_profiles_username ON user_profiles(username);
@@ -266,6 +294,9 @@ ALTER TABLE venue_interactions ENABLE ROW LEVEL SECURITY;
 ALTER TABLE user_achievements ENABLE ROW LEVEL SECURITY;
 ALTER TABLE user_stats ENABLE ROW LEVEL SECURITY;
 ALTER TABLE night_out_sessions ENABLE ROW LEVEL SECURITY;
+ALTER TABLE user_interaction_aggregates ENABLE ROW LEVEL SECURITY;
+ALTER TABLE user_visited_venues ENABLE ROW LEVEL SECURITY;
+ALTER TABLE user_night_outs ENABLE ROW LEVEL SECURITY;
 
 -- Create comprehensive RLS policies
 
@@ -332,6 +363,15 @@ DROP POLICY IF EXISTS "Users can manage their sessions" ON night_out_sessions;
 CREATE POLICY "Users can view all sessions" ON night_out_sessions FOR SELECT USING (true);
 CREATE POLICY "Users can manage their sessions" ON night_out_sessions FOR ALL USING (true);
 
+-- Stats aggregates (public read, written by the interaction trigger)
+DROP POLICY IF EXISTS "Anyone can view interaction aggregates" ON user_interaction_aggregates;
+DROP POLICY IF EXISTS "Anyone can view visited venues" ON user_visited_venues;
+DROP POLICY IF EXISTS "Anyone can view night outs" ON user_night_outs;
+
+CREATE POLICY "Anyone can view interaction aggregates" ON user_interaction_aggregates FOR SELECT USING (true);
+CREATE POLICY "Anyone can view visited venues" ON user_visited_venues FOR SELECT USING (true);
+CREATE POLICY "Anyone can view night outs" ON user_night_outs FOR SELECT USING (true);
+
 -- Create utility functions
 
 -- Function to update updated_at timestamp
@@ -366,59 +406,80 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
--- Function to update user stats from interactions
+-- Function to update user stats from interactions.
+-- Applies the inserted row's deltas to running totals instead of re-aggregating
+-- the user's whole venue_interactions history, so cost per insert stays flat.
 CREATE OR REPLACE FUNCTION update_user_stats_from_interaction()
 RETURNS TRIGGER AS $$
+DECLARE
+    new_bars INTEGER := 0;
+    new_nights INTEGER := 0;
+    agg user_interaction_aggregates%ROWTYPE;
 BEGIN
     IF TG_OP = 'INSERT' THEN
+        -- Distinct venues/nights only count the first time they are seen
+        IF NEW.interaction_type = 'visit' THEN
+            INSERT INTO user_visited_venues (user_id, venue_id)
+            VALUES (NEW.user_id, NEW.venue_id)
+            ON CONFLICT DO NOTHING;
+            GET DIAGNOSTICS new_bars = ROW_COUNT;
+        END IF;
+
+        IF NEW.night_out_id IS NOT NULL THEN
+            INSERT INTO user_night_outs (user_id, night_out_id)
+            VALUES (NEW.user_id, NEW.night_out_id)
+            ON CONFLICT DO NOTHING;
+            GET DIAGNOSTICS new_nights = ROW_COUNT;
+        END IF;
+
+        INSERT INTO user_interaction_aggregates AS a (
+            user_id, bars_hit, nights_out, total_beers, total_shots, total_pool_games,
+            total_dart_games, photos_taken, drunk_scale_sum, drunk_scale_count, updated_at
+        ) VALUES (
+            NEW.user_id,
+            new_bars,
+            new_nights,
+            COALESCE(NEW.beers_consumed, 0),
+            COALESCE(NEW.shots_consumed, 0),
+            COALESCE(NEW.pool_games_played, 0),
+            COALESCE(NEW.dart_games_played, 0),
+            COALESCE(NEW.photos_taken, 0),
+            COALESCE(NEW.drunk_scale_rating, 0),
+            (NEW.drunk_scale_rating IS NOT NULL)::INTEGER,
+            NOW()
+        )
+        ON CONFLICT (user_id) DO UPDATE SET
+            bars_hit = a.bars_hit + EXCLUDED.bars_hit,
+            nights_out = a.nights_out + EXCLUDED.nights_out,
+            total_beers = a.total_beers + EXCLUDED.total_beers,
+            total_shots = a.total_shots + EXCLUDED.total_shots,
+            total_pool_games = a.total_pool_games + EXCLUDED.total_pool_games,
+            total_dart_games = a.total_dart_games + EXCLUDED.total_dart_games,
+            photos_taken = a.photos_taken + EXCLUDED.photos_taken,
+            drunk_scale_sum = a.drunk_scale_sum + EXCLUDED.drunk_scale_sum,
+            drunk_scale_count = a.drunk_scale_count + EXCLUDED.drunk_scale_count,
+            updated_at = NOW()
+        RETURNING * INTO agg;
+
         -- Update user profile stats
         UPDATE user_profiles SET
-            bars_hit = (
-                SELECT COUNT(DISTINCT venue_id) 
-                FROM venue_interactions 
-                WHERE user_id = NEW.user_id AND interaction_type = 'visit'
-            ),
-            total_beers = (
-                SELECT COALESCE(SUM(beers_consumed), 0)
-                FROM venue_interactions 
-                WHERE user_id = NEW.user_id
-            ),
-            total_shots = (
-                SELECT COALESCE(SUM(shots_consumed), 0)
-                FROM venue_interactions 
-                WHERE user_id = NEW.user_id
-            ),
-            total_pool_games = (
-                SELECT COALESCE(SUM(pool_games_played), 0)
-                FROM venue_interactions 
-                WHERE user_id = NEW.user_id
-            ),
-            total_dart_games = (
-                SELECT COALESCE(SUM(dart_games_played), 0)
-                FROM venue_interactions 
-                WHERE user_id = NEW.user_id
-            ),
-            photos_taken = (
-                SELECT COALESCE(SUM(photos_taken), 0)
-                FROM venue_interactions 
-                WHERE user_id = NEW.user_id
-            ),
-            avg_drunk_scale = (
-                SELECT COALESCE(AVG(drunk_scale_rating), 0)
-                FROM venue_interactions 
-                WHERE user_id = NEW.user_id AND drunk_scale_rating IS NOT NULL
-            ),
-            nights_out = (
-                SELECT COUNT(DISTINCT night_out_id) 
-                FROM venue_interactions 
-                WHERE user_id = NEW.user_id AND night_out_id IS NOT NULL
-            ),
+            bars_hit = agg.bars_hit,
+            total_beers = agg.total_beers,
+            total_shots = agg.total_shots,
+            total_pool_games = agg.total_pool_games,
+            total_dart_games = agg.total_dart_games,
+            photos_taken = agg.photos_taken,
+            avg_drunk_scale = CASE
+                WHEN agg.drunk_scale_count > 0 THEN agg.drunk_scale_sum::DECIMAL / agg.drunk_scale_count
+                ELSE 0
+            END,
+            nights_out = agg.nights_out,
             updated_at = NOW()
         WHERE user_id = NEW.user_id;
     END IF;
     RETURN COALESCE(NEW, OLD);
 END;
-$$ LANGUAGE plpgsql;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
 
 -- Create triggers
 
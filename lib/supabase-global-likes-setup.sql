@@ -29,11 +29,27 @@ CREATE TABLE IF NOT EXISTS user_achievements (
   UNIQUE(user_id, achievement_id)
 );
 
+-- Per-venue like histograms, kept current by the update_bar_like_histograms trigger
+CREATE TABLE IF NOT EXISTS bar_time_slot_likes (
+  bar_id TEXT NOT NULL,
+  like_time_slot TEXT NOT NULL,
+  like_count INTEGER DEFAULT 0,
+  PRIMARY KEY (bar_id, like_time_slot)
+);
+
+CREATE TABLE IF NOT EXISTS bar_weekday_likes (
+  bar_id TEXT NOT NULL,
+  weekday SMALLINT NOT NULL CHECK (weekday BETWEEN 0 AND 6), -- EXTRACT(DOW): 0 = Sunday
+  like_count INTEGER DEFAULT 0,
+  PRIMARY KEY (bar_id, weekday)
+);
+
 -- Add indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_bar_likes_user_id ON bar_likes(user_id);
 CREATE INDEX IF NOT EXISTS idx_bar_likes_bar_id ON bar_likes(bar_id);
 CREATE INDEX IF NOT EXISTS idx_bar_likes_liked_at ON bar_likes(liked_at);
 CREATE INDEX IF NOT EXISTS idx_bar_likes_like_time_slot ON bar_likes(like_time_slot);
+CREATE INDEX IF NOT EXISTS idx_bar_likes_user_bar_liked_at ON bar_likes(user_id, bar_id, liked_at);
 CREATE INDEX IF NOT EXISTS idx_user_achievements_user_id ON user_achievements(user_id);
 CREATE INDEX IF NOT EXISTS idx_user_achievements_achievement_id ON user_achievements(achievement_id);
 CREATE INDEX IF NOT EXISTS idx_user_achievements_base_id ON user_achievements(achievement_base_id);
@@ -42,12 +58,18 @@ CREATE INDEX IF NOT EXISTS idx_user_achievements_popup_shown ON user_achievement
 -- Enable Row Level Security for new tables
 ALTER TABLE bar_likes ENABLE ROW LEVEL SECURITY;
 ALTER TABLE user_achievements ENABLE ROW LEVEL SECURITY;
+ALTER TABLE bar_time_slot_likes ENABLE ROW LEVEL SECURITY;
+ALTER TABLE bar_weekday_likes ENABLE ROW LEVEL SECURITY;
 
 -- Create policies for bar_likes (allow all users to view/insert)
 CREATE POLICY "Users can view all bar likes" ON bar_likes FOR SELECT USING (true);
 CREATE POLICY "Users can insert their own bar likes" ON bar_likes FOR INSERT WITH CHECK (true);
 CREATE POLICY "Users can delete their own bar likes" ON bar_likes FOR DELETE USING (true);
 
+-- Create policies for the like histograms (written only by the trigger)
+CREATE POLICY "Users can view bar time slot likes" ON bar_time_slot_likes FOR SELECT USING (true);
+CREATE POLICY "Users can view bar weekday likes" ON bar_weekday_likes FOR SELECT USING (true);
+
 -- Create policies for user_achievements
 CREATE POLICY "Users can view all achievements" ON user_achievements FOR SELECT USING (true);
 CREATE POLICY "Users can insert their own achievements" ON user_achievements FOR INSERT WITH CHECK (true);
@@ -136,23 +158,86 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+-- Keep the per-venue time slot / weekday histograms in step with bar_likes
+CREATE OR REPLACE FUNCTION update_bar_like_histograms()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO bar_time_slot_likes (bar_id, like_time_slot, like_count)
+        VALUES (NEW.bar_id, NEW.like_time_slot, 1)
+        ON CONFLICT (bar_id, like_time_slot)
+        DO UPDATE SET like_count = bar_time_slot_likes.like_count + 1;
+
+        INSERT INTO bar_weekday_likes (bar_id, weekday, like_count)
+        VALUES (NEW.bar_id, EXTRACT(DOW FROM NEW.liked_at)::SMALLINT, 1)
+        ON CONFLICT (bar_id, weekday)
+        DO UPDATE SET like_count = bar_weekday_likes.like_count + 1;
+        RETURN NEW;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE bar_time_slot_likes
+        SET like_count = GREATEST(0, like_count - 1)
+        WHERE bar_id = OLD.bar_id AND like_time_slot = OLD.like_time_slot;
+
+        UPDATE bar_weekday_likes
+        SET like_count = GREATEST(0, like_count - 1)
+        WHERE bar_id = OLD.bar_id AND weekday = EXTRACT(DOW FROM OLD.liked_at)::SMALLINT;
+        RETURN OLD;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS update_bar_like_histograms_on_change ON bar_likes;
+CREATE TRIGGER update_bar_like_histograms_on_change
+    AFTER INSERT OR DELETE ON bar_likes
+    FOR EACH ROW EXECUTE FUNCTION update_bar_like_histograms();
+
+-- Backfill the histograms from likes recorded before the trigger existed
+INSERT INTO bar_time_slot_likes (bar_id, like_time_slot, like_count)
+SELECT bar_id, like_time_slot, COUNT(*) FROM bar_likes GROUP BY bar_id, like_time_slot
+ON CONFLICT (bar_id, like_time_slot) DO UPDATE SET like_count = EXCLUDED.like_count;
+
+INSERT INTO bar_weekday_likes (bar_id, weekday, like_count)
+SELECT bar_id, EXTRACT(DOW FROM liked_at)::SMALLINT, COUNT(*) FROM bar_likes
+GROUP BY bar_id, EXTRACT(DOW FROM liked_at)::SMALLINT
+ON CONFLICT (bar_id, weekday) DO UPDATE SET like_count = EXCLUDED.like_count;
+
 -- Create function to get popular time for a bar based on likes
+-- (reads the venue's slot histogram rather than grouping its likes)
 CREATE OR REPLACE FUNCTION get_bar_popular_time(bar_id_param TEXT)
 RETURNS TEXT AS $$
 DECLARE
     popular_time TEXT;
 BEGIN
     SELECT like_time_slot INTO popular_time
-    FROM bar_likes
-    WHERE bar_id = bar_id_param
-    GROUP BY like_time_slot
-    ORDER BY COUNT(*) DESC
+    FROM bar_time_slot_likes
+    WHERE bar_id = bar_id_param AND like_count > 0
+    ORDER BY like_count DESC, like_time_slot
     LIMIT 1;
     
     RETURN COALESCE(popular_time, '21:00'); -- Default to 9 PM if no data
 END;
 $$ LANGUAGE plpgsql;
 
+-- Create function to get chart data for a bar's likes by time slot and weekday
+CREATE OR REPLACE FUNCTION get_bar_like_histogram(bar_id_param TEXT)
+RETURNS JSONB AS $$
+BEGIN
+    RETURN jsonb_build_object(
+        'time_slots', COALESCE((
+            SELECT jsonb_object_agg(like_time_slot, like_count ORDER BY like_time_slot)
+            FROM bar_time_slot_likes
+            WHERE bar_id = bar_id_param AND like_count > 0
+        ), '{}'::jsonb),
+        'weekdays', COALESCE((
+            SELECT jsonb_object_agg(weekday, like_count ORDER BY weekday)
+            FROM bar_weekday_likes
+            WHERE bar_id = bar_id_param AND like_count > 0
+        ), '{}'::jsonb)
+    );
+END;
+$$ LANGUAGE plpgsql;
+
 -- Create function to get top bars by likes
 CREATE OR REPLACE FUNCTION get_top_bars_by_likes(limit_param INTEGER DEFAULT 10)
 RETURNS TABLE (
@@ -173,16 +258,28 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
--- Create function to check if user has liked a bar today
-CREATE OR REPLACE FUNCTION has_user_liked_bar_today(user_id_param TEXT, bar_id_param TEXT)
+-- Create function to check if user has liked a bar today.
+-- The app's day rolls over at 5 AM (see the daily-chat-reset function), and the
+-- liked_at range below is a single seek on idx_bar_likes_user_bar_liked_at.
+DROP FUNCTION IF EXISTS has_user_liked_bar_today(TEXT, TEXT);
+CREATE OR REPLACE FUNCTION has_user_liked_bar_today(
+    user_id_param TEXT,
+    bar_id_param TEXT,
+    rollover_hour INTEGER DEFAULT 5
+)
 RETURNS BOOLEAN AS $$
+DECLARE
+    day_start TIMESTAMP WITH TIME ZONE;
 BEGIN
+    day_start := date_trunc('day', NOW() - make_interval(hours => rollover_hour))
+                 + make_interval(hours => rollover_hour);
     RETURN EXISTS (
         SELECT 1
         FROM bar_likes
         WHERE user_id = user_id_param 
         AND bar_id = bar_id_param
-        AND DATE(liked_at) = CURRENT_DATE
+        AND liked_at >= day_start
+        AND liked_at < day_start + INTERVAL '1 day'
     );
 END;
 $$ LANGUAGE plpgsql;
@@ -0,0 +1,869 @@
+#!/usr/bin/env python3
+"""
+BarBuddy Mock Data Engine Benchmarks
+Measures the MockSupabaseClient engine from backend_test.py at realistic data volumes.
+"""
+
+import argparse
+import asyncio
+import json
+import copy
+import gc
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Tuple
+
+from backend_test import ASYNC_YIELD_ROWS, INTERACTION_TOTALS, AsyncMockSupabaseClient, MockSupabaseClient
+from mock_workload import WorkloadGenerator, load
+
+def _micros(seconds: float) -> float:
+    return seconds * 1_000_000
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def make_interaction(rng: random.Random, user_id: str, venues: int = 200, nights: int = 500) -> Dict:
+    """One venue_interactions row with the columns the stats trigger reads"""
+    return {
+        'user_id': user_id,
+        'venue_id': f'venue_{rng.randrange(venues)}',
+        'interaction_type': rng.choice(['visit', 'visit', 'visit', 'like', 'check_in', 'photo']),
+        'drunk_scale_rating': rng.choice([None, rng.randint(0, 10)]),
+        'beers_consumed': rng.randint(0, 4),
+        'shots_consumed': rng.randint(0, 3),
+        'pool_games_played': rng.randint(0, 1),
+        'dart_games_played': rng.randint(0, 1),
+        'photos_taken': rng.randint(0, 2),
+        'night_out_id': f'night_{rng.randrange(nights)}' if rng.random() < 0.8 else None
+    }
+
+def recompute_user_stats(client: MockSupabaseClient, user_id: str) -> Dict:
+    """The pre-incremental trigger: re-aggregate the user's whole interaction history"""
+    history = client.from_table('venue_interactions').eq('user_id', user_id).execute().data
+    ratings = [i['drunk_scale_rating'] for i in history if i.get('drunk_scale_rating') is not None]
+    stats = {total: sum(i.get(column) or 0 for i in history) for column, total in INTERACTION_TOTALS.items()}
+    stats['bars_hit'] = len({i['venue_id'] for i in history if i.get('interaction_type', 'visit') == 'visit'})
+    stats['nights_out'] = len({i['night_out_id'] for i in history if i.get('night_out_id') is not None})
+    stats['avg_drunk_scale'] = round(sum(ratings) / len(ratings), 1) if ratings else 0
+    return stats
+
+def bench_user_stats(args) -> int:
+    """Per-insert latency of the venue_interactions stats trigger as a user's history grows"""
+    print("📈 venue_interactions insert latency vs. history size")
+    print(f"{'history':>9} {'incremental p50':>16} {'p95':>9} {'full recompute p50':>19}")
+    rng = random.Random(args.seed)
+    failures = 0
+    for history_size in args.history:
+        client = MockSupabaseClient(storage=args.storage)
+        user_id = str(uuid.uuid4())
+        client.from_table('user_profiles').insert({'user_id': user_id, 'username': f'bench_{user_id[:8]}'})
+        for start in range(0, history_size, 10_000):
+            batch = [make_interaction(rng, user_id) for _ in range(min(10_000, history_size - start))]
+            client.from_table('venue_interactions').insert(batch)
+
+        incremental = []
+        for _ in range(args.inserts):
+            interaction = make_interaction(rng, user_id)
+            started = time.perf_counter()
+            client.from_table('venue_interactions').insert(interaction)
+            incremental.append(_micros(time.perf_counter() - started))
+
+        recompute = []
+        for _ in range(args.recompute_samples):
+            started = time.perf_counter()
+            expected = recompute_user_stats(client, user_id)
+            recompute.append(_micros(time.perf_counter() - started))
+
+        profile = client.from_table('user_profiles').eq('user_id', user_id).single().data
+        mismatched = {k: (profile.get(k), v) for k, v in expected.items() if profile.get(k) != v}
+        if mismatched:
+            failures += 1
+            print(f"❌ history={history_size}: incremental stats diverged from recompute: {mismatched}")
+        print(f"{history_size:>9} {statistics.median(incremental):>14.1f}µs "
+              f"{_percentile(incremental, 95):>7.1f}µs {statistics.median(recompute):>17.1f}µs")
+    return 1 if failures else 0
+
+def zipf_like_counts(venues: int, total_likes: int, skew: float = 1.1) -> List[int]:
+    """Split total_likes across venues with a Zipf-shaped popularity curve"""
+    weights = [1 / rank ** skew for rank in range(1, venues + 1)]
+    scale = total_likes / sum(weights)
+    counts = [int(weight * scale) for weight in weights]
+    counts[0] += total_likes - sum(counts)
+    return counts
+
+def bench_topk(args) -> int:
+    """Top-K venues from the ordered total_likes index vs. sorting every counter"""
+    rng = random.Random(args.seed)
+    client = MockSupabaseClient(storage=args.storage)
+    counts = zipf_like_counts(args.venues, args.likes)
+    rng.shuffle(counts)
+    client.from_table('global_bar_likes').insert([
+        {'bar_id': f'venue_{i:06d}', 'bar_name': f'Venue {i}', 'total_likes': count}
+        for i, count in enumerate(counts)
+    ])
+    print(f"🏆 top-{args.k} of {args.venues:,} venues holding {args.likes:,} likes")
+    
+    # Likes and unlikes go through bar_likes so the counter trigger drives the index
+    user_id = str(uuid.uuid4())
+    like_ids = []
+    updates, ranked = [], []
+    for _ in range(args.queries):
+        for _ in range(args.updates_per_query):
+            started = time.perf_counter()
+            if like_ids and rng.random() < 0.3:
+                client.from_table('bar_likes').eq('id', like_ids.pop()).delete()
+            else:
+                bar = rng.randrange(args.venues)
+                like = client.from_table('bar_likes').insert({
+                    'user_id': user_id, 'bar_id': f'venue_{bar:06d}', 'bar_name': f'Venue {bar}',
+                    'like_time_slot': '22:00'
+                })
+                like_ids.append(like.data['id'])
+            updates.append(_micros(time.perf_counter() - started))
+        started = time.perf_counter()
+        top = client.rpc('get_top_bars_by_likes', {'limit_param': args.k}).data
+        ranked.append(_micros(time.perf_counter() - started))
+    
+    # The same query without the ordered index falls back to a bounded heap over every counter
+    index = client.indexes['global_bar_likes'].pop('total_likes')
+    heap = []
+    for _ in range(args.baseline_samples):
+        started = time.perf_counter()
+        heap_top = client.rpc('get_top_bars_by_likes', {'limit_param': args.k}).data
+        heap.append(_micros(time.perf_counter() - started))
+    client.indexes['global_bar_likes']['total_likes'] = index
+    
+    full_sort = []
+    for _ in range(args.baseline_samples):
+        started = time.perf_counter()
+        counters = client.from_table('global_bar_likes').execute().data
+        sorted_top = sorted(counters, key=lambda c: c['total_likes'], reverse=True)[:args.k]
+        full_sort.append(_micros(time.perf_counter() - started))
+    
+    expected = [(c['bar_id'], c['total_likes']) for c in sorted_top]
+    failures = 0
+    for name, result in (('ordered index', top), ('heap', heap_top)):
+        if [(bar['bar_id'], bar['like_count']) for bar in result] != expected:
+            failures += 1
+            print(f"❌ {name} top-{args.k} disagrees with the full sort")
+    
+    print(f"{'path':>14} {'p50':>11} {'p99':>11}")
+    for name, samples in (('ordered index', ranked), ('heap top-N', heap), ('full sort', full_sort)):
+        print(f"{name:>14} {statistics.median(samples):>9.1f}µs {_percentile(samples, 99):>9.1f}µs")
+    print(f"{'like/unlike':>14} {statistics.median(updates):>9.1f}µs {_percentile(updates, 99):>9.1f}µs"
+          f"  (incl. triggers, {len(updates):,} events)")
+    return 1 if failures else 0
+
+def bench_time_window(args) -> int:
+    """get-popular-times style timestamp windows, with and without the ordered timestamp index"""
+    rng = random.Random(args.seed)
+    start = datetime(2026, 1, 1)
+    interactions = [
+        dict(make_interaction(rng, f'user_{rng.randrange(5_000)}'), id=str(uuid.UUID(int=rng.getrandbits(128))),
+             timestamp=(start + timedelta(seconds=rng.randrange(args.days * 86_400))).isoformat())
+        for _ in range(args.rows)
+    ]
+    windows = []
+    for _ in range(args.queries):
+        window_start = start + timedelta(hours=rng.randrange(args.days * 24))
+        windows.append((window_start.isoformat(), (window_start + timedelta(hours=args.window_hours)).isoformat()))
+    
+    print(f"🕒 {args.window_hours}h windows over {args.rows:,} venue_interactions spanning {args.days} days")
+    print(f"{'index':>8} {'p50':>11} {'p99':>11} {'rows/query':>11}  plan")
+    results = {}
+    for label, sorted_indexes in (('btree', None), ('none', {})):
+        client = MockSupabaseClient(storage=args.storage, triggers=False, sorted_indexes=sorted_indexes)
+        for offset in range(0, len(interactions), 50_000):
+            client.from_table('venue_interactions').insert(interactions[offset:offset + 50_000])
+        samples, returned = [], []
+        for window_start, window_end in windows:
+            query = client.from_table('venue_interactions').gte('timestamp', window_start).lte('timestamp', window_end)
+            started = time.perf_counter()
+            data = query.execute().data
+            samples.append(_micros(time.perf_counter() - started))
+            returned.append([row['id'] for row in data])
+        results[label] = returned
+        print(f"{label:>8} {statistics.median(samples):>9.1f}µs {_percentile(samples, 99):>9.1f}µs "
+              f"{statistics.mean(map(len, returned)):>11.1f}  {query.explain()['access']}")
+    if results['btree'] != results['none']:
+        print("❌ indexed and scanned windows returned different rows")
+        return 1
+    return 0
+
+def seed_fixture(client: MockSupabaseClient, rng: random.Random, profiles: int, likes: int,
+                 achievements: int, batch: int = 50_000) -> List[str]:
+    """Bulk-load profiles, bar likes and achievements; returns the profile user_ids"""
+    users = [str(uuid.UUID(int=rng.getrandbits(128), version=4)) for _ in range(profiles)]
+    start = datetime(2026, 1, 1)
+    for offset in range(0, profiles, batch):
+        client.from_table('user_profiles').insert([
+            {'user_id': user_id, 'username': f'user_{offset + i}', 'xp': rng.randrange(10_000),
+             'level': rng.randint(1, 50), 'favorite_bars': [f'venue_{rng.randrange(500)}']}
+            for i, user_id in enumerate(users[offset:offset + batch])
+        ])
+    for offset in range(0, likes, batch):
+        client.from_table('bar_likes').insert([
+            {'user_id': rng.choice(users), 'bar_id': f'venue_{rng.randrange(500):03d}', 'bar_name': 'Venue',
+             'like_time_slot': rng.choice(['20:00', '21:00', '22:00', '23:00', '00:00']),
+             'liked_at': (start + timedelta(seconds=rng.randrange(270 * 86_400))).isoformat()}
+            for _ in range(min(batch, likes - offset))
+        ])
+    for offset in range(0, achievements, batch):
+        client.from_table('user_achievements').insert([
+            {'user_id': rng.choice(users), 'achievement_id': f'achievement_{rng.randrange(40)}',
+             'progress': rng.randrange(100), 'completed': rng.random() < 0.3}
+            for _ in range(min(batch, achievements - offset))
+        ])
+    return users
+
+def bench_snapshot(args) -> int:
+    """Seeding a large fixture with inserts vs. warm-starting it from a binary snapshot"""
+    rng = random.Random(args.seed)
+    print(f"💾 {args.profiles:,} profiles, {args.likes:,} likes, {args.achievements:,} achievements")
+    started = time.perf_counter()
+    client = MockSupabaseClient(storage=args.storage)
+    users = seed_fixture(client, rng, args.profiles, args.likes, args.achievements)
+    seeded = time.perf_counter() - started
+    
+    path = args.path or os.path.join(tempfile.mkdtemp(), 'fixture.bbsnap')
+    started = time.perf_counter()
+    size = client.save_snapshot(path)
+    saved = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    warm = MockSupabaseClient.load_snapshot(path, storage=args.load_storage)
+    loaded = time.perf_counter() - started
+    
+    # The first lookup on a table pays for rebuilding that table's indexes
+    def query(c, user_id):
+        return c.from_table('bar_likes').eq('user_id', user_id).order('liked_at', desc=True).limit(20).execute().data
+    started = time.perf_counter()
+    first = query(warm, users[0])
+    first_query = time.perf_counter() - started
+    
+    failures = 0
+    for user_id in [users[0]] + rng.sample(users, min(len(users), args.verify)):
+        if query(client, user_id) != query(warm, user_id):
+            failures += 1
+    for table in ('user_profiles', 'bar_likes', 'user_achievements', 'global_bar_likes'):
+        if client.data[table].count() != warm.data[table].count():
+            failures += 1
+            print(f"❌ {table} row count differs after reload")
+    if failures:
+        print(f"❌ {failures} queries disagree between the seeded and reloaded clients")
+    
+    print(f"{'seed (inserts)':>22} {seeded:>9.2f}s")
+    print(f"{'save_snapshot':>22} {saved:>9.2f}s  {size / 2 ** 20:,.1f} MiB")
+    print(f"{'load_snapshot':>22} {loaded * 1000:>9.1f}ms  ({args.load_storage})")
+    print(f"{'first bar_likes query':>22} {first_query * 1000:>9.1f}ms  (builds bar_likes indexes, {len(first)} rows)")
+    if not args.path:
+        os.remove(path)
+    return 1 if failures else 0
+
+def bench_fork(args) -> int:
+    """Per-test copy-on-write fork() of a large base fixture vs. deep-copying it"""
+    rng = random.Random(args.seed)
+    base = MockSupabaseClient(storage=args.storage)
+    users = seed_fixture(base, rng, args.profiles, args.likes, args.achievements)
+    base_likes = base.data['bar_likes'].count()
+    print(f"🍴 forking a base of {args.profiles:,} profiles, {args.likes:,} likes, {args.achievements:,} achievements")
+    
+    forks, first_writes, next_writes = [], [], []
+    failures = 0
+    for i in range(args.forks):
+        started = time.perf_counter()
+        child = base.fork()
+        forks.append(time.perf_counter() - started)
+        like = {'user_id': users[i % len(users)], 'bar_id': 'venue_fork', 'bar_name': 'Fork Bar', 'like_time_slot': '22:00'}
+        # The first write to a table copies it (and its indexes) for this fork only
+        started = time.perf_counter()
+        child.from_table('bar_likes').insert(like)
+        first_writes.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        child.from_table('bar_likes').insert(like)
+        next_writes.append(time.perf_counter() - started)
+        if child.rpc('get_bar_like_count', {'bar_id_param': 'venue_fork'}).data != 2:
+            failures += 1
+        # Free the fork's private copies outside the timed region
+        del child
+    if base.data['bar_likes'].count() != base_likes or base.rpc('get_bar_like_count', {'bar_id_param': 'venue_fork'}).data:
+        failures += 1
+        print("❌ writes to a fork leaked into the base fixture")
+    
+    started = time.perf_counter()
+    copy.deepcopy(base)
+    deep = time.perf_counter() - started
+    
+    print(f"{'fork()':>22} {statistics.median(forks) * 1000:>9.2f}ms")
+    print(f"{'first bar_likes write':>22} {statistics.median(first_writes) * 1000:>9.2f}ms  (copies bar_likes)")
+    print(f"{'next bar_likes write':>22} {statistics.median(next_writes) * 1000:>9.2f}ms")
+    print(f"{'copy.deepcopy(base)':>22} {deep * 1000:>9.2f}ms")
+    return 1 if failures else 0
+
+def _write_mix(client: MockSupabaseClient, rng: random.Random, users: List[str], venues: int,
+               operations: int, latencies: List[float], errors: List[str]):
+    """One simulated app user: likes, unlikes, check-ins and chat messages"""
+    my_likes = []
+    for _ in range(operations):
+        user_id = rng.choice(users)
+        venue = f'venue_{rng.randrange(venues):04d}'
+        roll = rng.random()
+        started = time.perf_counter()
+        try:
+            if roll < 0.1 and my_likes:
+                client.from_table('bar_likes').eq('id', my_likes.pop()).delete()
+            elif roll < 0.55:
+                like = client.from_table('bar_likes').insert({
+                    'user_id': user_id, 'bar_id': venue, 'bar_name': venue,
+                    'like_time_slot': rng.choice(['21:00', '22:00', '23:00'])
+                })
+                my_likes.append(like.data['id'])
+            elif roll < 0.85:
+                client.from_table('venue_interactions').insert(make_interaction(rng, user_id, venues))
+            else:
+                client.from_table('chat_messages').insert({
+                    'session_id': venue, 'user_id': user_id, 'message': 'anyone here?'
+                })
+        except Exception as error:  # an unlocked store can fail mid-statement
+            errors.append(f"{type(error).__name__}: {error}")
+        latencies.append(_micros(time.perf_counter() - started))
+
+def lost_updates(client: MockSupabaseClient) -> int:
+    """Trigger-maintained counters that disagree with the rows they count"""
+    likes = client.from_table('bar_likes').value_counts('bar_id')
+    counters = {c['bar_id']: c['total_likes'] for c in client.from_table('global_bar_likes').execute().data}
+    slots = {}
+    for bucket in client.from_table('bar_time_slot_likes').execute().data:
+        slots[bucket['bar_id']] = slots.get(bucket['bar_id'], 0) + bucket['like_count']
+    wrong = sum(1 for bar_id in set(likes) | set(counters) if counters.get(bar_id, 0) != likes.get(bar_id, 0))
+    wrong += sum(1 for bar_id in set(likes) | set(slots) if slots.get(bar_id, 0) != likes.get(bar_id, 0))
+    beers = {}
+    for interaction in client.from_table('venue_interactions').execute().data:
+        beers[interaction['user_id']] = beers.get(interaction['user_id'], 0) + interaction['beers_consumed']
+    totals = {a['user_id']: a['total_beers'] for a in client.from_table('user_interaction_aggregates').execute().data}
+    wrong += sum(1 for user_id in set(beers) | set(totals) if totals.get(user_id, 0) != beers.get(user_id, 0))
+    return wrong
+
+def bench_concurrency(args) -> int:
+    """Write throughput and lock contention as writer threads scale, per locking mode"""
+    if args.switch_interval:
+        sys.setswitchinterval(args.switch_interval)
+    print(f"🔒 {args.ops_per_thread:,} writes per thread over {args.users:,} users and {args.venues:,} venues")
+    print(f"{'locking':>8} {'threads':>7} {'writes/s':>10} {'p50':>9} {'p99':>10} "
+          f"{'latch waits':>11} {'row waits':>10} {'lost':>5} {'errors':>6}")
+    failures = 0
+    for mode in args.modes:
+        for threads in args.threads:
+            client = MockSupabaseClient(storage=args.storage, locking=None if mode == 'none' else mode,
+                                        lock_shards=args.shards)
+            users = [str(uuid.UUID(int=i + 1, version=4)) for i in range(args.users)]
+            client.from_table('user_profiles').insert([{'user_id': u, 'username': f'user_{i}'} for i, u in enumerate(users)])
+            latencies, errors = [[] for _ in range(threads)], []
+            workers = [
+                threading.Thread(target=_write_mix, args=(client, random.Random(args.seed + t), users, args.venues,
+                                                          args.ops_per_thread, latencies[t], errors))
+                for t in range(threads)
+            ]
+            started = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - started
+            
+            samples = [latency for thread_latencies in latencies for latency in thread_latencies]
+            lost = lost_updates(client)
+            stats = client.locks.stats() if client.locks is not None else {}
+            latch = [sum(s[k] for s in stats.values()) for k in ('latch_acquired', 'latch_contended')]
+            rows = [sum(s[k] for s in stats.values()) for k in ('row_acquired', 'row_contended')]
+            print(f"{mode:>8} {threads:>7} {len(samples) / elapsed:>10,.0f} {statistics.median(samples):>7.1f}µs "
+                  f"{_percentile(samples, 99):>8.1f}µs {latch[1] / max(1, latch[0]):>10.1%} "
+                  f"{rows[1] / max(1, rows[0]):>10.1%} {lost:>5} {len(errors):>6}")
+            if mode != 'none' and (lost or errors):
+                failures += 1
+                print(f"❌ {mode} locking lost {lost} counter updates, {len(errors)} errors: {errors[:3]}")
+            elif mode == 'none' and threads > 1 and not lost:
+                print("⚠️  unlocked writers never collided mid-trigger; try a smaller --switch-interval")
+    return 1 if failures else 0
+
+def _likes_consistent(reader) -> bool:
+    """One analytic pass: do per-venue like counts match the trigger-maintained counters?"""
+    likes = reader.from_table('bar_likes').value_counts('bar_id')
+    counters = {c['bar_id']: c['total_likes'] for c in reader.from_table('global_bar_likes').execute().data}
+    return all(counters.get(bar_id, 0) == likes.get(bar_id, 0) for bar_id in set(likes) | set(counters))
+
+def bench_mvcc(args) -> int:
+    """Long analytic scans under concurrent writers: live latched reads vs. MVCC snapshots"""
+    if args.switch_interval:
+        sys.setswitchinterval(args.switch_interval)
+    print(f"🕰️  {args.likes:,} likes, {args.writers} writers x {args.ops_per_thread:,} writes, one scanning reader")
+    print(f"{'reader':>8} {'writes/s':>10} {'write p99':>10} {'max write':>10} {'scans':>6} "
+          f"{'scan p50':>9} {'torn':>5} {'peak versions':>13} {'after GC':>8}")
+    failures = 0
+    for mode in args.readers:
+        client = MockSupabaseClient(storage=args.storage, locking='sharded')
+        users = seed_fixture(client, random.Random(args.seed), args.profiles, args.likes, 0)
+        latencies, errors = [[] for _ in range(args.writers)], []
+        writers = [
+            threading.Thread(target=_write_mix, args=(client, random.Random(args.seed + t), users, args.venues,
+                                                      args.ops_per_thread, latencies[t], errors))
+            for t in range(args.writers)
+        ]
+        scans, torn, peak = [], 0, 0
+        started = time.perf_counter()
+        for writer in writers:
+            writer.start()
+        while any(writer.is_alive() for writer in writers):
+            scan_started = time.perf_counter()
+            if mode == 'snapshot':
+                with client.snapshot() as snapshot:
+                    consistent = _likes_consistent(snapshot)
+                    peak = max(peak, client.versions.retained())
+            else:
+                consistent = _likes_consistent(client)
+            scans.append(time.perf_counter() - scan_started)
+            torn += not consistent
+        for writer in writers:
+            writer.join()
+        elapsed = time.perf_counter() - started
+        
+        samples = [latency for thread_latencies in latencies for latency in thread_latencies]
+        retained = client.versions.retained()
+        print(f"{mode:>8} {len(samples) / elapsed:>10,.0f} {_percentile(samples, 99):>8.1f}µs "
+              f"{max(samples) / 1000:>8.1f}ms {len(scans):>6} {statistics.median(scans) * 1000:>7.1f}ms "
+              f"{torn:>5} {peak:>13,} {retained:>8}")
+        if errors or (mode == 'snapshot' and (torn or retained)):
+            failures += 1
+            print(f"❌ {mode}: {torn} torn scans, {retained} versions kept, {len(errors)} errors: {errors[:3]}")
+    return 1 if failures else 0
+
+async def _app_session(db: AsyncMockSupabaseClient, rng: random.Random, users: List[str], venues: int,
+                       operations: int, latencies: List[float]):
+    """One simulated app session: profile, venue feed, like and like count round trips"""
+    user_id = rng.choice(users)
+    for _ in range(operations):
+        venue = f'venue_{rng.randrange(venues):03d}'
+        roll = rng.random()
+        started = time.perf_counter()
+        if roll < 0.3:
+            await db.table('user_profiles').select('*').eq('user_id', user_id).single().execute()
+        elif roll < 0.6:
+            await db.table('bar_likes').select('*').eq('bar_id', venue).order('liked_at', desc=True).limit(20).execute()
+        elif roll < 0.8:
+            await db.table('bar_likes').insert({'user_id': user_id, 'bar_id': venue, 'bar_name': venue,
+                                                'like_time_slot': '22:00'}).execute()
+        else:
+            await db.rpc('get_bar_like_count', {'bar_id_param': venue}).execute()
+        latencies.append(_micros(time.perf_counter() - started))
+
+async def _analytics(db: AsyncMockSupabaseClient, done: asyncio.Event, scans: List[float]):
+    """A dashboard re-reading the whole likes table until the sessions finish"""
+    while not done.is_set():
+        started = time.perf_counter()
+        await db.table('bar_likes').select('*').gte('liked_at', '2026-01-01').execute()
+        scans.append(time.perf_counter() - started)
+
+async def _loop_lag(done: asyncio.Event, interval: float, lags: List[float]):
+    """How late a timer that should fire every interval seconds actually fires"""
+    loop = asyncio.get_running_loop()
+    while not done.is_set():
+        due = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(_micros(loop.time() - due))
+
+async def _run_sessions(args, yield_every: int):
+    client = MockSupabaseClient(storage=args.storage)
+    users = seed_fixture(client, random.Random(args.seed), args.profiles, args.likes, 0)
+    db = AsyncMockSupabaseClient(client, yield_every=yield_every)
+    latencies, scans, lags, done = [], [], [], asyncio.Event()
+    background = [asyncio.ensure_future(_analytics(db, done, scans)),
+                  asyncio.ensure_future(_loop_lag(done, 0.001, lags))]
+    started = time.perf_counter()
+    await asyncio.gather(*(_app_session(db, random.Random(args.seed + s), users, args.venues,
+                                        args.ops_per_session, latencies) for s in range(args.sessions)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await asyncio.gather(*background)
+    return elapsed, latencies, scans, lags
+
+def bench_async_sessions(args) -> int:
+    """Many simulated app sessions on one event loop, with and without cooperative yielding in scans"""
+    print(f"🎛️  {args.sessions:,} sessions x {args.ops_per_session} requests, "
+          f"one dashboard scanning {args.likes:,} likes")
+    print(f"{'yield every':>12} {'requests/s':>11} {'p50':>9} {'p99':>10} {'scans':>6} "
+          f"{'scan p50':>9} {'loop lag p99':>12} {'max lag':>9}")
+    for yield_every in args.yield_every:
+        elapsed, latencies, scans, lags = asyncio.run(_run_sessions(args, yield_every or sys.maxsize))
+        label = f"{yield_every:,} rows" if yield_every else 'never'
+        print(f"{label:>12} {len(latencies) / elapsed:>11,.0f} {statistics.median(latencies) / 1000:>7.2f}ms "
+              f"{_percentile(latencies, 99) / 1000:>8.2f}ms {len(scans):>6} "
+              f"{statistics.median(scans) * 1000 if scans else 0:>7.1f}ms "
+              f"{_percentile(lags, 99) / 1000:>10.2f}ms {max(lags) / 1000:>7.2f}ms")
+    return 0
+
+def wide_profile(rng: random.Random, user_id: str, index: int) -> Dict:
+    """A user_profiles row carrying the per-user arrays the app keeps on it"""
+    return {
+        'user_id': user_id, 'username': f'user_{index}', 'email': f'user_{index}@example.com',
+        'xp': rng.randrange(10_000), 'level': rng.randint(1, 50), 'bars_hit': rng.randrange(200),
+        'xp_activities': [{'id': f'xp_{index}_{i}', 'type': rng.choice(['like', 'visit', 'rate']),
+                           'xp': rng.randrange(5, 50), 'timestamp': f'2026-03-{i % 28 + 1:02d}T22:00:00'}
+                          for i in range(rng.randrange(20, 80))],
+        'visited_bars': [f'venue_{rng.randrange(500):03d}' for _ in range(rng.randrange(10, 60))],
+        'drunk_scale_ratings': [rng.randint(1, 10) for _ in range(rng.randrange(10, 60))]
+    }
+
+def bench_projection(args) -> int:
+    """Response build time, peak memory and JSON size for wide rows, whole vs. projected"""
+    rng = random.Random(args.seed)
+    client = MockSupabaseClient(storage=args.storage)
+    client.from_table('user_profiles').insert([wide_profile(rng, f'user_{i:06d}', i) for i in range(args.profiles)])
+    print(f"🧮 {args.profiles:,} wide user_profiles rows ({args.storage} storage)")
+    print(f"{'select':>54} {'build':>9} {'+ json':>9} {'peak alloc':>11} {'json size':>10}")
+    failures = 0
+    for fields in args.selects:
+        builds, dumps = [], []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            response = client.from_table('user_profiles').select(fields).execute()
+            built = time.perf_counter()
+            body = json.dumps(response.data)
+            builds.append(built - started)
+            dumps.append(time.perf_counter() - built)
+        if response.error:
+            failures += 1
+            print(f"❌ {fields}: {response.error}")
+            continue
+        tracemalloc.start()
+        body = json.dumps(client.from_table('user_profiles').select(fields).execute().data)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{fields[:54]:>54} {statistics.median(builds) * 1000:>7.1f}ms {statistics.median(dumps) * 1000:>7.1f}ms "
+              f"{peak / 2**20:>9.1f}MB {len(body) / 2**20:>8.1f}MB")
+    return 1 if failures else 0
+
+def _measure(read) -> Tuple[float, int, int]:
+    """(seconds, peak traced bytes, rows) for one run of read(), which returns an iterable of rows"""
+    started = time.perf_counter()
+    rows = sum(1 for _ in read())
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    read_rows = sum(1 for _ in read())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert read_rows == rows
+    return elapsed, peak, rows
+
+def bench_pagination(args) -> int:
+    """Memory and time to read a large venue_interactions table: whole, by cursor, by keyset and by offset"""
+    rng = random.Random(args.seed)
+    client = MockSupabaseClient(storage=args.storage, triggers=False)
+    start = datetime(2026, 1, 1)
+    for offset in range(0, args.rows, 50_000):
+        client.from_table('venue_interactions').insert([
+            dict(make_interaction(rng, f'user_{rng.randrange(args.users)}'),
+                 timestamp=(start + timedelta(seconds=rng.randrange(270 * 86_400))).isoformat())
+            for _ in range(min(50_000, args.rows - offset))
+        ])
+    print(f"📜 {args.rows:,} venue_interactions rows ({args.storage} storage), {args.page_size:,}-row pages")
+    print(f"{'read':>28} {'time':>9} {'peak alloc':>11} {'rows':>11}")
+    table = lambda: client.from_table('venue_interactions')
+    reads = [
+        ('execute() (whole result)', lambda: table().execute().data),
+        ('cursor()', lambda: table().cursor(batch_size=args.page_size)),
+        ('keyset(timestamp)', lambda: (row for page in table().keyset('timestamp', page_size=args.page_size)
+                                       for row in page)),
+    ]
+    failures = 0
+    for label, read in reads:
+        elapsed, peak, rows = _measure(read)
+        print(f"{label:>28} {elapsed:>8.2f}s {peak / 2**20:>9.1f}MB {rows:>11,}")
+        failures += rows != args.rows
+    
+    # One page deep into the table: offset paging walks every row before it, keyset seeks
+    print(f"{'page at':>28} {'range()':>9} {'keyset':>11}")
+    for fraction in (0, 0.5, 0.99):
+        offset = int(args.rows * fraction)
+        started = time.perf_counter()
+        page = table().order('timestamp').range(offset, offset + args.page_size - 1).execute().data
+        by_offset = time.perf_counter() - started
+        pages = table().gte('timestamp', page[0]['timestamp']).keyset('timestamp', page_size=args.page_size)
+        started = time.perf_counter()
+        next(pages)
+        by_keyset = time.perf_counter() - started
+        pages.close()
+        print(f"{f'row {offset:,}':>28} {by_offset * 1000:>7.1f}ms {by_keyset * 1000:>9.1f}ms")
+    return 1 if failures else 0
+
+def bench_workload(args) -> int:
+    """Load the synthetic BarBuddy workload at several scale factors and time the app's hot reads on it"""
+    print(f"🌃 synthetic workload at scale {', '.join(f'×{scale:g}' for scale in args.scales)} ({args.storage} storage)")
+    results = {}
+    for scale in args.scales:
+        workload = WorkloadGenerator(scale, args.seed)
+        client = MockSupabaseClient(storage=args.storage)
+        started = time.perf_counter()
+        counts = load(client, workload)
+        elapsed = time.perf_counter() - started
+        rows = sum(counts.values())
+        print(f"×{scale:g}: {workload.users:,} users, {rows:,} rows loaded in {elapsed:.1f}s "
+              f"({rows / elapsed:,.0f} rows/s, triggers included)")
+        
+        rng = random.Random(args.seed)
+        top = client.rpc('get_top_bars_by_likes', {'limit_param': 1}).data[0]['bar_id']
+        evening = workload.start + timedelta(days=(5 - workload.start.weekday()) % 7, hours=22)
+        reads = {
+            'profile by username': lambda user: client.from_table('user_profiles').eq('username', user['username']).single(),
+            "user's interactions": lambda user: client.from_table('venue_interactions').eq('user_id', user['user_id']).execute(),
+            "user's likes, newest first": lambda user: client.from_table('bar_likes').eq('user_id', user['user_id'])
+                .order('liked_at', desc=True).limit(20).execute(),
+            "user's friends": lambda user: client.from_table('friends').eq('user_id', user['user_id']).execute(),
+            'top 10 bars': lambda user: client.rpc('get_top_bars_by_likes', {'limit_param': 10}),
+            'busiest bar popular time': lambda user: client.rpc('get_bar_popular_time', {'bar_id_param': top}),
+            'Saturday 22:00-23:00 visits': lambda user: client.from_table('venue_interactions')
+                .gte('timestamp', evening.isoformat()).lt('timestamp', (evening + timedelta(hours=1)).isoformat()).execute()
+        }
+        users = [client.from_table('user_profiles').eq('username', f'user_{rng.randrange(workload.users)}').single().data
+                 for _ in range(args.queries)]
+        for label, read in reads.items():
+            samples = []
+            for user in users:
+                started = time.perf_counter()
+                read(user)
+                samples.append(_micros(time.perf_counter() - started))
+            results.setdefault(label, []).append(statistics.median(samples))
+    
+    print(f"{'p50':>30}" + ''.join(f"{f'×{scale:g}':>12}" for scale in args.scales))
+    for label, medians in results.items():
+        print(f"{label:>30}" + ''.join(f"{median:>10.1f}µs" for median in medians))
+    return 0
+
+# Cases of the suite subcommand, in run order (the keys of _suite_cases)
+SUITE_CASES = ('insert', 'insert_batch', 'eq', 'single', 'update', 'value_counts', 'like_count', 'popular_time',
+               'top_bars', 'daily_limit')
+
+def _suite_cases(client: MockSupabaseClient, workload: WorkloadGenerator, rng: random.Random) -> Dict[str, Callable]:
+    """One MockTable operation or derived analytic per case, each a no-argument callable"""
+    users = [client.from_table('user_profiles').eq('username', f'user_{rng.randrange(workload.users)}').single().data
+             for _ in range(64)]
+    venues = [(workload.venue_ids[i], workload.venue_names[i]) for i in range(min(64, workload.venues))]
+    batch = [make_interaction(rng, user['user_id'], venues=workload.venues) for user in users[:16]] * 4
+    pick = lambda items: items[rng.randrange(len(items))]
+    return {
+        'insert': lambda: client.from_table('bar_likes').insert({
+            'user_id': pick(users)['user_id'], 'bar_id': pick(venues)[0], 'bar_name': 'Venue',
+            'like_time_slot': '22:00', 'liked_at': datetime.now().isoformat()
+        }),
+        'insert_batch': lambda: client.from_table('venue_interactions').insert(batch),
+        'eq': lambda: client.from_table('venue_interactions').eq('user_id', pick(users)['user_id']).execute(),
+        'single': lambda: client.from_table('user_profiles').eq('username', pick(users)['username']).single(),
+        'update': lambda: client.from_table('user_profiles').eq('user_id', pick(users)['user_id'])
+            .update({'xp': rng.randrange(10_000)}),
+        'value_counts': lambda: client.from_table('venue_interactions').eq('user_id', pick(users)['user_id'])
+            .value_counts('venue_id'),
+        'like_count': lambda: client.rpc('get_bar_like_count', {'bar_id_param': pick(venues)[0]}),
+        'popular_time': lambda: client.rpc('get_bar_popular_time', {'bar_id_param': pick(venues)[0]}),
+        'top_bars': lambda: client.rpc('get_top_bars_by_likes', {'limit_param': 10}),
+        'daily_limit': lambda: client.rpc('has_user_liked_bar_today', {
+            'user_id_param': pick(users)['user_id'], 'bar_id_param': pick(venues)[0]
+        })
+    }
+
+def _calibrate(op: Callable, target: float, min_reps: int) -> int:
+    """Repetitions of op filling about target seconds; the probe doubles as warm-up"""
+    reps, started = 0, time.perf_counter()
+    while reps < 5 or time.perf_counter() - started < target / 10:
+        op()
+        reps += 1
+    return max(min_reps, int(target / ((time.perf_counter() - started) / reps)))
+
+def bench_suite(args) -> int:
+    """Fixed-seed micro-benchmarks of each MockTable operation, written to JSON and checked against a baseline"""
+    workload = WorkloadGenerator(args.scale, args.seed)
+    base = MockSupabaseClient(storage=args.storage)
+    load(base, workload)
+    print(f"🧪 micro-benchmarks on the ×{args.scale:g} workload ({args.storage} storage), "
+          f"~{args.target_time:g}s per case")
+    
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        mismatched = {key: (baseline['meta'].get(key), value) for key, value in
+                      (('scale', args.scale), ('storage', args.storage), ('seed', args.seed))
+                      if baseline['meta'].get(key) != value}
+        if mismatched:
+            print(f"⚠️  baseline was recorded with different settings (baseline, now): {mismatched}")
+    
+    print(f"{'case':>14} {'reps':>8} {'ops/s':>11} {'p50':>10} {'p95':>10} {'p99':>10}  vs. baseline p50")
+    results, regressions = {}, []
+    for name in args.cases or SUITE_CASES:
+        # Every case gets its own fork and RNG stream, so writes and draws never leak between cases
+        client = base.fork()
+        op = _suite_cases(client, workload, random.Random(f'{args.seed}:{name}'))[name]
+        reps = _calibrate(op, args.target_time, args.min_reps)
+        samples = []
+        gc.disable()
+        try:
+            for _ in range(reps):
+                started = time.perf_counter()
+                op()
+                samples.append(_micros(time.perf_counter() - started))
+        finally:
+            gc.enable()
+        results[name] = {
+            'reps': reps, 'ops_per_sec': 1_000_000 * reps / sum(samples),
+            'p50_us': _percentile(samples, 50), 'p95_us': _percentile(samples, 95), 'p99_us': _percentile(samples, 99)
+        }
+        
+        comparison = ''
+        previous = (baseline or {}).get('results', {}).get(name)
+        if previous:
+            change = results[name]['p50_us'] / previous['p50_us'] - 1
+            comparison = f"{change:+.1%}"
+            if change > args.threshold:
+                regressions.append(name)
+                comparison += ' ❌'
+        result = results[name]
+        print(f"{name:>14} {reps:>8,} {result['ops_per_sec']:>11,.0f} {result['p50_us']:>8.1f}µs "
+              f"{result['p95_us']:>8.1f}µs {result['p99_us']:>8.1f}µs  {comparison}")
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'meta': {'scale': args.scale, 'storage': args.storage, 'seed': args.seed,
+                         'target_time': args.target_time, 'python': platform.python_version(),
+                         'recorded_at': datetime.now().isoformat()},
+                'results': results
+            }, f, indent=2)
+        print(f"💾 results written to {args.json}")
+    if regressions:
+        print(f"❌ p50 regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--storage', choices=['rows', 'columnar'], default='rows')
+    parser.add_argument('--seed', type=int, default=42)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    user_stats = commands.add_parser('user-stats', help=bench_user_stats.__doc__)
+    user_stats.add_argument('--history', type=int, nargs='+', default=[10, 100, 1_000, 10_000, 100_000])
+    user_stats.add_argument('--inserts', type=int, default=200)
+    user_stats.add_argument('--recompute-samples', type=int, default=5)
+    user_stats.set_defaults(run=bench_user_stats)
+    
+    topk = commands.add_parser('topk', help=bench_topk.__doc__)
+    topk.add_argument('--venues', type=int, default=100_000)
+    topk.add_argument('--likes', type=int, default=50_000_000)
+    topk.add_argument('-k', type=int, default=10)
+    topk.add_argument('--queries', type=int, default=500)
+    topk.add_argument('--updates-per-query', type=int, default=20)
+    topk.add_argument('--baseline-samples', type=int, default=10)
+    topk.set_defaults(run=bench_topk)
+    
+    time_window = commands.add_parser('time-window', help=bench_time_window.__doc__)
+    time_window.add_argument('--rows', type=int, default=200_000)
+    time_window.add_argument('--days', type=int, default=90)
+    time_window.add_argument('--window-hours', type=int, default=6)
+    time_window.add_argument('--queries', type=int, default=200)
+    time_window.set_defaults(run=bench_time_window)
+    
+    snapshot = commands.add_parser('snapshot', help=bench_snapshot.__doc__)
+    snapshot.add_argument('--profiles', type=int, default=100_000)
+    snapshot.add_argument('--likes', type=int, default=1_000_000)
+    snapshot.add_argument('--achievements', type=int, default=300_000)
+    snapshot.add_argument('--load-storage', choices=['rows', 'columnar'], default='columnar')
+    snapshot.add_argument('--path', help="keep the snapshot at this path instead of a temp file")
+    snapshot.add_argument('--verify', type=int, default=50)
+    snapshot.set_defaults(run=bench_snapshot)
+    
+    fork = commands.add_parser('fork', help=bench_fork.__doc__)
+    fork.add_argument('--profiles', type=int, default=50_000)
+    fork.add_argument('--likes', type=int, default=500_000)
+    fork.add_argument('--achievements', type=int, default=100_000)
+    fork.add_argument('--forks', type=int, default=20)
+    fork.set_defaults(run=bench_fork)
+    
+    concurrency = commands.add_parser('concurrency', help=bench_concurrency.__doc__)
+    concurrency.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    concurrency.add_argument('--ops-per-thread', type=int, default=2_000)
+    concurrency.add_argument('--users', type=int, default=1_000)
+    concurrency.add_argument('--venues', type=int, default=200)
+    concurrency.add_argument('--modes', nargs='+', choices=['none', 'table', 'sharded'],
+                             default=['none', 'table', 'sharded'])
+    concurrency.add_argument('--shards', type=int, default=64)
+    # Short enough that unlocked writers switch between a trigger's counter read and its upsert
+    concurrency.add_argument('--switch-interval', type=float, default=1e-5,
+                             help="sys.setswitchinterval() seconds; smaller values interleave threads more often")
+    concurrency.set_defaults(run=bench_concurrency)
+    
+    mvcc = commands.add_parser('mvcc', help=bench_mvcc.__doc__)
+    mvcc.add_argument('--profiles', type=int, default=5_000)
+    mvcc.add_argument('--likes', type=int, default=200_000)
+    mvcc.add_argument('--writers', type=int, default=4)
+    mvcc.add_argument('--ops-per-thread', type=int, default=2_000)
+    mvcc.add_argument('--venues', type=int, default=200)
+    mvcc.add_argument('--readers', nargs='+', choices=['live', 'snapshot'], default=['live', 'snapshot'])
+    mvcc.add_argument('--switch-interval', type=float,
+                      help="sys.setswitchinterval() seconds; smaller values interleave threads more often")
+    mvcc.set_defaults(run=bench_mvcc)
+    
+    sessions = commands.add_parser('async-sessions', help=bench_async_sessions.__doc__)
+    sessions.add_argument('--sessions', type=int, default=200)
+    sessions.add_argument('--ops-per-session', type=int, default=50)
+    sessions.add_argument('--profiles', type=int, default=5_000)
+    sessions.add_argument('--likes', type=int, default=100_000)
+    sessions.add_argument('--venues', type=int, default=500)
+    sessions.add_argument('--yield-every', type=int, nargs='+', default=[0, ASYNC_YIELD_ROWS],
+                          help="rows between event-loop yields in scans (0: never yield)")
+    sessions.set_defaults(run=bench_async_sessions)
+    
+    projection = commands.add_parser('projection', help=bench_projection.__doc__)
+    projection.add_argument('--profiles', type=int, default=20_000)
+    projection.add_argument('--repeat', type=int, default=5)
+    projection.add_argument('--selects', nargs='+', default=[
+        '*', 'user_id, username, xp', 'name:username, last_activity:xp_activities->0->>type'
+    ])
+    projection.set_defaults(run=bench_projection)
+    
+    pagination = commands.add_parser('pagination', help=bench_pagination.__doc__)
+    pagination.add_argument('--rows', type=int, default=1_000_000)
+    pagination.add_argument('--users', type=int, default=50_000)
+    pagination.add_argument('--page-size', type=int, default=1_000)
+    pagination.set_defaults(run=bench_pagination)
+    
+    workload = commands.add_parser('workload', help=bench_workload.__doc__)
+    workload.add_argument('--scales', type=float, nargs='+', default=[0.1, 1],
+                          help="multiples of production size (10 and 100 need several GB of memory)")
+    workload.add_argument('--queries', type=int, default=200)
+    workload.set_defaults(run=bench_workload)
+    
+    suite = commands.add_parser('suite', help=bench_suite.__doc__)
+    suite.add_argument('--scale', type=float, default=0.1)
+    suite.add_argument('--cases', nargs='+', choices=SUITE_CASES, metavar='CASE',
+                       help=f"run only these cases (default: all of {', '.join(SUITE_CASES)})")
+    suite.add_argument('--target-time', type=float, default=0.5, help="seconds of measurement per case")
+    suite.add_argument('--min-reps', type=int, default=100)
+    suite.add_argument('--json', help="write the results to this file (usable as a later --baseline)")
+    suite.add_argument('--baseline', help="results file from an earlier run to compare against")
+    suite.add_argument('--threshold', type=float, default=0.25,
+                       help="fail when a case's p50 latency is this fraction above the baseline")
+    suite.set_defaults(run=bench_suite)
+
+    args = parser.parse_args()
+    sys.exit(args.run(args))
+
+if __name__ == "__main__":
+    main()
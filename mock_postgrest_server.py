@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+BarBuddy Mock PostgREST Server
+Serves the MockSupabaseClient engine from backend_test.py over HTTP, in PostgREST's /rest/v1 dialect,
+so supabase-py and the tRPC backend can be pointed at it instead of a live Supabase project.
+"""
+
+import argparse
+import csv
+import http.server
+import inspect
+import json
+import queue
+import socketserver
+import sys
+import threading
+import typing
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from backend_test import TIMESTAMP_COLUMNS, MockResponse, MockSupabaseClient, QueryLog
+from mock_workload import WorkloadGenerator, load
+
+# Query parameters that shape the response rather than filter rows
+RESERVED_PARAMS = {'select', 'order', 'limit', 'offset', 'on_conflict', 'columns'}
+
+FILTER_OPERATORS = {'eq', 'neq', 'gt', 'gte', 'lt', 'lte', 'in', 'is'}
+
+# Tables of lib/comprehensive-supabase-setup.sql and lib/supabase-global-likes-setup.sql;
+# any other table the client holds (e.g. from a snapshot) is served too
+SCHEMA_TABLES = {
+    'user_profiles', 'bar_likes', 'global_bar_likes', 'bar_time_slot_likes', 'bar_weekday_likes',
+    'friends', 'friend_requests', 'venue_interactions', 'user_achievements', 'user_stats',
+    'night_out_sessions', 'user_interaction_aggregates', 'user_visited_venues', 'user_night_outs'
+}
+
+# Python types URL text is cast to, by the Postgres type named in cast errors
+CAST_TYPES = {bool: 'boolean', int: 'integer', float: 'double precision'}
+
+# Seconds an idle keep-alive connection holds its worker before it is closed
+KEEPALIVE_TIMEOUT = 5.0
+
+# Mock error code -> HTTP status, as PostgREST maps the Postgres/PostgREST codes
+ERROR_STATUS = {
+    'PGRST100': 400, 'PGRST116': 406, 'PGRST200': 400, 'PGRST201': 300, 'PGRST202': 404, 'PGRST205': 404,
+    '23505': 409, '42P10': 400, '21000': 400, '22007': 400, '22P02': 400, '25006': 405
+}
+
+SINGLE_OBJECT = 'application/vnd.pgrst.object+json'
+
+def _error(code: str, message: str) -> Dict[str, str]:
+    return {'code': code, 'message': message, 'details': None, 'hint': None}
+
+def _split_list(value: str) -> List[str]:
+    """Items of an in.(a,"b,c") list; double quotes protect commas"""
+    return next(csv.reader([value], skipinitialspace=True), [])
+
+def _cast(kind: type, value: str) -> Any:
+    """A URL text literal as one of the CAST_TYPES; raises ValueError with 22P02 when it is not one"""
+    try:
+        if kind is bool:
+            return {'true': True, 'false': False}[value.lower()]
+        return kind(value)
+    except (KeyError, ValueError):
+        raise ValueError(_error('22P02', f'invalid input syntax for type {CAST_TYPES[kind]}: "{value}"'))
+
+class PostgRESTHandler(http.server.BaseHTTPRequestHandler):
+    """One keep-alive connection; every request is translated into a MockTable query or rpc call"""
+    protocol_version = 'HTTP/1.1'
+    server_version = 'MockPostgREST/1.0'
+    # Headers and body leave in one buffered write with Nagle off, so keep-alive
+    # clients never wait out a delayed ACK between the two
+    wbufsize = -1
+    disable_nagle_algorithm = True
+    
+    def setup(self):
+        # An idle keep-alive connection times out instead of holding its worker forever
+        self.timeout = self.server.keepalive_timeout
+        super().setup()
+    
+    def log_message(self, format: str, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+    
+    def do_GET(self):
+        self._dispatch('GET')
+    
+    def do_HEAD(self):
+        self._dispatch('HEAD')
+    
+    def do_POST(self):
+        self._dispatch('POST')
+    
+    def do_PATCH(self):
+        self._dispatch('PATCH')
+    
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+    
+    def _dispatch(self, method: str):
+        url = urlsplit(self.path)
+        params = parse_qsl(url.query, keep_blank_values=True)
+        parts = [part for part in url.path.split('/') if part]
+        self.extra_headers = {}
+        try:
+            body = self._body()
+            if parts[:2] != ['rest', 'v1'] or len(parts) != (4 if len(parts) > 2 and parts[2] == 'rpc' else 3):
+                status, payload = 404, _error('PGRST125', f'Invalid path specified in request URL: {url.path}')
+            elif parts[2] == 'rpc':
+                status, payload = self._rpc(parts[3], self.server.rpc_args(parts[3], dict(params))
+                                            if method in ('GET', 'HEAD') else body)
+            else:
+                status, payload = self._table(method, parts[2], params, body)
+        except ValueError as error:
+            status, payload = 400, error.args[0] if isinstance(error.args[0], dict) else _error('PGRST100', str(error))
+        except Exception as error:
+            # A bug in the mock, not in the request: answer it rather than drop the connection
+            self.log_error('%s %s failed: %r', method, url.path, error)
+            status, payload = 500, _error('XX000', f'{type(error).__name__}: {error}')
+        self._send(status, payload, head=method == 'HEAD')
+    
+    def _body(self) -> Any:
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return None
+        try:
+            return json.loads(self.rfile.read(length))
+        except json.JSONDecodeError as error:
+            raise ValueError(_error('PGRST102', f'Empty or invalid json: {error}'))
+    
+    def _send(self, status: int, payload: Any, head: bool = False, headers: Optional[Dict[str, str]] = None):
+        body = b'' if status == 204 else json.dumps(payload, default=str).encode()
+        self.send_response(status)
+        if body:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or self.extra_headers).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+    
+    def _response(self, response: MockResponse, status: int) -> Tuple[int, Any]:
+        if response.error:
+            return ERROR_STATUS.get(response.error.get('code'), 400), _error(
+                response.error.get('code'), response.error.get('message'))
+        return status, response.data
+    
+    def _rpc(self, function_name: str, params: Optional[Dict]) -> Tuple[int, Any]:
+        client = self.server.client
+        function = client.functions.get(function_name)
+        if function is not None:
+            try:
+                if not isinstance(params or {}, dict):
+                    raise TypeError('arguments must be a JSON object')
+                inspect.signature(function).bind(client, **(params or {}))
+            except TypeError as error:
+                # The Python mirror does not take these arguments, as Postgres would not find the overload
+                return 404, _error('PGRST202', f'Could not find the function public.{function_name} '
+                                               f'with the given parameters: {error}')
+        return self._response(client.rpc(function_name, params or {}), 200)
+    
+    def _table(self, method: str, table_name: str, params: List[Tuple[str, str]], body: Any) -> Tuple[int, Any]:
+        if not self.server.has_table(table_name):
+            return 404, _error('PGRST205', f"Could not find the table 'public.{table_name}' in the schema cache")
+        query = self.server.client.from_table(table_name)
+        options = {}
+        for name, value in params:
+            if name in RESERVED_PARAMS:
+                options[name] = value
+            else:
+                self._filter(query, table_name, name, value)
+        prefer = {item.strip() for item in self.headers.get('Prefer', '').split(',')}
+        representation = 'return=representation' in prefer
+        
+        if method == 'POST':
+            if body is None:
+                raise ValueError(_error('PGRST102', 'Empty or invalid json'))
+            if 'resolution=merge-duplicates' in prefer or 'resolution=ignore-duplicates' in prefer:
+                response = query.upsert(body, on_conflict=options.get('on_conflict', 'id'),
+                                        ignore_duplicates='resolution=ignore-duplicates' in prefer)
+            else:
+                response = query.insert(body)
+            status, data = self._response(response, 201)
+            return (status, data) if status >= 400 or representation else (201, None)
+        if method in ('PATCH', 'DELETE'):
+            if method == 'PATCH' and not isinstance(body, dict):
+                raise ValueError(_error('PGRST102', 'PATCH needs a JSON object'))
+            response = query.update(body) if method == 'PATCH' else query.delete()
+            status, data = self._response(response, 200)
+            return (status, data) if status >= 400 or representation else (204, None)
+        
+        if 'select' in options:
+            query.select(options['select'])
+        for term in filter(None, options.get('order', '').split(',')):
+            column, *modifiers = term.split('.')
+            nullsfirst = True if 'nullsfirst' in modifiers else False if 'nullslast' in modifiers else None
+            query.order(column, desc='desc' in modifiers, nullsfirst=nullsfirst)
+        offset, limit = int(options.get('offset', 0)), options.get('limit')
+        window = self.headers.get('Range')
+        if window and '-' in window:
+            start, _, end = window.partition('-')
+            offset = int(start)
+            if end:
+                limit = int(end) - offset + 1
+        if limit is not None:
+            query.range(offset, offset + int(limit) - 1)
+        else:
+            query.offset = offset
+        
+        status, data = self._response(query.execute(), 200)
+        if status >= 400:
+            return status, data
+        self.extra_headers = {'Content-Range': f'{offset}-{offset + len(data) - 1}/*' if data else '*/*'}
+        if SINGLE_OBJECT in self.headers.get('Accept', ''):
+            if len(data) != 1:
+                return 406, _error('PGRST116', 'JSON object requested, multiple (or no) rows returned')
+            return 200, data[0]
+        return status, data
+    
+    def _filter(self, query, table_name: str, column: str, expression: str):
+        """Apply one column=op.value filter"""
+        op, _, value = expression.partition('.')
+        if op not in FILTER_OPERATORS or not _:
+            raise ValueError(_error('PGRST100', f'failed to parse filter ({column}={expression})'))
+        if op == 'is':
+            states = {'null': None, 'true': True, 'false': False}
+            if value not in states:
+                raise ValueError(_error('PGRST100', f'failed to parse filter ({column}={expression})'))
+            query.is_(column, states[value])
+        elif op == 'in':
+            if not (value.startswith('(') and value.endswith(')')):
+                raise ValueError(_error('PGRST100', f'failed to parse filter ({column}={expression})'))
+            query.in_(column, [self.server.coerce(table_name, column, item) for item in _split_list(value[1:-1])])
+        else:
+            getattr(query, op)(column, self.server.coerce(table_name, column, value))
+
+class MockPostgRESTServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """HTTP/1.1 keep-alive server over one MockSupabaseClient.
+    
+    With workers, connections are served by a fixed pool of that many
+    daemon threads (a connection holds its worker until it closes or idles
+    for keepalive_timeout seconds, like a sync worker); with 0, every
+    connection gets its own thread. The client must be built with locking
+    unless a single worker serves it.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+    
+    def __init__(self, address: Tuple[str, int], client: MockSupabaseClient, workers: int = 8, verbose: bool = False,
+                 keepalive_timeout: Optional[float] = KEEPALIVE_TIMEOUT):
+        super().__init__(address, PostgRESTHandler)
+        self.client = client
+        self.verbose = verbose
+        self.keepalive_timeout = keepalive_timeout
+        # Accepted connections waiting for a pool worker; None stops a worker
+        self._connections = queue.SimpleQueue()
+        self._pool = [threading.Thread(target=self._work, name=f'postgrest-{n}', daemon=True)
+                      for n in range(workers)]
+        for thread in self._pool:
+            thread.start()
+        # (table, column) -> Python type of its values, for filter operands
+        self._types = {}
+        self._types_guard = threading.Lock()
+    
+    def process_request(self, request, client_address):
+        if not self._pool:
+            return super().process_request(request, client_address)
+        self._connections.put((request, client_address))
+    
+    def _work(self):
+        while True:
+            job = self._connections.get()
+            if job is None:
+                return
+            self.process_request_thread(*job)
+    
+    def server_close(self):
+        super().server_close()
+        # Workers still serving a connection are daemons, so they never hold up exit
+        while True:
+            try:
+                job = self._connections.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                self.shutdown_request(job[0])
+        for _ in self._pool:
+            self._connections.put(None)
+    
+    def has_table(self, table_name: str) -> bool:
+        return table_name in SCHEMA_TABLES or table_name in self.client.data
+    
+    def coerce(self, table_name: str, column: str, value: str) -> Any:
+        """A URL filter operand as the column's type, as Postgres would cast the text literal"""
+        if column in TIMESTAMP_COLUMNS:
+            return value
+        kind = self._types.get((table_name, column))
+        if kind is None:
+            sample = self.client.from_table(table_name).select(column).limit(50).execute().data or []
+            kind = next((type(row[column]) for row in sample if row.get(column) is not None), None)
+            if kind is None:
+                return value
+            with self._types_guard:
+                self._types[(table_name, column)] = kind
+        return _cast(kind, value) if kind in CAST_TYPES else value
+    
+    def rpc_args(self, function_name: str, params: Dict[str, str]) -> Dict[str, Any]:
+        """GET /rpc query parameters as the types the function's arguments are declared with"""
+        function = self.client.functions.get(function_name)
+        hints = typing.get_type_hints(function) if function else {}
+        return {name: _cast(hints[name], value) if hints.get(name) in CAST_TYPES else value
+                for name, value in params.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=54321)
+    parser.add_argument('--workers', type=int, default=8, help="worker threads (0: one thread per connection)")
+    parser.add_argument('--keepalive-timeout', type=float, default=KEEPALIVE_TIMEOUT,
+                        help="seconds before an idle keep-alive connection is closed")
+    parser.add_argument('--storage', choices=['rows', 'columnar'], default='columnar')
+    parser.add_argument('--snapshot', help="serve the tables of a save_snapshot() file")
+    parser.add_argument('--scale', type=float, help="seed the synthetic workload at this scale factor")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--profile-queries', action='store_true', help="print a query profile on shutdown")
+    parser.add_argument('--verbose', action='store_true', help="log every request")
+    args = parser.parse_args()
+    
+    options = {'locking': 'sharded' if args.workers != 1 else None,
+               'query_log': QueryLog() if args.profile_queries else None}
+    if args.snapshot:
+        client = MockSupabaseClient.load_snapshot(args.snapshot, args.storage, **options)
+    else:
+        client = MockSupabaseClient(storage=args.storage, **options)
+    if args.scale:
+        counts = load(client, WorkloadGenerator(args.scale, args.seed))
+        print(f"🌃 seeded ×{args.scale:g} workload: {sum(counts.values()):,} rows")
+    
+    server = MockPostgRESTServer((args.host, args.port), client, args.workers, args.verbose, args.keepalive_timeout)
+    url = f"http://{args.host}:{server.server_address[1]}"
+    print(f"🛰️  mock PostgREST on {url}/rest/v1 "
+          f"({args.workers or 'thread-per-connection'} workers, {args.storage} storage)")
+    print(f"   SUPABASE_URL={url} (any anon key is accepted)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if client.query_log:
+            print(client.query_log.report())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+BarBuddy Synthetic Workload Generator
+Scale-factor fixtures for the MockSupabaseClient engine in backend_test.py, or bulk files for a real database.
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Tuple
+
+from backend_test import INTERACTION_TOTALS, MockSupabaseClient
+
+# Scale factor 1 is our production size; every row count below grows linearly with it
+PRODUCTION_USERS = 10_000
+PRODUCTION_VENUES = 1_000
+
+# Per-user means at activity 1.0 (activity itself is heavy-tailed, see _activity)
+NIGHTS_PER_USER = 4
+LIKES_PER_USER = 8
+FRIENDS_PER_USER = 3
+REQUESTS_PER_USER = 1
+
+# Friendships connect users at most this far apart in signup order, so the
+# friend graph clusters the way real invite chains do
+FRIEND_WINDOW = 2_000
+
+# Users generated together; fixed so that a (scale, seed) pair always yields the same rows
+CHUNK_USERS = 1_000
+
+VENUE_SKEW = 1.1
+
+# Monday .. Sunday: weekends dominate, Sunday nights are quiet
+WEEKDAY_WEIGHTS = [4, 5, 7, 11, 22, 24, 9]
+
+# Hours after noon a night out starts (0 = 12:00 .. 23 = 11:00 next day), peaking at 22:00
+NIGHT_HOUR_WEIGHTS = [1, 1, 1, 2, 3, 5, 7, 10, 14, 18, 20, 19, 15, 10, 5, 2, 1, 0, 0, 0, 0, 0, 0, 0]
+
+LIKE_TIME_SLOTS = ['19:00', '19:30', '20:00', '20:30', '21:00', '21:30', '22:00', '22:30',
+                   '23:00', '23:30', '00:00', '00:30', '01:00']
+LIKE_TIME_SLOT_WEIGHTS = [2, 2, 4, 5, 8, 9, 12, 11, 10, 8, 6, 3, 2]
+
+INTERACTION_TYPES = ['visit', 'check_in', 'photo', 'like', 'review', 'share']
+INTERACTION_TYPE_WEIGHTS = [70, 10, 10, 5, 3, 2]
+
+# achievement_base_id -> (category, profile stat, [(threshold, title, xp_reward), ...])
+ACHIEVEMENT_LADDERS = {
+    'bars-visited': ('bars', 'bars_hit', [(5, 'Bar Explorer', 50), (15, 'Bar Adventurer', 100),
+                                          (30, 'Bar Enthusiast', 200)]),
+    'nights-out': ('nights', 'nights_out', [(1, 'First Night Out', 25), (10, 'Night Owl', 100),
+                                            (50, 'Creature of the Night', 300)]),
+    'beers': ('drinks', 'total_beers', [(10, 'Beer Taster', 50), (50, 'Beer Enthusiast', 150),
+                                        (200, 'Beer Legend', 400)]),
+    'shots': ('drinks', 'total_shots', [(10, 'Shot Caller', 50), (50, 'Shot Master', 150)]),
+    'pool': ('games', 'total_pool_games', [(5, 'Pool Rookie', 50), (25, 'Pool Shark', 150)]),
+    'darts': ('games', 'total_dart_games', [(5, 'Dart Thrower', 50), (25, 'Bullseye', 150)]),
+    'photos': ('social', 'photos_taken', [(10, 'Snapshot', 50), (50, 'Paparazzi', 150)])
+}
+
+_VENUE_PREFIXES = ['The Rusty', 'The Golden', 'Blue', 'Old', 'The Drunken', 'Velvet', 'Neon', 'The Crooked']
+_VENUE_SUFFIXES = ['Anchor', 'Tap', 'Lounge', 'Tavern', 'Room', 'Saloon', 'Cellar', 'Bar & Grill']
+
+def _cumulative(weights: List[float]) -> List[float]:
+    return list(itertools.accumulate(weights))
+
+_WEEKDAY_CUM = _cumulative(WEEKDAY_WEIGHTS)
+_NIGHT_HOUR_CUM = _cumulative(NIGHT_HOUR_WEIGHTS)
+_LIKE_TIME_SLOT_CUM = _cumulative(LIKE_TIME_SLOT_WEIGHTS)
+_INTERACTION_TYPE_CUM = _cumulative(INTERACTION_TYPE_WEIGHTS)
+
+def night_times(rng: random.Random, count: int, start: datetime, days: int) -> List[datetime]:
+    """count moments in [start, start + days) clustered on weekend nights around 22:00"""
+    weeks = max(1, days // 7)
+    weekdays = rng.choices(range(7), cum_weights=_WEEKDAY_CUM, k=count)
+    hours = rng.choices(range(24), cum_weights=_NIGHT_HOUR_CUM, k=count)
+    first = start.weekday()
+    return [
+        start + timedelta(days=7 * rng.randrange(weeks) + (weekday - first) % 7,
+                          hours=12 + hour, seconds=rng.randrange(3600))
+        for weekday, hour in zip(weekdays, hours)
+    ]
+
+def _activity(rng: random.Random) -> float:
+    """Pareto-distributed activity with mean ~1: a few regulars, a long tail of casual users"""
+    return min(rng.paretovariate(2.0) / 2, 25.0)
+
+def _draw_count(rng: random.Random, mean: float) -> int:
+    """Integer with the given mean (stochastic rounding)"""
+    return int(mean + rng.random())
+
+class WorkloadGenerator:
+    """Deterministic BarBuddy data at scale × production size.
+    
+    Rows are produced a chunk of users at a time, each column drawn for the
+    whole chunk at once, so memory stays flat whatever the scale. Derived
+    profile stats match what the venue_interactions trigger would compute.
+    """
+    
+    TABLES = ['user_profiles', 'friends', 'friend_requests', 'night_out_sessions',
+              'venue_interactions', 'bar_likes', 'user_achievements']
+    
+    def __init__(self, scale: float = 1.0, seed: int = 0, start: datetime = datetime(2026, 1, 1), days: int = 182):
+        if scale <= 0:
+            raise ValueError(f"scale must be positive, got {scale}")
+        self.scale = scale
+        self.seed = seed
+        self.start = start
+        self.days = days
+        self.users = max(1, round(PRODUCTION_USERS * scale))
+        self.venues = max(1, round(PRODUCTION_VENUES * scale))
+        # Popularity rank -> venue, so the busiest venue is not simply venue_000000
+        rng = random.Random(seed)
+        order = list(range(self.venues))
+        rng.shuffle(order)
+        self.venue_ids = [f'venue_{i:06d}' for i in order]
+        self.venue_names = [f'{rng.choice(_VENUE_PREFIXES)} {rng.choice(_VENUE_SUFFIXES)} #{i}' for i in order]
+        self.venue_cum = _cumulative([1 / rank ** VENUE_SKEW for rank in range(1, self.venues + 1)])
+    
+    def batches(self) -> Iterator[Tuple[str, List[Dict]]]:
+        """Yield (table_name, rows) batches, profiles first within every chunk of users"""
+        rng = random.Random(self.seed + 1)
+        user_ids = [str(uuid.UUID(int=rng.getrandbits(128), version=4)) for _ in range(self.users)]
+        for offset in range(0, self.users, CHUNK_USERS):
+            chunk = self._chunk(rng, user_ids, range(offset, min(offset + CHUNK_USERS, self.users)))
+            for table_name in self.TABLES:
+                if chunk[table_name]:
+                    yield table_name, chunk[table_name]
+    
+    def _chunk(self, rng: random.Random, user_ids: List[str], users: range) -> Dict[str, List[Dict]]:
+        tables = {table_name: [] for table_name in self.TABLES}
+        activity = [_activity(rng) for _ in users]
+        
+        self._social(rng, user_ids, users, activity, tables)
+        friends_of = {}
+        for friendship in tables['friends']:
+            friends_of.setdefault(friendship['user_id'], []).append(friendship['friend_user_id'])
+        stats = self._nights(rng, user_ids, users, activity, friends_of, tables)
+        self._likes(rng, user_ids, users, activity, tables)
+        
+        window = self.days * 86_400
+        for index in users:
+            user_id = user_ids[index]
+            user_stats = stats[user_id]
+            xp = 10 * user_stats.pop('visits')
+            last_active = user_stats.pop('last_active')
+            for base_id, (category, stat, ladder) in ACHIEVEMENT_LADDERS.items():
+                for level, (threshold, title, xp_reward) in enumerate(ladder, 1):
+                    if user_stats[stat] < threshold:
+                        break
+                    xp += xp_reward
+                    tables['user_achievements'].append({
+                        'user_id': user_id, 'achievement_id': f'{base_id}-level-{level}',
+                        'achievement_base_id': base_id, 'achievement_title': title,
+                        'achievement_category': category, 'achievement_level': level, 'xp_reward': xp_reward,
+                        'completed_at': (self.start + timedelta(seconds=rng.randrange(window))).isoformat(),
+                        'popup_shown': rng.random() < 0.9
+                    })
+            joined = (self.start - timedelta(days=rng.randrange(365), seconds=rng.randrange(86_400))).isoformat()
+            tables['user_profiles'].append(dict({
+                'user_id': user_id, 'username': f'user_{index}', 'display_name': f'User {index}',
+                'email': f'user_{index}@example.com', 'xp': xp, 'level': 1 + xp // 500,
+                'has_completed_onboarding': rng.random() < 0.95, 'is_active': rng.random() < 0.9,
+                'last_active': last_active or joined, 'join_date': joined, 'created_at': joined
+            }, **user_stats))
+        return tables
+    
+    def _social(self, rng: random.Random, user_ids: List[str], users: range, activity: List[float],
+                tables: Dict[str, List[Dict]]):
+        """Friendships (both directions) and requests to nearby users in signup order"""
+        window = min(FRIEND_WINDOW, (self.users - 1) // 3)
+        if window < 1:
+            return
+        times = night_times(rng, len(users) * 4, self.start, self.days)
+        for (index, weight), sent in zip(zip(users, activity), zip(*[iter(times)] * 4)):
+            user_id = user_ids[index]
+            initiated = min(window, _draw_count(rng, FRIENDS_PER_USER * weight))
+            for offset in rng.sample(range(1, window + 1), initiated):
+                friend_id = user_ids[(index + offset) % self.users]
+                status = 'blocked' if rng.random() < 0.02 else 'active'
+                since = sent[offset % 4]
+                tables['friends'].append({'user_id': user_id, 'friend_user_id': friend_id,
+                                          'friendship_status': status, 'created_at': since.isoformat()})
+                tables['friends'].append({'user_id': friend_id, 'friend_user_id': user_id,
+                                          'friendship_status': status, 'created_at': since.isoformat()})
+                if rng.random() < 0.5:
+                    tables['friend_requests'].append(self._request(rng, user_id, friend_id, 'accepted', since))
+            # Requests still open (or turned down) go to users outside the friend window
+            for _ in range(min(window, _draw_count(rng, REQUESTS_PER_USER * weight))):
+                stranger_id = user_ids[(index + window + rng.randint(1, window)) % self.users]
+                status = rng.choices(['pending', 'declined'], weights=[3, 1])[0]
+                tables['friend_requests'].append(self._request(rng, user_id, stranger_id, status, rng.choice(sent)))
+    
+    def _request(self, rng: random.Random, from_user_id: str, to_user_id: str, status: str, answered: datetime) -> Dict:
+        sent = answered - timedelta(minutes=rng.randrange(1, 2880))
+        return {
+            'from_user_id': from_user_id, 'to_user_id': to_user_id, 'status': status,
+            'message': rng.choice([None, None, 'Drinks this weekend?', 'Met you at the bar!']),
+            'sent_at': sent.isoformat(), 'responded_at': None if status == 'pending' else answered.isoformat()
+        }
+    
+    def _nights(self, rng: random.Random, user_ids: List[str], users: range, activity: List[float],
+                friends_of: Dict[str, List[str]], tables: Dict[str, List[Dict]]) -> Dict[str, Dict]:
+        """Night-out sessions and the venue crawl of each, returning per-user profile stats"""
+        nights_per_user = [_draw_count(rng, NIGHTS_PER_USER * weight) for weight in activity]
+        starts = night_times(rng, sum(nights_per_user), self.start, self.days)
+        crawl_lengths = rng.choices(range(1, 6), weights=[35, 30, 20, 10, 5], k=len(starts))
+        visits = sum(crawl_lengths)
+        
+        # One column at a time for every visit in the chunk
+        venues = rng.choices(range(self.venues), cum_weights=self.venue_cum, k=visits)
+        stays = rng.choices(range(30, 151, 15), k=visits)
+        kinds = rng.choices(INTERACTION_TYPES, cum_weights=_INTERACTION_TYPE_CUM, k=visits)
+        beers = rng.choices(range(7), weights=[20, 25, 22, 15, 9, 6, 3], k=visits)
+        shots = rng.choices(range(5), weights=[50, 25, 13, 8, 4], k=visits)
+        pool = rng.choices(range(3), weights=[75, 18, 7], k=visits)
+        darts = rng.choices(range(3), weights=[80, 15, 5], k=visits)
+        photos = rng.choices(range(5), weights=[45, 25, 15, 10, 5], k=visits)
+        rated = rng.choices([True, False], weights=[3, 1], k=visits)
+        party_sizes = rng.choices(range(1, 9), weights=[20, 30, 20, 12, 8, 5, 3, 2], k=visits)
+        
+        stats = {}
+        visit, night = 0, 0
+        for index, nights in zip(users, nights_per_user):
+            user_id = user_ids[index]
+            totals = dict.fromkeys(INTERACTION_TOTALS.values(), 0)
+            visited, ratings, last_active = set(), [], None
+            for number in range(nights):
+                started, crawl = starts[night], crawl_lengths[night]
+                session_id = f'night_{index}_{number}'
+                friends = friends_of.get(user_id, [])
+                joined = rng.sample(friends, min(len(friends), rng.choice([0, 0, 1, 2, 3])))
+                arrival = started
+                session = {'total_beers': 0, 'total_shots': 0, 'total_photos': 0, 'peak_drunk_scale': None}
+                for stop in range(crawl):
+                    departure = arrival + timedelta(minutes=stays[visit])
+                    rating = min(10, 2 * stop + rng.randint(0, 3)) if rated[visit] else None
+                    interaction = {
+                        'user_id': user_id, 'venue_id': self.venue_ids[venues[visit]],
+                        'venue_name': self.venue_names[venues[visit]], 'interaction_type': kinds[visit],
+                        'arrival_time': arrival.strftime('%H:%M'), 'departure_time': departure.strftime('%H:%M'),
+                        'drunk_scale_rating': rating, 'beers_consumed': beers[visit], 'shots_consumed': shots[visit],
+                        'pool_games_played': pool[visit], 'dart_games_played': darts[visit],
+                        'photos_taken': photos[visit], 'session_id': None, 'night_out_id': session_id,
+                        'interaction_data': {'party_size': party_sizes[visit]}, 'timestamp': arrival.isoformat()
+                    }
+                    tables['venue_interactions'].append(interaction)
+                    for column, total in INTERACTION_TOTALS.items():
+                        totals[total] += interaction[column]
+                    session['total_beers'] += beers[visit]
+                    session['total_shots'] += shots[visit]
+                    session['total_photos'] += photos[visit]
+                    if rating is not None:
+                        ratings.append(rating)
+                        session['peak_drunk_scale'] = max(session['peak_drunk_scale'] or 0, rating)
+                    if kinds[visit] == 'visit':
+                        visited.add(interaction['venue_id'])
+                    arrival = departure + timedelta(minutes=rng.randrange(5, 25))
+                    visit += 1
+                tables['night_out_sessions'].append(dict({
+                    'session_id': session_id, 'user_id': user_id,
+                    'session_name': f"{started.strftime('%A')} night out",
+                    'start_time': started.isoformat(), 'end_time': departure.isoformat(), 'total_venues': crawl,
+                    'friends_joined': joined, 'created_at': started.isoformat()
+                }, **session))
+                last_active = max(last_active or departure, departure)
+                night += 1
+            stats[user_id] = dict(
+                totals, bars_hit=len(visited), nights_out=nights,
+                avg_drunk_scale=round(sum(ratings) / len(ratings), 1) if ratings else 0,
+                visits=sum(crawl_lengths[night - nights:night]),
+                last_active=last_active.isoformat() if last_active else None
+            )
+        return stats
+    
+    def _likes(self, rng: random.Random, user_ids: List[str], users: range, activity: List[float],
+               tables: Dict[str, List[Dict]]):
+        """At most one like per (user, bar), bars drawn by the same Zipf popularity as visits"""
+        likes_per_user = [min(self.venues, _draw_count(rng, LIKES_PER_USER * weight)) for weight in activity]
+        total = sum(likes_per_user)
+        venues = rng.choices(range(self.venues), cum_weights=self.venue_cum, k=total)
+        slots = rng.choices(LIKE_TIME_SLOTS, cum_weights=_LIKE_TIME_SLOT_CUM, k=total)
+        liked_at = night_times(rng, total, self.start, self.days)
+        drawn = 0
+        for index, count in zip(users, likes_per_user):
+            seen = set()
+            for i in range(drawn, drawn + count):
+                if venues[i] in seen:
+                    continue
+                seen.add(venues[i])
+                tables['bar_likes'].append({
+                    'user_id': user_ids[index], 'bar_id': self.venue_ids[venues[i]],
+                    'bar_name': self.venue_names[venues[i]], 'like_time_slot': slots[i],
+                    'liked_at': liked_at[i].isoformat(), 'session_id': None
+                })
+            drawn += count
+
+def load(client: MockSupabaseClient, workload: WorkloadGenerator) -> Dict[str, int]:
+    """Bulk-insert the workload into a mock client; returns rows inserted per table"""
+    counts = dict.fromkeys(workload.TABLES, 0)
+    for table_name, rows in workload.batches():
+        response = client.from_table(table_name).insert(rows)
+        if response.error:
+            raise RuntimeError(f"Failed to load {table_name}: {response.error}")
+        counts[table_name] += len(rows)
+    return counts
+
+def _copy_value(value):
+    """A value as PostgreSQL COPY ... (FORMAT csv) reads it"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, list):
+        return '{' + ','.join(json.dumps(item) for item in value) + '}'
+    if isinstance(value, dict):
+        return json.dumps(value)
+    return value
+
+def write_files(workload: WorkloadGenerator, directory: str, file_format: str = 'csv') -> Dict[str, int]:
+    """Stream the workload to one file per table, plus a psql load script for csv"""
+    os.makedirs(directory, exist_ok=True)
+    counts = dict.fromkeys(workload.TABLES, 0)
+    files, writers, columns = {}, {}, {}
+    try:
+        for table_name, rows in workload.batches():
+            if table_name not in files:
+                files[table_name] = open(os.path.join(directory, f'{table_name}.{file_format}'), 'w', newline='')
+                columns[table_name] = list(rows[0])
+                if file_format == 'csv':
+                    writers[table_name] = csv.writer(files[table_name])
+                    writers[table_name].writerow(columns[table_name])
+            if file_format == 'csv':
+                writers[table_name].writerows([_copy_value(row[c]) for c in columns[table_name]] for row in rows)
+            else:
+                files[table_name].writelines(json.dumps(row) + '\n' for row in rows)
+            counts[table_name] += len(rows)
+    finally:
+        for handle in files.values():
+            handle.close()
+    
+    if file_format == 'csv':
+        with open(os.path.join(directory, 'load.sql'), 'w') as script:
+            for table_name in workload.TABLES:
+                if table_name in columns:
+                    script.write(f"\\copy {table_name} ({', '.join(columns[table_name])}) "
+                                 f"FROM '{table_name}.csv' WITH (FORMAT csv, HEADER true)\n")
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=1.0, help='multiple of production size (1, 10, 100, ...)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--format', choices=['csv', 'jsonl', 'snapshot'], default='csv',
+                        help='csv/jsonl: one file per table; snapshot: a MockSupabaseClient.load_snapshot() file')
+    parser.add_argument('--no-triggers', action='store_true',
+                        help='snapshot only: skip the like counters and stats the triggers maintain')
+    parser.add_argument('out', help='output directory (csv, jsonl) or file (snapshot)')
+    args = parser.parse_args()
+    
+    workload = WorkloadGenerator(args.scale, args.seed)
+    print(f"🏗️  BarBuddy workload ×{args.scale:g}: {workload.users:,} users, {workload.venues:,} venues")
+    started = time.perf_counter()
+    if args.format == 'snapshot':
+        client = MockSupabaseClient(storage='columnar', triggers=not args.no_triggers)
+        counts = load(client, workload)
+        size = client.save_snapshot(args.out)
+        print(f"💾 {args.out}: {size / 2**20:.1f} MiB")
+    else:
+        counts = write_files(workload, args.out, args.format)
+    elapsed = time.perf_counter() - started
+    for table_name, count in counts.items():
+        print(f"   {table_name:<20} {count:>12,} rows")
+    total = sum(counts.values())
+    print(f"✅ {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+-- Maintain user profile stats incrementally from venue_interactions
+-- Replaces the per-insert full re-aggregation with running totals plus
+-- distinct venue / night-out tables, and backfills them from existing history.
+
+-- Running per-user totals kept by update_user_stats_from_interaction()
+CREATE TABLE IF NOT EXISTS user_interaction_aggregates (
+  user_id TEXT PRIMARY KEY REFERENCES user_profiles(user_id) ON DELETE CASCADE,
+  bars_hit INTEGER DEFAULT 0,
+  nights_out INTEGER DEFAULT 0,
+  total_beers BIGINT DEFAULT 0,
+  total_shots BIGINT DEFAULT 0,
+  total_pool_games BIGINT DEFAULT 0,
+  total_dart_games BIGINT DEFAULT 0,
+  photos_taken BIGINT DEFAULT 0,
+  drunk_scale_sum BIGINT DEFAULT 0,
+  drunk_scale_count BIGINT DEFAULT 0,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Distinct venues visited / nights out per user, for the bars_hit and nights_out counts
+CREATE TABLE IF NOT EXISTS user_visited_venues (
+  user_id TEXT NOT NULL REFERENCES user_profiles(user_id) ON DELETE CASCADE,
+  venue_id TEXT NOT NULL,
+  PRIMARY KEY (user_id, venue_id)
+);
+
+CREATE TABLE IF NOT EXISTS user_night_outs (
+  user_id TEXT NOT NULL REFERENCES user_profiles(user_id) ON DELETE CASCADE,
+  night_out_id TEXT NOT NULL,
+  PRIMARY KEY (user_id, night_out_id)
+);
+
+ALTER TABLE user_interaction_aggregates ENABLE ROW LEVEL SECURITY;
+ALTER TABLE user_visited_venues ENABLE ROW LEVEL SECURITY;
+ALTER TABLE user_night_outs ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Anyone can view interaction aggregates" ON user_interaction_aggregates;
+DROP POLICY IF EXISTS "Anyone can view visited venues" ON user_visited_venues;
+DROP POLICY IF EXISTS "Anyone can view night outs" ON user_night_outs;
+
+CREATE POLICY "Anyone can view interaction aggregates" ON user_interaction_aggregates FOR SELECT USING (true);
+CREATE POLICY "Anyone can view visited venues" ON user_visited_venues FOR SELECT USING (true);
+CREATE POLICY "Anyone can view night outs" ON user_night_outs FOR SELECT USING (true);
+
+-- Backfill from existing interaction history
+INSERT INTO user_visited_venues (user_id, venue_id)
+SELECT DISTINCT user_id, venue_id FROM venue_interactions WHERE interaction_type = 'visit'
+ON CONFLICT DO NOTHING;
+
+INSERT INTO user_night_outs (user_id, night_out_id)
+SELECT DISTINCT user_id, night_out_id FROM venue_interactions WHERE night_out_id IS NOT NULL
+ON CONFLICT DO NOTHING;
+
+INSERT INTO user_interaction_aggregates (
+    user_id, bars_hit, nights_out, total_beers, total_shots, total_pool_games,
+    total_dart_games, photos_taken, drunk_scale_sum, drunk_scale_count
+)
+SELECT
+    vi.user_id,
+    (SELECT COUNT(*) FROM user_visited_venues v WHERE v.user_id = vi.user_id),
+    (SELECT COUNT(*) FROM user_night_outs n WHERE n.user_id = vi.user_id),
+    COALESCE(SUM(vi.beers_consumed), 0),
+    COALESCE(SUM(vi.shots_consumed), 0),
+    COALESCE(SUM(vi.pool_games_played), 0),
+    COALESCE(SUM(vi.dart_games_played), 0),
+    COALESCE(SUM(vi.photos_taken), 0),
+    COALESCE(SUM(vi.drunk_scale_rating), 0),
+    COUNT(vi.drunk_scale_rating)
+FROM venue_interactions vi
+GROUP BY vi.user_id
+ON CONFLICT (user_id) DO NOTHING;
+
+-- Function to update user stats from interactions.
+-- Applies the inserted row's deltas to running totals instead of re-aggregating
+-- the user's whole venue_interactions history, so cost per insert stays flat.
+CREATE OR REPLACE FUNCTION update_user_stats_from_interaction()
+RETURNS TRIGGER AS $$
+DECLARE
+    new_bars INTEGER := 0;
+    new_nights INTEGER := 0;
+    agg user_interaction_aggregates%ROWTYPE;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        -- Distinct venues/nights only count the first time they are seen
+        IF NEW.interaction_type = 'visit' THEN
+            INSERT INTO user_visited_venues (user_id, venue_id)
+            VALUES (NEW.user_id, NEW.venue_id)
+            ON CONFLICT DO NOTHING;
+            GET DIAGNOSTICS new_bars = ROW_COUNT;
+        END IF;
+
+        IF NEW.night_out_id IS NOT NULL THEN
+            INSERT INTO user_night_outs (user_id, night_out_id)
+            VALUES (NEW.user_id, NEW.night_out_id)
+            ON CONFLICT DO NOTHING;
+            GET DIAGNOSTICS new_nights = ROW_COUNT;
+        END IF;
+
+        INSERT INTO user_interaction_aggregates AS a (
+            user_id, bars_hit, nights_out, total_beers, total_shots, total_pool_games,
+            total_dart_games, photos_taken, drunk_scale_sum, drunk_scale_count, updated_at
+        ) VALUES (
+            NEW.user_id,
+            new_bars,
+            new_nights,
+            COALESCE(NEW.beers_consumed, 0),
+            COALESCE(NEW.shots_consumed, 0),
+            COALESCE(NEW.pool_games_played, 0),
+            COALESCE(NEW.dart_games_played, 0),
+            COALESCE(NEW.photos_taken, 0),
+            COALESCE(NEW.drunk_scale_rating, 0),
+            (NEW.drunk_scale_rating IS NOT NULL)::INTEGER,
+            NOW()
+        )
+        ON CONFLICT (user_id) DO UPDATE SET
+            bars_hit = a.bars_hit + EXCLUDED.bars_hit,
+            nights_out = a.nights_out + EXCLUDED.nights_out,
+            total_beers = a.total_beers + EXCLUDED.total_beers,
+            total_shots = a.total_shots + EXCLUDED.total_shots,
+            total_pool_games = a.total_pool_games + EXCLUDED.total_pool_games,
+            total_dart_games = a.total_dart_games + EXCLUDED.total_dart_games,
+            photos_taken = a.photos_taken + EXCLUDED.photos_taken,
+            drunk_scale_sum = a.drunk_scale_sum + EXCLUDED.drunk_scale_sum,
+            drunk_scale_count = a.drunk_scale_count + EXCLUDED.drunk_scale_count,
+            updated_at = NOW()
+        RETURNING * INTO agg;
+
+        -- Update user profile stats
+        UPDATE user_profiles SET
+            bars_hit = agg.bars_hit,
+            total_beers = agg.total_beers,
+            total_shots = agg.total_shots,
+            total_pool_games = agg.total_pool_games,
+            total_dart_games = agg.total_dart_games,
+            photos_taken = agg.photos_taken,
+            avg_drunk_scale = CASE
+                WHEN agg.drunk_scale_count > 0 THEN agg.drunk_scale_sum::DECIMAL / agg.drunk_scale_count
+                ELSE 0
+            END,
+            nights_out = agg.nights_out,
+            updated_at = NOW()
+        WHERE user_id = NEW.user_id;
+    END IF;
+    RETURN COALESCE(NEW, OLD);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS update_stats_on_interaction ON venue_interactions;
+CREATE TRIGGER update_stats_on_interaction
+    AFTER INSERT ON venue_interactions
+    FOR EACH ROW EXECUTE FUNCTION update_user_stats_from_interaction();